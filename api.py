@@ -0,0 +1,325 @@
+"""
+Headless JSON API for Household Management App.
+Serves the database.py reads and writes over HTTP so widgets and scripts can use
+the data without rendering a Streamlit page. Runs standalone (python api.py)
+or inside the Streamlit process (HOUSEHOLD_API_EMBED=1), on the same SQLite files.
+
+Every request carries "Authorization: Bearer <token>"; the token picks the household.
+List responses carry an ETag built from the table's version, so a client that sends
+If-None-Match gets a 304 without the table being read. Expenses due from recurring
+templates are generated before the tag is taken, so it covers them too.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import threading
+from datetime import date, datetime
+
+import tornado.ioloop
+import tornado.web
+
+import autocomplete
+import database as db
+import ledger
+import notifications
+import tenancy
+
+logger = logging.getLogger(__name__)
+
+API_HOST = os.environ.get("HOUSEHOLD_API_HOST", "127.0.0.1")
+API_PORT = int(os.environ.get("HOUSEHOLD_API_PORT", "8502"))
+
+
+def _required(body: dict, field: str):
+    value = body.get(field)
+    if value in (None, ""):
+        raise tornado.web.HTTPError(400, reason=f"Missing field: {field}")
+    return value
+
+
+def _positive_int(value, field: str) -> int:
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise tornado.web.HTTPError(400, reason=f"Invalid {field}")
+    if number <= 0:
+        raise tornado.web.HTTPError(400, reason=f"Invalid {field}")
+    return number
+
+
+def _create_expense(household, body):
+    try:
+        amount = float(_required(body, "amount"))
+    except (TypeError, ValueError):
+        raise tornado.web.HTTPError(400, reason="Invalid amount")
+    if not amount > 0:
+        raise tornado.web.HTTPError(400, reason="Invalid amount")
+    payer = _required(body, "payer")
+    if payer not in household.members:
+        raise tornado.web.HTTPError(400, reason=f"Unknown payer: {payer}")
+    split_type = body.get("split_type", db.SPLIT_EQUAL)
+    shares = db.compute_shares(amount, payer, split_type, household.members)
+    db.add_expense(amount, body.get("description", ""), payer, split_type, shares,
+                   body.get("category", db.DEFAULT_EXPENSE_CATEGORY))
+
+
+def _db(name: str):
+    """A database.py function looked up on every call, so wrappers added later (metrics.instrument) apply."""
+    return lambda *args: getattr(db, name)(*args)
+
+
+# resource -> table, reader, create(household, body), delete, {action: write(id, household, body)},
+# and optionally refresh(): writes the reader would make, run before the ETag is taken
+RESOURCES = {
+    "shopping": {
+        "table": "shopping_items",
+        "read": _db("get_all_shopping_items"),
+        "create": lambda h, b: db.add_shopping_item(_required(b, "name"), b.get("category", "📦 אחר"), str(b.get("quantity", "1"))),
+        "delete": _db("delete_shopping_item"),
+        "actions": {
+            "bought": lambda item_id, h, b: db.update_shopping_item(item_id, bought=bool(b.get("bought", True))),
+        },
+    },
+    "expenses": {
+        "table": "expenses",
+        "read": _db("get_all_expenses"),
+        "refresh": _db("materialize_recurring"),
+        "create": _create_expense,
+        "delete": _db("delete_expense"),
+        "actions": {},
+    },
+    "events": {
+        "table": "events",
+        "read": _db("get_all_events"),
+        "create": lambda h, b: db.add_event(_required(b, "title"), _required(b, "date"), b.get("time", ""), b.get("description", "")),
+        "delete": _db("delete_event"),
+        "actions": {},
+    },
+    "chores": {
+        "table": "chores",
+        "read": _db("get_all_chores"),
+        "create": lambda h, b: db.add_chore(_required(b, "name"), b.get("priority") or b.get("urgency") or "Regular 🔵",
+                                            b.get("due_date")),
+        "delete": _db("delete_chore"),
+        "actions": {
+            "done": lambda item_id, h, b: db.mark_chore_done(item_id, b.get("user", h.members[0])),
+            "undone": lambda item_id, h, b: db.mark_chore_undone(item_id),
+        },
+    },
+    "cat": {
+        "table": "cat_care",
+        "read": _db("get_all_cat_tasks"),
+        "create": lambda h, b: db.add_cat_task(_required(b, "task_name"),
+                                               _positive_int(_required(b, "frequency_hours"), "frequency_hours")),
+        "delete": _db("delete_cat_task"),
+        "actions": {
+            "done": lambda item_id, h, b: db.update_cat_task(item_id, b.get("user", h.members[0])),
+        },
+    },
+}
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Not JSON serializable: {type(value).__name__}")
+
+
+class BaseHandler(tornado.web.RequestHandler):
+    """Token auth, JSON in/out, and database calls run off the IO loop for the caller's household."""
+
+    household = None
+    handle = None
+    etag = None
+
+    async def prepare(self):
+        scheme, _, token = self.request.headers.get("Authorization", "").partition(" ")
+        household = tenancy.authenticate_token(token) if scheme.lower() == "bearer" and token else None
+        if household is None:
+            raise tornado.web.HTTPError(401, reason="Invalid or missing API token")
+        self.household = household
+        # Opening a household may run its migrations - keep that off the IO loop too
+        self.handle = await asyncio.get_running_loop().run_in_executor(None, tenancy.get_handle, household)
+
+    async def call(self, fn, *args):
+        """Run fn(*args) in a worker thread with database.py pointed at this household."""
+        def run():
+            with db.using_database(self.handle.db_path):
+                return fn(*args)
+        return await asyncio.get_running_loop().run_in_executor(None, run)
+
+    def json_body(self) -> dict:
+        if not self.request.body:
+            return {}
+        try:
+            body = json.loads(self.request.body)
+        except ValueError:
+            raise tornado.web.HTTPError(400, reason="Body is not valid JSON")
+        if not isinstance(body, dict):
+            raise tornado.web.HTTPError(400, reason="Body must be a JSON object")
+        return body
+
+    def send_json(self, data, status: int = 200):
+        self.set_status(status)
+        self.set_header("Content-Type", "application/json; charset=utf-8")
+        self.finish(json.dumps(data, ensure_ascii=False, default=_json_default))
+
+    def not_modified(self, *tables) -> bool:
+        """Set the ETag for these tables' current versions; True if the client already has it."""
+        feed = self.handle.feed
+        # One PRAGMA data_version when nothing changed
+        feed.poll()
+        versions = feed.versions()
+        tag = "-".join(str(versions.get(table, 0)) for table in tables)
+        self.etag = f'"{self.household.id}-{tag}"'
+        self.set_header("Cache-Control", "no-cache")
+        self.set_etag_header()
+        if self.check_etag_header():
+            self.set_status(304)
+            self.finish()
+            return True
+        return False
+
+    def compute_etag(self):
+        # Only the version-based tag; never hash response bodies
+        return self.etag
+
+    def resource(self, name):
+        if name not in RESOURCES:
+            raise tornado.web.HTTPError(404, reason=f"Unknown resource: {name}")
+        return RESOURCES[name]
+
+    def write_error(self, status_code, **kwargs):
+        self.set_header("Content-Type", "application/json; charset=utf-8")
+        self.finish(json.dumps({"error": self._reason}, ensure_ascii=False))
+
+
+class CollectionHandler(BaseHandler):
+    """GET /api/<resource> lists rows; POST creates one."""
+
+    async def get(self, name):
+        resource = self.resource(name)
+        if "refresh" in resource:
+            await self.call(resource["refresh"])
+        if self.not_modified(resource["table"]):
+            return
+        rows = await self.call(resource["read"])
+        self.send_json([dict(row) for row in rows])
+
+    async def post(self, name):
+        resource = self.resource(name)
+        body = self.json_body()
+        await self.call(resource["create"], self.household, body)
+        self.send_json({"ok": True}, status=201)
+
+
+class ItemHandler(BaseHandler):
+    """DELETE /api/<resource>/<id> moves a row to the Recycle Bin."""
+
+    async def delete(self, name, item_id):
+        await self.call(self.resource(name)["delete"], int(item_id))
+        self.send_json({"ok": True})
+
+
+class ActionHandler(BaseHandler):
+    """POST /api/<resource>/<id>/<action>, e.g. /api/shopping/7/bought."""
+
+    async def post(self, name, item_id, action):
+        actions = self.resource(name)["actions"]
+        if action not in actions:
+            raise tornado.web.HTTPError(404, reason=f"Unknown action: {action}")
+        await self.call(actions[action], int(item_id), self.household, self.json_body())
+        self.send_json({"ok": True})
+
+
+class BalanceHandler(BaseHandler):
+    """GET /api/balance - net balances and the settle-up transfers."""
+
+    async def get(self):
+        await self.call(db.materialize_recurring)
+        if self.not_modified("expenses"):
+            return
+        balances = await self.call(db.get_participant_balances)
+        self.send_json({
+            "balances": balances,
+            "transfers": [t._asdict() for t in ledger.minimal_transfers(balances)],
+        })
+
+
+class AlertsHandler(BaseHandler):
+    """GET /api/alerts - what the alerts banner shows right now (time-dependent, so no ETag)."""
+
+    async def get(self):
+        engine = await self.call(notifications.get_engine, self.handle.db_path)
+        self.send_json([
+            {"kind": alert.kind, "emoji": alert.emoji, "text": alert.text}
+            for alert in engine.active_alerts()
+        ])
+
+
+class SuggestHandler(BaseHandler):
+    """GET /api/suggest?q=<prefix> - past shopping items matching what was typed, best first."""
+
+    async def get(self):
+        index = await self.call(autocomplete.get_index, self.handle.db_path)
+        limit = min(_positive_int(self.get_query_argument("limit", "8") or 8, "limit"), 50)
+        self.send_json([s._asdict() for s in index.suggest(self.get_query_argument("q", ""), limit)])
+
+
+def make_app() -> tornado.web.Application:
+    return tornado.web.Application([
+        (r"/api/balance", BalanceHandler),
+        (r"/api/alerts", AlertsHandler),
+        (r"/api/suggest", SuggestHandler),
+        (r"/api/(\w+)", CollectionHandler),
+        (r"/api/(\w+)/(\d+)", ItemHandler),
+        (r"/api/(\w+)/(\d+)/(\w+)", ActionHandler),
+    ])
+
+
+# ============== RUNNING ==============
+
+_embedded = None
+_embedded_lock = threading.Lock()
+
+
+def start_in_background(host: str = API_HOST, port: int = API_PORT) -> threading.Thread:
+    """Serve the API from a daemon thread of the current process (once per process)."""
+    global _embedded
+    started = threading.Event()
+
+    def run():
+        asyncio.set_event_loop(asyncio.new_event_loop())
+        make_app().listen(port, address=host)
+        logger.info("JSON API listening on %s:%d", host, port)
+        started.set()
+        tornado.ioloop.IOLoop.current().start()
+
+    with _embedded_lock:
+        if _embedded is None:
+            _embedded = threading.Thread(target=run, name="json-api", daemon=True)
+            _embedded.start()
+            started.wait(timeout=5)
+    return _embedded
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Household JSON API")
+    parser.add_argument("--host", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    async def serve():
+        make_app().listen(args.port, address=args.host)
+        logger.info("JSON API listening on %s:%d", args.host, args.port)
+        await asyncio.Event().wait()
+
+    asyncio.run(serve())
+
+
+if __name__ == "__main__":
+    main()
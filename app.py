@@ -3,10 +3,21 @@ Household Management App - אפליקציית ניהול משק בית
 A mobile-first app for Talor and Romi to manage their shared household.
 """
 
+import json
+import os
+import time
 import streamlit as st
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+import autocomplete
 import database as db
-import streamlit.components.v1 as components
+import catcare
+import changefeed
+import ledger
+import notifications
+import render
+import tenancy
+import writequeue
 
 # Page config MUST be the first Streamlit command
 st.set_page_config(
@@ -16,9 +27,8 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
-# Initialize database
-db.init_database()
-db.auto_cleanup_old_items()
+# Databases are migrated lazily, per household, on first access (see tenancy.py).
+# One-time process setup lives in init_process() below; everything else here runs on every rerun.
 
 # --- CSS VARIABLES (Safe handling to avoid SyntaxErrors) ---
 APP_STYLE = """
@@ -49,6 +59,10 @@ APP_STYLE = """
         .custom-card:hover {
             transform: translateY(-3px);
         }
+        /* Cards rendered as one list (render.py) keep the gap separate elements had */
+        .custom-card + .custom-card {
+            margin-top: 1rem;
+        }
 
         /* Typography */
         .card-title { font-size: 18px; font-weight: 900; color: #333; margin: 0; line-height: 1.2;}
@@ -351,6 +365,8 @@ def set_auth_cookie():
         document.cookie = "household_auth=authenticated; max-age=2592000; path=/; SameSite=Lax";
     </script>
     """
+    # Only needed right after a PIN login, so not imported on every start
+    import streamlit.components.v1 as components
     components.html(js_code, height=0)
 
 def check_auth_cookie():
@@ -489,8 +505,6 @@ def login_screen():
     </div>
     """, unsafe_allow_html=True)
     
-    CORRECT_PIN = "151215"
-    
     # Password input
     pin_input = st.text_input(
         "קוד גישה",
@@ -504,16 +518,31 @@ def login_screen():
     col1, col2, col3 = st.columns([1, 2, 1])
     with col2:
         if st.button("🔓 כניסה", use_container_width=True, type="primary"):
-            if pin_input == CORRECT_PIN:
+            client = login_client()
+            household = tenancy.authenticate(pin_input, client)
+            retry_after = tenancy.pin_retry_after(client)
+            if household:
                 st.session_state['authenticated'] = True
+                st.session_state['household_id'] = household.id
                 st.session_state['set_cookie'] = True
                 st.toast("התחברת בהצלחה! 🔓", icon="✅")
                 st.rerun()
+            elif retry_after:
+                st.error(f"⏳ יותר מדי ניסיונות, נסה שוב בעוד {int(retry_after // 60) + 1} דקות")
             else:
                 st.error("❌ קוד שגוי, נסה שוב")
 
 
-def handle_pin_press(digit: str, correct_pin: str):
+def login_client() -> str:
+    """Who wrong PINs are counted against: the browser's address, else (on localhost) the session."""
+    ip_address = st.context.ip_address
+    if isinstance(ip_address, str) and ip_address:
+        return ip_address
+    run_ctx = get_script_run_ctx()
+    return run_ctx.session_id if run_ctx else ""
+
+
+def handle_pin_press(digit: str):
     """Handle PIN digit press with auto-submit on 6 digits."""
     st.session_state.pin_error = False
     
@@ -522,9 +551,11 @@ def handle_pin_press(digit: str, correct_pin: str):
         
         # Check if PIN is complete (6 digits)
         if len(st.session_state.pin_input) == 6:
-            if st.session_state.pin_input == correct_pin:
+            household = tenancy.authenticate(st.session_state.pin_input, login_client())
+            if household:
                 # Correct PIN - Login success!
                 st.session_state['authenticated'] = True
+                st.session_state['household_id'] = household.id
                 st.session_state['set_cookie'] = True  # Flag to set cookie
                 st.session_state.pin_input = ""
                 st.toast("התחברת בהצלחה! 🔓", icon="✅")
@@ -536,17 +567,157 @@ def handle_pin_press(digit: str, correct_pin: str):
         st.rerun()
 
 
-def main_app():
+# How often an open page checks whether another device changed its data (seconds)
+LIVE_SYNC_SECONDS = 2
+# Lists at least this long are drawn by the virtualized list component instead of one widget per row
+LONG_LIST_ROWS = 40
+
+# Alert banner colour per alert kind (see notifications.py)
+ALERT_COLORS = {"event": "#667eea", "chore": "#2ecc71", "cat": "#f39c12", "budget": "#e74c3c"}
+
+# Recurring expense frequencies as shown in the app
+RECURRING_LABELS = {db.RECURRING_MONTHLY: "חודש", db.RECURRING_WEEKLY: "שבוע"}
+# Chores with this sort_key or lower (urgent / high, see db.CHORE_SORT_KEYS) get the red marker
+URGENT_SORT_KEY = 2
+# Past purchases offered in the add-item dialog
+SUGGESTION_LIMIT = 300
+# Predicted-to-run-out items offered above the shopping list
+REPLENISH_LIMIT = 5
+SHOPPING_CATEGORIES = ["🥛 מוצרי חלב", "🥬 ירקות", "🍎 פירות", "🥩 בשר ודגים", "🍞 מאפים", "🧹 ניקיון", "🧴 טיפוח", "🏠 לבית", "🍬 מתוקים", "📦 אחר"]
+
+
+def long_list(rows, key, **kwargs):
+    """Render rows with virtual_list.virtual_list; returns (action, id) for a tap, or None."""
+    # Imported on first use - most lists never get this long
+    import virtual_list
+    return virtual_list.virtual_list(rows, key, **kwargs)
+
+
+def fill_usual_item(suggestions):
+    """Add-item dialog: prefill the usual category and quantity of a known item."""
+    usual = suggestions.lookup(st.session_state.get("dlg_shop_name") or "")
+    if usual is None:
+        return
+    st.session_state.dlg_shop_qty = usual.quantity
+    if usual.category in SHOPPING_CATEGORIES:
+        st.session_state.dlg_shop_cat = usual.category
+
+
+def describe_change(entry) -> str:
+    """One change_log entry as a line for the 'changes today' list."""
+    before = json.loads(entry['before']) if entry['before'] else {}
+    after = json.loads(entry['after']) if entry['after'] else {}
+    if entry['is_undo']:
+        verb = "בוטל"
+    elif entry['op'] == "INSERT":
+        verb = "נוסף"
+    elif entry['op'] == "DELETE":
+        verb = "נמחק לצמיתות"
+    elif after.get('is_deleted') == 1:
+        verb = "הועבר לסל"
+    elif after.get('is_deleted') == 0:
+        verb = "שוחזר"
+    else:
+        verb = "עודכן"
+    name = after.get(db.NAME_COLUMNS[entry['table_name']]) or before.get(db.NAME_COLUMNS[entry['table_name']]) or f"#{entry['row_id']}"
+    changed_at = datetime.fromisoformat(entry['changed_at']).replace(tzinfo=timezone.utc).astimezone()
+    return f"{changed_at:%H:%M} • {db.TABLE_LABELS[entry['table_name']]} • {name} • {verb}"
+
+
+def format_hours(hours: float) -> str:
+    """Hebrew duration for the cat care ETA, e.g. '5 שעות' / '2 ימים'."""
+    if hours < 1: return f"{max(int(hours * 60), 1)} דקות"
+    if hours < 48: return f"{int(hours)} שעות"
+    return f"{int(hours / 24)} ימים"
+
+
+@st.cache_resource(max_entries=64, show_spinner=False)
+def _read_cached(reader_name: str, db_path: str, version: int, args: tuple = ()):
+    """Result of a database.py reader, shared by all sessions until its table's version changes."""
+    with db.using_database(db_path):
+        return getattr(db, reader_name)(*args)
+
+
+@st.fragment(run_every=LIVE_SYNC_SECONDS)
+def live_sync(db_path, watched_tables):
+    """Rerun the page when another device changes a table shown on it."""
+    # Reads the shared in-memory versions only - no query per session
+    versions = changefeed.get_feed(db_path).versions()
+    current = {table: versions.get(table) for table in watched_tables}
+    if current != st.session_state.get('seen_versions'):
+        st.rerun()
+    # A queued write finished (or failed) - redraw without the optimistic overlay
+    if any(write['future'].done() for write in st.session_state.get('pending_writes', [])):
+        st.rerun()
+
+
+# --- WRITE-BEHIND TAPS ---
+# Taps are shown immediately from session state and written by the background writer
+
+def queue_write(db_path, table, row_id, changes, name, *args):
+    """Apply a tap optimistically in this session and hand db.<name>(*args) to the write queue."""
+    future = writequeue.get_queue().submit(db_path, name, *args)
+    st.session_state.pending_writes.append({"future": future, "table": table, "id": row_id, "changes": changes})
+
+
+def settle_pending_writes():
+    """Forget optimistic changes whose write has committed; report the ones that failed."""
+    still_pending = []
+    for write in st.session_state.pending_writes:
+        if not write['future'].done():
+            still_pending.append(write)
+        elif write['future'].exception():
+            st.toast(f"השמירה נכשלה: {write['future'].exception()}", icon="⚠️")
+    st.session_state.pending_writes = still_pending
+
+
+def with_pending(rows, table):
+    """Rows with this session's not-yet-written changes applied."""
+    changes = {}
+    for write in st.session_state.pending_writes:
+        if write['table'] == table:
+            changes.setdefault(write['id'], {}).update(write['changes'])
+    if not changes:
+        return rows
+    return [row._replace(**changes[row['id']]) if row['id'] in changes else row for row in rows]
+
+
+def with_pending_split(open_rows, closed_rows, table, field):
+    """(open, closed) with pending changes applied; a pending tap can move a row to the other side."""
+    if not any(write['table'] == table for write in st.session_state.pending_writes):
+        return open_rows, closed_rows
+    rows = [*with_pending(open_rows, table), *with_pending(closed_rows, table)]
+    return [row for row in rows if not row[field]], [row for row in rows if row[field]]
+
+
+def main_app(household):
     """The Main Application Logic."""
     # Initialize session state
     if 'delete_confirm' not in st.session_state:
         st.session_state.delete_confirm = {}
-    
-    # Get counts for navigation badges
-    overdue_cat_tasks = db.get_overdue_cat_tasks()
-    urgent_events_count = db.get_urgent_events_count()
-    overdue_cat_count = len(overdue_cat_tasks) if overdue_cat_tasks else 0
-    
+    if 'pending_writes' not in st.session_state:
+        st.session_state.pending_writes = []
+
+    # Open this household's database (migrated on first use) and point database.py at it
+    handle = tenancy.activate(household)
+    db_path = str(handle.db_path)
+    members = household.members
+    handle.cleanup_if_due()
+    # Recurring expenses due by today become real expenses before the versions are read
+    db.materialize_recurring()
+
+    # --- LIVE DATA VERSIONS ---
+    # Settle queued taps first, so anything already committed is picked up by the poll below
+    settle_pending_writes()
+    # Catch up on commits (ours or another phone's) before reading anything
+    feed = handle.feed
+    feed.poll()
+    versions = feed.versions()
+
+    def cached(reader, table, *args):
+        """Read through the shared cache; only tables whose version moved are re-queried."""
+        return _read_cached(reader.__name__, db_path, versions.get(table), args)
+
     # --- NAVIGATION CONFIG ---
     TAB_EXPENSES = "expenses"
     TAB_SHOPPING = "shopping"
@@ -556,9 +727,35 @@ def main_app():
 
     TABS = [TAB_EXPENSES, TAB_SHOPPING, TAB_CHORES, TAB_EVENTS, TAB_CAT]
 
+    # Tables each tab renders; the alerts banner reads events, chores and cat care on every tab
+    TAB_TABLES = {
+        TAB_EXPENSES: ["expenses", "recurring_expenses", "budgets", "settlements"],
+        TAB_SHOPPING: ["shopping_items"],
+        TAB_CHORES: ["chores"],
+        TAB_EVENTS: ["events"],
+        TAB_CAT: ["cat_care"],
+    }
+    BANNER_TABLES = ["events", "chores", "cat_care"]
+
     if 'active_tab' not in st.session_state:
         st.session_state.active_tab = TAB_EXPENSES
 
+    watched_tables = sorted(set(TAB_TABLES[st.session_state.active_tab] + BANNER_TABLES))
+    st.session_state.seen_versions = {table: versions.get(table) for table in watched_tables}
+
+    # Active alerts come from the in-memory trigger queue, not a table scan
+    alerts = notifications.get_engine(db_path).active_alerts()
+    # The expenses tab adds over-budget categories, from the month totals (no expense scan)
+    this_month = datetime.now().strftime("%Y-%m")
+    if st.session_state.active_tab == TAB_EXPENSES:
+        budgets = cached(db.get_budgets, "budgets")
+        month_totals = cached(db.get_month_totals, "expenses", this_month)
+        alerts += notifications.budget_alerts(budgets, month_totals)
+
+    # Get counts for navigation badges (cached per events version and day; cat care from its scheduler heap)
+    urgent_events_count = cached(db.get_urgent_events_count, "events", datetime.now().date().isoformat())
+    overdue_cat_count = catcare.get_scheduler(db_path).overdue_count()
+
     def get_tab_label(key):
         if key == TAB_EXPENSES: return "💰 הוצאות"
         elif key == TAB_SHOPPING: return "🛒 קניות"
@@ -568,7 +765,7 @@ def main_app():
         return key
 
     # --- CLICKABLE LOGO WITH NAVIGATION POPOVER ---
-    with st.popover("🏠\n\nמשק הבית שלנו\n\nטלאור ורומי ❤️", use_container_width=True):
+    with st.popover(f"🏠\n\n{household.title}\n\n{household.members_label} ❤️", use_container_width=True):
         st.markdown("### 📂 בחר עמוד")
         for tab in TABS:
             if st.button(get_tab_label(tab), key=f"nav_{tab}", use_container_width=True, 
@@ -584,63 +781,12 @@ def main_app():
             st.rerun()
 
     # Show current tab indicator (minimal spacing)
-    st.markdown(f"""
-    <div style="text-align: center; color: #667eea; font-weight: 600; margin: 5px 0; padding: 0;">
-        {get_tab_label(st.session_state.active_tab)}
-    </div>
-    """, unsafe_allow_html=True)
+    st.markdown(render.render("tab_indicator", label=get_tab_label(st.session_state.active_tab)), unsafe_allow_html=True)
 
     # --- GLOBAL NOTIFICATIONS (Show on all pages) ---
-    now = datetime.now()
-    today_str = now.date().isoformat()
-    current_time_str = now.strftime("%H:%M")
-    
-    # Collect all alerts
-    alerts = []
-    
-    # 1. Events Today
-    all_events = db.get_all_events()
-    for ev in all_events:
-        try:
-            if ev['date'] == today_str:
-                if not ev['time'] or ev['time'] > current_time_str:
-                    time_part = f" ב-{ev['time']}" if ev['time'] else ""
-                    alerts.append(("📅", f"אירוע היום: {ev['title']}{time_part}", "event"))
-        except: pass
-    
-    # 2. Chores Due Today
-    all_chores = db.get_all_chores()
-    for ch in all_chores:
-        try:
-            if not ch['done'] and ch['due_date'] == today_str:
-                alerts.append(("✅", f"משימה להיום: {ch['name']}", "chore"))
-        except: pass
-    
-    # 3. Overdue Cat Tasks
-    for task in overdue_cat_tasks:
-        alerts.append(("🐱", f"{task['task_name']} דורש טיפול!", "cat"))
-    
-    # Show notifications as styled banner
+    # Events today, chores due today, overdue cat tasks and budgets (see notifications.py)
     if alerts:
-        notification_items = ""
-        for emoji, text, alert_type in alerts:
-            color = "#667eea" if alert_type == "event" else "#2ecc71" if alert_type == "chore" else "#f39c12"
-            notification_items += f'<div style="padding: 8px 12px; margin: 5px 0; background: {color}; border-radius: 10px; color: white; font-size: 14px;">{emoji} {text}</div>'
-        
-        st.markdown(f"""
-        <div style="
-            background: linear-gradient(135deg, rgba(102, 126, 234, 0.1) 0%, rgba(118, 75, 162, 0.1) 100%);
-            border-radius: 15px;
-            padding: 15px;
-            margin-bottom: 15px;
-            border: 1px solid rgba(102, 126, 234, 0.2);
-        ">
-            <div style="font-weight: 700; color: #667eea; margin-bottom: 10px; font-size: 16px;">
-                🔔 התראות ({len(alerts)})
-            </div>
-            {notification_items}
-        </div>
-        """, unsafe_allow_html=True)
+        st.markdown(render.render("alerts_banner", alerts=alerts, colors=ALERT_COLORS), unsafe_allow_html=True)
     else:
         # No alerts - show a small "all clear" message
         st.markdown("""
@@ -667,8 +813,16 @@ def main_app():
             amount_str = st.text_input("סכום (₪)", key="dlg_exp_amount", placeholder="הזן סכום...")
             description = st.text_input("תיאור", key="dlg_exp_desc")
             col1, col2 = st.columns(2)
-            with col1: payer = st.radio("מי שילם?", ["טלאור", "רומי"], horizontal=True, key="dlg_exp_payer")
-            with col2: split = st.radio("חלוקה", ["שווה בשווה", "מלא עליי", "מלא עליו/ה"], horizontal=True, key="dlg_exp_split")
+            with col1: payer = st.radio("מי שילם?", list(members), horizontal=True, key="dlg_exp_payer")
+            with col2: split = st.radio("חלוקה", [db.SPLIT_EQUAL, db.SPLIT_PAYER_ONLY, db.SPLIT_OTHERS_ONLY], horizontal=True, key="dlg_exp_split")
+            category = st.selectbox("קטגוריה", db.EXPENSE_CATEGORIES, key="dlg_exp_cat",
+                                    index=db.EXPENSE_CATEGORIES.index(db.DEFAULT_EXPENSE_CATEGORY))
+            recurring = st.checkbox("🔁 הוצאה קבועה", key="dlg_exp_recurring")
+            if recurring:
+                col1, col2 = st.columns(2)
+                with col1: frequency = st.selectbox("כל", list(RECURRING_LABELS), format_func=RECURRING_LABELS.get,
+                                                    key="dlg_exp_frequency")
+                with col2: start_date = st.date_input("החל מ", key="dlg_exp_start")
             
             # Convert amount string to float
             try:
@@ -677,17 +831,13 @@ def main_app():
                 amount = 0.0
             
             if st.button("💾 שמור", type="primary", use_container_width=True):
-                if amount > 0 and description:
-                    t_share, r_share = 0.0, 0.0
-                    if split == "שווה בשווה":
-                        t_share = amount / 2; r_share = amount / 2
-                    elif split == "מלא עליי":
-                        if payer == "טלאור": t_share = amount; r_share = 0
-                        else: r_share = amount; t_share = 0
-                    else:
-                        if payer == "טלאור": t_share = 0; r_share = amount
-                        else: r_share = 0; t_share = amount
-                    db.add_expense(amount, description, payer, split, t_share, r_share)
+                if amount > 0 and description and recurring:
+                    db.add_recurring_expense(amount, description, payer, split, frequency, start_date.isoformat(), category)
+                    st.success("נוסף בהצלחה!")
+                    st.rerun()
+                elif amount > 0 and description:
+                    shares = db.compute_shares(amount, payer, split, members)
+                    db.add_expense(amount, description, payer, split, shares, category)
                     st.success("נוסף בהצלחה!")
                     st.rerun()
                 else:
@@ -695,10 +845,14 @@ def main_app():
         
         elif active == TAB_SHOPPING:
             st.subheader("🛒 הוסף פריט לקניות")
-            new_item = st.text_input("שם הפריט", key="dlg_shop_name")
+            # Past purchases, most frequent and recent first; anything new can still be typed
+            suggestions = autocomplete.get_index(db_path)
+            new_item = st.selectbox("שם הפריט", [s.name for s in suggestions.suggest(limit=SUGGESTION_LIMIT)],
+                                    index=None, accept_new_options=True, placeholder="הקלד או בחר...",
+                                    key="dlg_shop_name", on_change=fill_usual_item, args=(suggestions,))
             col1, col2 = st.columns(2)
             with col1: item_qty = st.text_input("כמות", value="1", key="dlg_shop_qty")
-            with col2: item_cat = st.selectbox("קטגוריה", ["🥛 מוצרי חלב", "🥬 ירקות", "🍎 פירות", "🥩 בשר ודגים", "🍞 מאפים", "🧹 ניקיון", "🧴 טיפוח", "🏠 לבית", "🍬 מתוקים", "📦 אחר"], key="dlg_shop_cat")
+            with col2: item_cat = st.selectbox("קטגוריה", SHOPPING_CATEGORIES, key="dlg_shop_cat")
             
             if st.button("💾 שמור", type="primary", use_container_width=True):
                 if new_item:
@@ -793,87 +947,217 @@ def main_app():
     if st.session_state.active_tab == TAB_EXPENSES:
         st.header("הוצאות")
         
-        # Calculate Balance - Absolute display
-        raw_balance = db.calculate_balance()
-        # raw_balance > 0 means Talor paid more (Romi owes Talor)
-        # raw_balance < 0 means Romi paid more (Talor owes Romi)
+        # Settle-up: fewest transfers that bring everyone to zero (from the maintained balances)
+        balances = cached(db.get_participant_balances, "expenses")
+        transfers = ledger.minimal_transfers(balances)
         
         # Determine Status
         status_title = "הכל מאוזן ✅"
         amount_display = "₪0"
         card_bg = "linear-gradient(135deg, #667eea 0%, #764ba2 100%)"
+        extra_lines = []
         
-        if abs(raw_balance) >= 0.01:
-            if raw_balance > 0:
-                # Talor paid more - Romi owes Talor
-                status_title = "רומי חייבת לטלאור"
-                amount_display = f"₪{raw_balance:.2f}"
-                card_bg = "linear-gradient(135deg, #2ecc71 0%, #27ae60 100%)"
-            else:
-                # Romi paid more - Talor owes Romi
-                status_title = "טלאור חייב לרומי"
-                amount_display = f"₪{abs(raw_balance):.2f}"
-                card_bg = "linear-gradient(135deg, #e74c3c 0%, #c0392b 100%)"
+        if transfers:
+            first = transfers[0]
+            status_title = f"{first.debtor} חייב/ת ל{first.creditor}"
+            amount_display = f"₪{first.amount:.2f}"
+            # Green when the first member is owed, red when they owe
+            card_bg = ("linear-gradient(135deg, #2ecc71 0%, #27ae60 100%)" if first.creditor == members[0]
+                       else "linear-gradient(135deg, #e74c3c 0%, #c0392b 100%)")
+            extra_lines = [f"{t.debtor} חייב/ת ל{t.creditor} ₪{t.amount:.2f}" for t in transfers[1:]]
 
         # Render Balance Card
-        balance_html = f"""
-            <div style="background: {card_bg}; color: white; padding: 30px; border-radius: 25px; text-align: center; box-shadow: 0 15px 30px rgba(0,0,0,0.2); margin-bottom: 30px; position: relative; overflow: hidden;">
-                <div style="font-size: 1.2rem; opacity: 0.9;">{status_title}</div>
-                <div style="font-size: 3.5rem; font-weight: 900;">{amount_display}</div>
-            </div>
-        """
-        st.markdown(balance_html, unsafe_allow_html=True)
-        
-        
+        st.markdown(render.render("balance_summary", background=card_bg, title=status_title, amount=amount_display,
+                                  extra_lines=extra_lines), unsafe_allow_html=True)
+
+        # Settle up: the expenses so far move to the archive and the balances start from zero
+        if cached(db.get_all_expenses, "expenses"):
+            with st.popover("🤝 סגירת חשבון", use_container_width=True):
+                st.caption("כל ההוצאות עד עכשיו יעברו לארכיון והמאזן יתאפס")
+                if st.button("סגור חשבון", key="settle_up", type="primary", use_container_width=True):
+                    db.settle_up()
+                    st.toast("החשבון נסגר ✅")
+                    st.rerun()
+
+        # Bank / card statement import, deduplicated against earlier imports
+        with st.expander("📥 ייבוא מקובץ CSV", expanded=False):
+            import importer
+            statement_file = st.file_uploader("קובץ תנועות (CSV)", type=["csv"], key="import_file")
+            if statement_file is not None:
+                header = importer.read_header(statement_file)
+                guessed = importer.guess_mapping(header)
+                columns = ["—"] + header
+                field_labels = {"amount": "סכום", "description": "תיאור", "date": "תאריך",
+                                "payer": "משלם", "split_type": "חלוקה"}
+                mapping = {}
+                map_cols = st.columns(len(field_labels))
+                for col, (field, label) in zip(map_cols, field_labels.items()):
+                    with col:
+                        chosen = st.selectbox(label, columns, key=f"import_map_{field}",
+                                              index=columns.index(guessed[field]) if field in guessed else 0)
+                    if chosen != "—":
+                        mapping[field] = chosen
+                col1, col2 = st.columns(2)
+                with col1: import_payer = st.radio("משלם ברירת מחדל", list(members), horizontal=True, key="import_payer")
+                with col2: import_split = st.selectbox("חלוקה", [db.SPLIT_EQUAL, db.SPLIT_PAYER_ONLY, db.SPLIT_OTHERS_ONLY],
+                                                       key="import_split")
+                import_category = st.selectbox("קטגוריה", db.EXPENSE_CATEGORIES, key="import_category",
+                                               index=db.EXPENSE_CATEGORIES.index(db.DEFAULT_EXPENSE_CATEGORY))
+                negate = st.checkbox("חיובים מופיעים כמספרים שליליים", key="import_negate")
+                try:
+                    statement = importer.ExpenseImport(statement_file, mapping, members, import_payer, import_split,
+                                                       negate, import_category)
+                except ValueError:
+                    st.warning("יש לבחור עמודת סכום ועמודת תיאור")
+                else:
+                    first, new, duplicates = statement.preview()
+                    if first:
+                        st.dataframe(
+                            [{"תאריך": row.created_at[:10] if row.created_at else "", "סכום": row.amount,
+                              "תיאור": row.description, "שולם ע\"י": row.payer,
+                              "מצב": "כבר יובא" if duplicate else "חדש"} for row, duplicate in first],
+                            hide_index=True, use_container_width=True
+                        )
+                    st.caption(f"{new} חדשות • {duplicates} כבר יובאו • {len(statement.skipped)} שורות לא נקראו")
+                    if st.button(f"ייבא {new} הוצאות", key="import_run", type="primary", disabled=not new,
+                                 use_container_width=True):
+                        result = statement.run()
+                        st.toast(f"יובאו {result.imported} הוצאות ✅")
+                        st.rerun()
+
+        # This month's spending per category against its budget (all from expense_month_totals)
+        with st.expander(f"📊 תקציב החודש ({datetime.now():%m/%Y})", expanded=bool(budgets)):
+            edit_budgets = st.session_state.get('edit_mode', False)
+            shown = [c for c in db.EXPENSE_CATEGORIES if c in budgets or c in month_totals or edit_budgets]
+            shown += [c for c in (*budgets, *month_totals) if c not in shown]
+            if not shown:
+                st.caption("אין הוצאות החודש")
+            for category in shown:
+                spent = month_totals.get(category, 0.0)
+                limit = budgets.get(category)
+                if limit:
+                    st.progress(min(spent / limit, 1.0),
+                                text=f"{category} • ₪{spent:,.0f} מתוך ₪{limit:,.0f}{' ⚠️' if spent > limit else ''}")
+                else:
+                    st.caption(f"{category} • ₪{spent:,.0f}")
+                if edit_budgets:
+                    new_limit = st.number_input(f"תקציב חודשי ל{category}", value=float(limit or 0), min_value=0.0,
+                                                step=100.0, key=f"budget_{category}")
+                    if new_limit != float(limit or 0):
+                        db.set_budget(category, new_limit)
+                        st.rerun()
+
+        # Recurring expense templates (rent, bills, subscriptions)
+        templates = cached(db.get_recurring_expenses, "recurring_expenses")
+        if templates:
+            with st.expander(f"🔁 הוצאות קבועות ({len(templates)})", expanded=False):
+                for template in templates:
+                    next_due = datetime.fromisoformat(template['next_due'])
+                    line = (f"**{template['description']}** • ₪{float(template['amount']):.0f} כל "
+                            f"{RECURRING_LABELS.get(template['frequency'], template['frequency'])} • "
+                            f"שולם ע\"י {template['payer']} • הבא: {next_due:%d/%m/%Y}")
+                    if st.session_state.get('edit_mode', False):
+                        col1, col2, col3 = st.columns([0.6, 0.25, 0.15])
+                        with col1: st.markdown(line)
+                        with col2:
+                            new_amount = st.number_input("סכום", value=float(template['amount']), min_value=0.0, step=10.0,
+                                                         key=f"ed_rec_{template['id']}", label_visibility="collapsed")
+                            if new_amount != float(template['amount']) and new_amount > 0:
+                                db.edit_recurring_expense(template['id'], amount=new_amount)
+                                st.rerun()
+                        with col3:
+                            if st.button("🗑️", key=f"del_rec_{template['id']}", help="הפסק (ההוצאות שכבר נוצרו נשארות)"):
+                                db.delete_recurring_expense(template['id'])
+                                st.rerun()
+                    else:
+                        st.markdown(line)
+
+        # Past settle-ups and who paid whom to close each one
+        settlements = cached(db.get_settlements, "settlements")
+        if settlements:
+            with st.expander(f"🗄️ התחשבנויות קודמות ({len(settlements)})", expanded=False):
+                for settlement in settlements:
+                    settled_at = datetime.fromisoformat(settlement['settled_at']).replace(tzinfo=timezone.utc).astimezone()
+                    st.markdown(f"**{settled_at:%d/%m/%Y}** • {settlement['expense_count']} הוצאות • "
+                                f"₪{settlement['total']:,.0f}")
+                    settled = ledger.minimal_transfers(json.loads(settlement['balances']))
+                    st.caption(" • ".join(f"{t.debtor} העביר/ה ל{t.creditor} ₪{t.amount:.2f}" for t in settled) or "הכל היה מאוזן")
+
         # Recent Expenses List
         st.subheader("פירוט אחרון")
-        expenses = db.get_all_expenses()
-        if expenses:
+        expenses = cached(db.get_all_expenses, "expenses")
+        if len(expenses) >= LONG_LIST_ROWS:
+            tap = long_list(
+                [(ex['id'], f"₪{float(ex['amount']):.0f} • {'🔁 ' if ex['recurring_id'] else ''}{ex['description']}",
+                  f"{datetime.fromisoformat(ex['created_at']):%d/%m/%Y • %H:%M} • {ex['category']} • שולם ע\"י {ex['payer']}", "#3498db", False)
+                 for ex in expenses],
+                "vl_expenses",
+                buttons=[("delete", "🗑️", "מחק")] if st.session_state.get('edit_mode', False) else (),
+            )
+            if tap:
+                db.delete_expense(tap[1])
+                st.rerun()
+        elif expenses and not st.session_state.get('edit_mode', False):
+            # No per-row widgets: the whole list is one markdown element
+            st.markdown(render.render_list("expense_list", expenses), unsafe_allow_html=True)
+        elif expenses:
             for ex in expenses:
-                created_dt = datetime.fromisoformat(ex['created_at'])
-                date_str = created_dt.strftime("%d/%m/%Y")
-                time_str = created_dt.strftime("%H:%M")
-                
-                # Build the HTML card
-                html_card = f"""
-                <div class="custom-card border-blue" style="padding: 15px;">
-                    <div class="card-price" style="color: #3498db; float: left;">₪{float(ex['amount']):.0f}</div>
-                    <div class="card-title" style="margin-right: 0;">{ex['description']}</div>
-                    <div class="card-sub">{date_str} • {time_str} • שולם ע"י {ex['payer']}</div>
-                    <div style="clear: both;"></div>
-                </div>
-                """
-                
-                if st.session_state.get('edit_mode', False):
-                    # EDIT MODE ON: Show Card + Delete Button
-                    col1, col2 = st.columns([0.85, 0.15])
-                    with col1:
-                        st.markdown(html_card, unsafe_allow_html=True)
-                    with col2:
-                        st.write("")
-                        st.write("")
-                        with st.popover("🗑️", use_container_width=True):
-                            st.write("למחוק?")
-                            if st.button("מחק", key=f"del_ex_{ex['id']}", type="primary"):
-                                db.delete_expense(ex['id'])
-                                st.rerun()
-                else:
-                    # EDIT MODE OFF: Show Card ONLY (No columns needed)
-                    st.markdown(html_card, unsafe_allow_html=True)
+                # EDIT MODE ON: Show Card + Delete Button
+                col1, col2 = st.columns([0.85, 0.15])
+                with col1:
+                    st.markdown(render.render("expense_card", row=ex), unsafe_allow_html=True)
+                with col2:
+                    st.write("")
+                    st.write("")
+                    with st.popover("🗑️", use_container_width=True):
+                        st.write("למחוק?")
+                        if st.button("מחק", key=f"del_ex_{ex['id']}", type="primary"):
+                            db.delete_expense(ex['id'])
+                            st.rerun()
 
     # ================== SHOPPING LIST TAB ==================
     elif st.session_state.active_tab == TAB_SHOPPING:
         st.header("רשימת קניות 🛒")
         
         
-        items = db.get_all_shopping_items()
-        if not items:
+        # Split by SQL, so the session never holds a second copy of the list
+        active, bought = with_pending_split(
+            cached(db.get_all_shopping_items, "shopping_items", False),
+            cached(db.get_all_shopping_items, "shopping_items", True),
+            "shopping_items", "bought"
+        )
+
+        # Staples that usually run out about now, one tap to add
+        import replenish
+        due_soon = replenish.get_model(db_path).due_items(exclude=[item['name'] for item in (*active, *bought)])
+        if due_soon:
+            st.markdown("##### 💡 כנראה נגמר בקרוב")
+            for prediction in due_soon[:REPLENISH_LIMIT]:
+                if st.button(f"➕ {prediction.name} ({prediction.quantity})", key=f"replenish_{prediction.name}",
+                             use_container_width=True):
+                    db.add_shopping_item(prediction.name, prediction.category or "📦 אחר", prediction.quantity)
+                    st.rerun()
+
+        if not active and not bought:
             st.info("הרשימה ריקה. הוסף פריטים! 📝")
         else:
-            active = [i for i in items if not i['bought']]
-            bought = [i for i in items if i['bought']]
             
-            if active:
+            if len(active) >= LONG_LIST_ROWS:
+                edit_mode = st.session_state.get('edit_mode')
+                tap = long_list(
+                    [(item['id'], f"{item['name']} ({item['quantity']})", item['category'], "#2ecc71", False) for item in active],
+                    "vl_shopping",
+                    row_action=None if edit_mode else "buy",
+                    buttons=[("delete", "🗑️", "מחק")] if edit_mode else (),
+                )
+                if tap:
+                    action, item_id = tap
+                    if action == "buy":
+                        queue_write(db_path, "shopping_items", item_id, {"bought": 1}, "update_shopping_item", item_id, True)
+                    else:
+                        db.delete_shopping_item(item_id)
+                    st.rerun()
+            elif active:
                 categories = {}
                 for item in active:
                     cat = item['category']
@@ -887,14 +1171,7 @@ def main_app():
                             # Edit mode: show card + delete button
                             col1, col2 = st.columns([0.85, 0.15])
                             with col1:
-                                html_card = f"""
-                                <div class="custom-card border-green" style="padding: 15px; margin-bottom: 5px;">
-                                    <div class="card-title" style="font-size: 16px;">{item['name']} 
-                                        <span style="color:#2ecc71; font-weight:400;">({item['quantity']})</span>
-                                    </div>
-                                </div>
-                                """
-                                st.markdown(html_card, unsafe_allow_html=True)
+                                st.markdown(render.render("shopping_card", row=item), unsafe_allow_html=True)
                             with col2:
                                 with st.popover("🗑️"):
                                     if st.button("מחק", key=f"del_shop_{item['id']}", type="primary"):
@@ -903,7 +1180,7 @@ def main_app():
                         else:
                             # Normal mode: clicking the item marks it as bought
                             if st.button(f"🛒 {item['name']} ({item['quantity']})", key=f"buy_{item['id']}", use_container_width=True):
-                                db.update_shopping_item(item['id'], bought=True)
+                                queue_write(db_path, "shopping_items", item['id'], {"bought": 1}, "update_shopping_item", item['id'], True)
                                 st.rerun()
                         st.write("") 
             else:
@@ -914,16 +1191,23 @@ def main_app():
                 if st.button("נקה סל (מחק שנקנו)", use_container_width=True):
                     db.clear_bought_items()
                     st.rerun()
-                for item in bought:
-                    col1, col2 = st.columns([0.8, 0.2])
-                    with col1: st.markdown(f"~~{item['name']}~~")
-                    with col2:
-                        if st.button("↩️", key=f"ret_{item['id']}"):
-                            db.update_shopping_item(item['id'], bought=False)
-                            st.rerun()
+                if len(bought) >= LONG_LIST_ROWS:
+                    tap = long_list([(item['id'], item['name'], None, "#95a5a6", True) for item in bought],
+                                    "vl_shopping_bought", buttons=[("return", "↩️", None)])
+                    if tap:
+                        queue_write(db_path, "shopping_items", tap[1], {"bought": 0}, "update_shopping_item", tap[1], False)
+                        st.rerun()
+                else:
+                    for item in bought:
+                        col1, col2 = st.columns([0.8, 0.2])
+                        with col1: st.markdown(f"~~{item['name']}~~")
+                        with col2:
+                            if st.button("↩️", key=f"ret_{item['id']}"):
+                                queue_write(db_path, "shopping_items", item['id'], {"bought": 0}, "update_shopping_item", item['id'], False)
+                                st.rerun()
         
         with st.expander("📦 היסטוריה", expanded=False):
-            archive = db.get_archive_shopping()
+            archive = cached(db.get_archive_shopping, "shopping_items")
             if archive:
                 for item in archive[:10]: st.caption(f"{item['name']} • {item['action']}")
 
@@ -932,10 +1216,11 @@ def main_app():
         st.header("משימות בית ✅")
         
         
-        chores = db.get_all_chores()
-        
-        active_chores = [c for c in chores if not c['done']]
-        done_chores = [c for c in chores if c['done']]
+        active_chores, done_chores = with_pending_split(
+            cached(db.get_all_chores, "chores", False),
+            cached(db.get_all_chores, "chores", True),
+            "chores", "done"
+        )
 
         if not active_chores:
             if not done_chores:
@@ -944,55 +1229,82 @@ def main_app():
                 st.success("אין משימות פתוחות! כל הכבוד! 🎉")
         else:
             st.subheader("משימות פתוחות")
-            for chore in active_chores:
-                with st.container():
-                    accent_class = "border-blue"
-                    if chore['priority']:
-                        if "🔴" in chore['priority']: accent_class = "border-orange"
-                    
-                    priority_emoji = "🔴" if chore['priority'] and "🔴" in chore['priority'] else "🔵"
-                    due_text = chore['due_date'] or 'ללא תאריך'
-                    
-                    if st.session_state.get('edit_mode'):
-                        # Edit mode: show card + delete button
-                        col1, col2 = st.columns([0.85, 0.15])
-                        with col1:
-                            html_card = f"""
-                                <div class="custom-card {accent_class}">
-                                    <div class="card-title">{chore['name']}</div>
-                                    <div class="card-sub">📅 {due_text} • {priority_emoji}</div>
-                                </div>
-                            """
-                            st.markdown(html_card, unsafe_allow_html=True)
-                        with col2:
-                            st.write("")
-                            st.write("")
-                            with st.popover("🗑️", use_container_width=True):
-                                st.write("למחוק?")
-                                if st.button("מחק", key=f"del_chore_{chore['id']}", type="primary"):
-                                    db.delete_chore(chore['id'])
-                                    st.rerun()
+            if len(active_chores) >= LONG_LIST_ROWS:
+                edit_mode = st.session_state.get('edit_mode')
+                tap = long_list(
+                    [(chore['id'], chore['name'],
+                      f"📅 {chore['due_date'] or 'ללא תאריך'} • {'🔴' if chore['sort_key'] <= URGENT_SORT_KEY else '🔵'}",
+                      "#f39c12" if chore['sort_key'] <= URGENT_SORT_KEY else "#3498db", False)
+                     for chore in active_chores],
+                    "vl_chores",
+                    row_action=None if edit_mode else "done",
+                    buttons=[("delete", "🗑️", "מחק")] if edit_mode else (),
+                )
+                if tap:
+                    action, chore_id = tap
+                    if action == "done":
+                        done_at = datetime.now().isoformat()
+                        queue_write(db_path, "chores", chore_id, {"done": 1, "done_by": "מישהו", "done_at": done_at},
+                                    "mark_chore_done", chore_id, "מישהו", done_at)
                     else:
-                        # Normal mode: clicking the task marks it as done
-                        if st.button(f"{priority_emoji} {chore['name']} (📅 {due_text})", key=f"do_chore_{chore['id']}", use_container_width=True):
-                            db.mark_chore_done(chore['id'], "מישהו")
-                            st.rerun()
-                    st.write("")
+                        db.delete_chore(chore_id)
+                    st.rerun()
+            else:
+                for chore in active_chores:
+                    with st.container():
+                        is_urgent = chore['sort_key'] <= URGENT_SORT_KEY
+                        priority_emoji = "🔴" if is_urgent else "🔵"
+                        due_text = chore['due_date'] or 'ללא תאריך'
+                    
+                        if st.session_state.get('edit_mode'):
+                            # Edit mode: show card + delete button
+                            col1, col2 = st.columns([0.85, 0.15])
+                            with col1:
+                                st.markdown(render.render("chore_card", row=chore, urgent=is_urgent), unsafe_allow_html=True)
+                            with col2:
+                                st.write("")
+                                st.write("")
+                                with st.popover("🗑️", use_container_width=True):
+                                    st.write("למחוק?")
+                                    if st.button("מחק", key=f"del_chore_{chore['id']}", type="primary"):
+                                        db.delete_chore(chore['id'])
+                                        st.rerun()
+                        else:
+                            # Normal mode: clicking the task marks it as done
+                            if st.button(f"{priority_emoji} {chore['name']} (📅 {due_text})", key=f"do_chore_{chore['id']}", use_container_width=True):
+                                done_at = datetime.now().isoformat()
+                                queue_write(db_path, "chores", chore['id'], {"done": 1, "done_by": "מישהו", "done_at": done_at},
+                                            "mark_chore_done", chore['id'], "מישהו", done_at)
+                                st.rerun()
+                        st.write("")
 
         if done_chores:
             st.subheader("משימות שבוצעו")
-            for chore in done_chores:
-                with st.container():
-                    col1, col2 = st.columns([0.75, 0.25])
-                    with col1:
-                        st.markdown(f"<s style='color: #888;'>{chore['name']}</s>", unsafe_allow_html=True)
-                        if chore['done_by']:
-                            st.caption(f"בוצע ע״י {chore['done_by']}")
-                    with col2:
-                        if st.button("↩️ החזר", key=f"undo_chore_{chore['id']}", use_container_width=True):
-                            db.mark_chore_undone(chore['id'])
-                            st.rerun()
-                st.divider()
+            if len(done_chores) >= LONG_LIST_ROWS:
+                tap = long_list(
+                    [(chore['id'], chore['name'], f"בוצע ע״י {chore['done_by']}" if chore['done_by'] else None, "#95a5a6", True)
+                     for chore in done_chores],
+                    "vl_chores_done",
+                    buttons=[("undo", "↩️ החזר", None)],
+                )
+                if tap:
+                    queue_write(db_path, "chores", tap[1], {"done": 0, "done_by": None, "done_at": None},
+                                "mark_chore_undone", tap[1])
+                    st.rerun()
+            else:
+                for chore in done_chores:
+                    with st.container():
+                        col1, col2 = st.columns([0.75, 0.25])
+                        with col1:
+                            st.markdown(render.render("struck_text", text=chore['name']), unsafe_allow_html=True)
+                            if chore['done_by']:
+                                st.caption(f"בוצע ע״י {chore['done_by']}")
+                        with col2:
+                            if st.button("↩️ החזר", key=f"undo_chore_{chore['id']}", use_container_width=True):
+                                queue_write(db_path, "chores", chore['id'], {"done": 0, "done_by": None, "done_at": None},
+                                            "mark_chore_undone", chore['id'])
+                                st.rerun()
+                    st.divider()
 
     # ================== EVENTS TAB ==================
     elif st.session_state.active_tab == TAB_EVENTS:
@@ -1018,90 +1330,56 @@ def main_app():
                 else:
                     st.warning("נא להזין כותרת ותאריך")
 
-        all_events = db.get_all_events()
-        upcoming_events = []
-        past_events = []
-        now = datetime.now()
-
-        for ev in all_events:
-            try:
-                ev_date = datetime.fromisoformat(ev['date']).date()
-                if ev['time']:
-                    ev_time_obj = datetime.strptime(ev['time'], "%H:%M").time()
-                else:
-                    ev_time_obj = datetime.min.time()
-                
-                ev_datetime = datetime.combine(ev_date, ev_time_obj)
-                
-                if ev_datetime < now:
-                     past_events.append(ev)
-                else:
-                     upcoming_events.append(ev)
-
-            except ValueError:
-                upcoming_events.append(ev)
+        # Split at the current minute by SQL; the cache key moves on once a minute
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:00")
+        upcoming_events = cached(db.get_all_events, "events", False, now)
+        past_events = cached(db.get_all_events, "events", True, now)
 
         st.subheader(f"אירועים קרובים ({len(upcoming_events)})")
-        if upcoming_events:
+        if upcoming_events and not st.session_state.get('edit_mode', False):
+            # No per-row widgets: the whole list is one markdown element
+            st.markdown(render.render_list("event_list", upcoming_events), unsafe_allow_html=True)
+        elif upcoming_events:
             for ev in upcoming_events:
-                # Build the HTML card
-                meta_parts = [f"📅 {ev['date']}"]
-                if ev['time']: meta_parts.append(f"⏰ {ev['time']}")
-                
-                html_card = f"""
-                    <div class="custom-card border-green">
-                        <div class="card-title">{ev['title']}</div>
-                        <div class="card-sub">{' • '.join(meta_parts)}</div>
-                        <div class="card-sub" style="font-size: 13px;">{ev['description'] or ''}</div>
-                    </div>
-                """
-                
-                if st.session_state.get('edit_mode', False):
-                    # EDIT MODE ON: Show Card + Delete Button
-                    col1, col2 = st.columns([0.8, 0.2])
-                    with col1:
-                        st.markdown(html_card, unsafe_allow_html=True)
-                    with col2:
-                        st.write("") 
-                        st.write("") 
-                        with st.popover("🗑️", use_container_width=True):
-                            st.write("למחוק?")
-                            if st.button("מחק", key=f"del_ev_up_{ev['id']}", type="primary"):
-                                db.delete_event(ev['id'])
-                                st.rerun()
-                else:
-                    # EDIT MODE OFF: Show Card ONLY
-                    st.markdown(html_card, unsafe_allow_html=True)
+                # EDIT MODE ON: Show Card + Delete Button
+                col1, col2 = st.columns([0.8, 0.2])
+                with col1:
+                    st.markdown(render.render("event_card", row=ev), unsafe_allow_html=True)
+                with col2:
+                    st.write("") 
+                    st.write("") 
+                    with st.popover("🗑️", use_container_width=True):
+                        st.write("למחוק?")
+                        if st.button("מחק", key=f"del_ev_up_{ev['id']}", type="primary"):
+                            db.delete_event(ev['id'])
+                            st.rerun()
                 st.write("")
         else:
             st.info("אין אירועים קרובים. זמן לנוח! 🏖️")
 
         if past_events:
             st.subheader("אירועים שזמנם עבר")
-            for ev in past_events:
-                if st.session_state.get('edit_mode', False):
+            if not st.session_state.get('edit_mode', False):
+                # EDIT MODE OFF: the whole history is one markdown element
+                st.markdown(render.render_list("past_event_list", past_events), unsafe_allow_html=True)
+            else:
+                for ev in past_events:
                     # EDIT MODE ON: Show content + Delete Button
                     col1, col2 = st.columns([0.85, 0.15])
                     with col1:
-                        st.markdown(f"<s style='color: #888;'>{ev['title']}</s>", unsafe_allow_html=True)
-                        st.caption(f"{ev['date']} • {ev['time'] or ''}")
+                        st.markdown(render.render("past_event_card", row=ev), unsafe_allow_html=True)
                     with col2:
                         with st.popover("🗑️", use_container_width=True):
                             st.write("למחוק את ההיסטוריה?")
                             if st.button("מחק", key=f"del_ev_past_{ev['id']}", type="primary"):
                                 db.delete_event(ev['id'])
                                 st.rerun()
-                else:
-                    # EDIT MODE OFF: Show content ONLY
-                    st.markdown(f"<s style='color: #888;'>{ev['title']}</s>", unsafe_allow_html=True)
-                    st.caption(f"{ev['date']} • {ev['time'] or ''}")
-                st.divider()
 
     # ================== CAT CARE TAB ==================
     elif st.session_state.active_tab == TAB_CAT:
         st.header("מרכז טיפול בחתול 🐱")
         
-        if overdue_cat_tasks: st.error(f"התראה: {len(overdue_cat_tasks)} משימות לטיפול!")
+        if overdue_cat_count: st.error(f"התראה: {overdue_cat_count} משימות לטיפול!")
         else: st.success("הכל מטופל! 😺")
 
         time_units = {"שעות": 1, "ימים": 24, "שבועות": 168, "חודשים": 720}
@@ -1122,7 +1400,7 @@ def main_app():
         
         if 'edit_cat_id' not in st.session_state: st.session_state.edit_cat_id = None
             
-        tasks = db.get_all_cat_tasks()
+        tasks = with_pending(cached(db.get_all_cat_tasks, "cat_care"), "cat_care")
         for task in tasks:
             if st.session_state.edit_cat_id == task['id']:
                 st.markdown("---")
@@ -1140,9 +1418,11 @@ def main_app():
                 with c2: ed_unit = st.selectbox("יחידה", list(time_units.keys()), index=d_u, key=f"ed_cu_{task['id']}")
                 
                 new_hrs = ed_val * time_units[ed_unit]
+                ed_grace = st.number_input("זמן חסד (שעות)", min_value=0, max_value=168,
+                                           value=int(task['grace_hours'] or 0), key=f"ed_cg_{task['id']}")
                 
                 if st.button("שמור", key=f"sv_c_{task['id']}", type="primary"):
-                    db.edit_cat_task(task['id'], ed_name, new_hrs)
+                    db.edit_cat_task(task['id'], ed_name, new_hrs, ed_grace)
                     st.session_state.edit_cat_id = None
                     st.rerun()
                 if st.button("ביטול", key=f"cn_c_{task['id']}"):
@@ -1150,9 +1430,21 @@ def main_app():
                     st.rerun()
                 st.markdown("---")
             else:
-                is_overdue = db.is_cat_task_overdue(task['last_done_at'], task['frequency_hours'])
-                status_text = "דחוף!" if is_overdue else "תקין"
-                status_color = "#dc3545" if is_overdue else "#28a745"
+                # Computed from the row itself so a tap still waiting in the write queue shows at once
+                schedule = catcare.schedule_for_row(task)
+                status = catcare.status(schedule) if schedule else "overdue"
+                status_text, status_color = {
+                    "ok": ("תקין", "#28a745"),
+                    "due": ("הגיע הזמן", "#fd7e14"),
+                    "overdue": ("דחוף!", "#dc3545"),
+                }[status]
+
+                if not schedule or not task['last_done_at']:
+                    eta_text = "עכשיו"
+                elif status == "ok":
+                    eta_text = f"בעוד {format_hours((schedule.due_at - datetime.now()).total_seconds() / 3600)}"
+                else:
+                    eta_text = f"באיחור של {format_hours((datetime.now() - schedule.due_at).total_seconds() / 3600)}"
                 
                 last_done_text = "טרם בוצע"
                 if task['last_done_at']:
@@ -1163,22 +1455,9 @@ def main_app():
                     else: last_done_text = f"לפני {int(hrs/24)} ימים"
                     if task['done_by']: last_done_text += f" ({task['done_by']})"
 
-                html_card = f"""
-                <div style="border: 1px solid #ddd; border-radius: 12px; padding: 15px; margin-bottom: 10px; background-color: white; box-shadow: 0 2px 4px rgba(0,0,0,0.05);">
-                    <div style="display: flex; justify-content: space-between; align-items: start; margin-bottom: 10px;">
-                        <div style="background-color: {status_color}; color: white; padding: 2px 10px; border-radius: 15px; font-size: 0.8rem; font-weight: bold;">{status_text}</div>
-                        <div style="text-align: left;">
-                            <span style="font-size: 1.2rem; font-weight: bold;">{task['task_name']}</span>
-                             <span style="font-size: 1.2rem;">🐱</span>
-                        </div>
-                    </div>
-                    <div style="text-align: left; font-size: 0.9rem; color: #666; direction: rtl;">
-                        <div>תדירות: כל {task['frequency_hours']} שעות</div>
-                        <div>בוצע לאחרונה: {last_done_text}</div>
-                    </div>
-                </div>
-                """
-                st.markdown(html_card, unsafe_allow_html=True)
+                card = {"task": task, "status_text": status_text, "status_color": status_color,
+                        "last_done_text": last_done_text, "eta_text": eta_text}
+                st.markdown(render.render("cat_card", row=card), unsafe_allow_html=True)
                 
                 # Show edit/delete only in edit mode
                 if st.session_state.get('edit_mode'):
@@ -1195,12 +1474,16 @@ def main_app():
                             st.rerun()
                     with c3:
                         if st.button("בוצע ✅", key=f"do_cat_{task['id']}", use_container_width=True):
-                            db.update_cat_task(task['id'], "מישהו")
+                            done_at = datetime.now().isoformat()
+                            queue_write(db_path, "cat_care", task['id'], {"last_done_at": done_at, "done_by": "מישהו"},
+                                        "update_cat_task", task['id'], "מישהו", done_at)
                             st.rerun()
                 else:
                     # Clean view - only show "Done" button
                     if st.button("בוצע ✅", key=f"do_cat_{task['id']}", use_container_width=True):
-                        db.update_cat_task(task['id'], "מישהו")
+                        done_at = datetime.now().isoformat()
+                        queue_write(db_path, "cat_care", task['id'], {"last_done_at": done_at, "done_by": "מישהו"},
+                                    "update_cat_task", task['id'], "מישהו", done_at)
                         st.rerun()
 
     st.divider()
@@ -1208,6 +1491,10 @@ def main_app():
     # ================== RECYCLE BIN (Only in Edit Mode) ==================
     if st.session_state.get('edit_mode'):
         with st.expander("🗑️ סל מחזור (פריטים שנמחקו)", expanded=False):
+            st.caption(f"פריטים נמחקים לצמיתות אחרי {db.TRASH_RETENTION_DAYS} ימים בסל")
+            report = handle.maintenance.last_report
+            if report and report['bytes_reclaimed']:
+                st.caption(f"ניקוי אחרון פינה {report['bytes_reclaimed'] / 1024:.0f} KB")
             deleted_items = db.get_deleted_items()
             if not deleted_items:
                 st.info("סל המחזור ריק")
@@ -1227,7 +1514,42 @@ def main_app():
                             st.rerun()
                     st.divider()
 
+        with st.expander("🕘 שינויים היום", expanded=False):
+            changes = [entry for entry in db.get_changes_today() if entry['table_name'] in db.TABLE_LABELS]
+            if not changes:
+                st.info("אין שינויים היום")
+            else:
+                if st.button("↩️ בטל פעולה אחרונה", key="undo_last", use_container_width=True):
+                    db.undo_last()
+                    st.rerun()
+                for entry in changes:
+                    text = describe_change(entry)
+                    st.caption(f"~~{text}~~" if entry['undone'] else text)
+
+    # Poll the shared change feed so other phones' edits show up here
+    live_sync(db_path, watched_tables)
+
+@st.cache_resource(show_spinner=False)
+def init_process():
+    """One-time server setup, shared by every session and rerun."""
+    # Migrate and open the default household while the login screen is shown
+    default = tenancy.get_household(tenancy.DEFAULT_HOUSEHOLD_ID)
+    if default:
+        tenancy.warm_up(default)
+    # Serve the JSON API (api.py) from this process when HOUSEHOLD_API_EMBED is set
+    if os.environ.get("HOUSEHOLD_API_EMBED"):
+        import api
+        api.start_in_background()
+    # Prometheus metrics on a local port (metrics.py) when HOUSEHOLD_METRICS_EMBED is set
+    if os.environ.get("HOUSEHOLD_METRICS_EMBED"):
+        import metrics
+        metrics.start_in_background()
+    return datetime.now()
+
+
 # --- MAIN EXECUTION FLOW ---
+init_process()
+
 if "authenticated" not in st.session_state:
     st.session_state["authenticated"] = False
 
@@ -1241,7 +1563,19 @@ if st.session_state.get('set_cookie', False):
     set_auth_cookie()
     st.session_state['set_cookie'] = False
 
-if st.session_state["authenticated"]:
-    main_app()
+# Sessions that logged in without a PIN (the ?auth=ok link) belong to the default household
+household = tenancy.get_household(st.session_state.get('household_id', tenancy.DEFAULT_HOUSEHOLD_ID))
+
+if st.session_state["authenticated"] and household:
+    rerun_started = time.perf_counter()
+    try:
+        main_app(household)
+    finally:
+        # Also runs when st.rerun() cuts the script short
+        if os.environ.get("HOUSEHOLD_METRICS_EMBED"):
+            import metrics
+            run_ctx = get_script_run_ctx()
+            metrics.record_rerun(st.session_state.get('active_tab', ''), time.perf_counter() - rerun_started,
+                                 run_ctx.session_id if run_ctx else None)
 else:
     login_screen()
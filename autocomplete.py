@@ -0,0 +1,187 @@
+"""
+Shopping item autocomplete for Household Management App.
+A prefix trie over everything in archive_shopping, ranked by how often and how
+recently each item was bought, with the category and quantity it usually had.
+New archive rows are folded in by id watermark, so the index is never rebuilt
+after clear_bought_items().
+"""
+
+import heapq
+import math
+import sqlite3
+import threading
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import NamedTuple
+
+import database as db
+
+# A purchase's weight halves every this many days, so last month's habits beat last year's
+HALF_LIFE_DAYS = 30
+# Weights are stored relative to this moment; they only ever grow, so ranking never needs "now"
+_EPOCH = datetime(2024, 1, 1)
+
+
+class Suggestion(NamedTuple):
+    name: str
+    category: str   # most common category for this name
+    quantity: str   # most common quantity for this name
+    count: int      # times bought
+    score: float
+
+
+def normalize(text: str) -> str:
+    return " ".join(str(text).split()).casefold()
+
+
+def _purchase_weight(archived_at) -> float:
+    """2 ** (age of the purchase since _EPOCH in half-lives)."""
+    try:
+        moment = datetime.fromisoformat(archived_at)
+    except (TypeError, ValueError):
+        moment = _EPOCH
+    return math.pow(2.0, (moment - _EPOCH).total_seconds() / 86400 / HALF_LIFE_DAYS)
+
+
+class _Entry:
+    __slots__ = ("name", "weight", "count", "categories", "quantities")
+
+    def __init__(self, name):
+        self.name = name
+        self.weight = 0.0
+        self.count = 0
+        self.categories = Counter()
+        self.quantities = Counter()
+
+    def suggestion(self) -> Suggestion:
+        category = self.categories.most_common(1)[0][0] if self.categories else None
+        quantity = self.quantities.most_common(1)[0][0] if self.quantities else "1"
+        return Suggestion(self.name, category, quantity, self.count, self.weight)
+
+
+class ShoppingAutocomplete:
+    """
+    Prefix index of one database file's archive_shopping.
+
+    Every word of a name is indexed, so "חלב" finds "שקית חלב" too. Trie nodes
+    hold the keys below them; a lookup walks the prefix and takes the top
+    entries by weight with a heap.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        self._lock = threading.RLock()
+        self._entries = {}        # normalized name -> _Entry
+        self._root = {}           # char -> child node; "" -> set of normalized names
+        self.watermark = 0        # highest archive_shopping.id already indexed
+
+    def _query(self, sql: str, params=()):
+        conn = db.get_read_connection(self.db_path)
+        try:
+            return conn.execute(sql, params).fetchall()
+        except sqlite3.OperationalError:
+            # No archive table yet (database not initialised)
+            return []
+        finally:
+            conn.close()
+
+    def refresh(self):
+        """Index archive rows added since the last call (an id range scan; cheap when nothing is new)."""
+        with self._lock:
+            newest = self._query("SELECT MAX(id) AS id FROM archive_shopping")
+            newest = (newest[0]['id'] if newest else None) or 0
+            if newest < self.watermark:
+                # The archive went backwards (restored from a backup): start over
+                self._entries.clear()
+                self._root.clear()
+                self.watermark = 0
+            if newest == self.watermark:
+                return self
+            rows = self._query(
+                "SELECT id, name, category, quantity, archived_at FROM archive_shopping WHERE id > ? ORDER BY id",
+                (self.watermark,)
+            )
+            for row in rows:
+                self._add(row)
+                self.watermark = row['id']
+        return self
+
+    def _add(self, row):
+        key = normalize(row['name'] or "")
+        if not key:
+            return
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = _Entry(" ".join(row['name'].split()))
+            self._index(key)
+        entry.weight += _purchase_weight(row['archived_at'])
+        entry.count += 1
+        if row['category']:
+            entry.categories[row['category']] += 1
+        if row['quantity']:
+            entry.quantities[row['quantity']] += 1
+
+    def _index(self, key: str):
+        words = key.split(" ")
+        for i in range(len(words)):
+            node = self._root
+            for char in " ".join(words[i:]):
+                node = node.setdefault(char, {})
+                node.setdefault("", set()).add(key)
+
+    def suggest(self, prefix: str = "", limit: int = 8):
+        """Best matches for what has been typed so far (all items when prefix is empty)."""
+        prefix = normalize(prefix)
+        with self._lock:
+            if not prefix:
+                keys = self._entries.keys()
+            else:
+                node = self._root
+                for char in prefix:
+                    node = node.get(char)
+                    if node is None:
+                        return []
+                keys = node[""]
+            entries = heapq.nlargest(limit, (self._entries[key] for key in keys), key=lambda e: e.weight)
+            return [entry.suggestion() for entry in entries]
+
+    def lookup(self, name: str):
+        """The Suggestion for an exact name, or None if it was never bought."""
+        with self._lock:
+            entry = self._entries.get(normalize(name))
+            return entry.suggestion() if entry else None
+
+
+# ============== PROCESS-WIDE REGISTRY ==============
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(db_path) -> ShoppingAutocomplete:
+    """Return the up-to-date index for a database file, building it on first use."""
+    key = str(Path(db_path).resolve())
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = ShoppingAutocomplete(key)
+    # Also picks up archive rows written by other processes
+    return index.refresh()
+
+
+def drop_index(db_path):
+    """Forget the index for a database file."""
+    with _indexes_lock:
+        _indexes.pop(str(Path(db_path).resolve()), None)
+
+
+def _on_db_change(db_path, table_name, row_id):
+    if table_name != "archive_shopping":
+        return
+    index = _indexes.get(str(Path(db_path).resolve()))
+    if index is not None:
+        index.refresh()
+
+
+db.add_change_listener(_on_db_change)
@@ -0,0 +1,281 @@
+"""
+Backups for Household Management App.
+Copies a household database with SQLite's online backup API a few pages at a
+time, so writers are only ever held up for one short step. Every copy is
+checked with PRAGMA integrity_check, optionally gzipped, and rotated.
+
+    python backup.py backup [--db household.db] [--no-compress]
+    python backup.py list [--db household.db]
+    python backup.py verify backups/household-1a2b3c4d/household-20260101-030000.db.gz
+    python backup.py restore backups/household-1a2b3c4d/household-20260101-030000.db.gz [--db household.db] --yes
+"""
+
+import argparse
+import gzip
+import hashlib
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+import database as db
+
+logger = logging.getLogger(__name__)
+
+# Where backups go; each database gets its own subdirectory, named after it
+BACKUP_DIR = Path(os.environ.get("HOUSEHOLD_BACKUP_DIR", Path(__file__).parent / "backups"))
+# How many backups to keep per database
+BACKUP_KEEP = int(os.environ.get("HOUSEHOLD_BACKUP_KEEP", "14"))
+# Hours between scheduled backups (0 turns the scheduler off)
+BACKUP_INTERVAL_HOURS = float(os.environ.get("HOUSEHOLD_BACKUP_INTERVAL_HOURS", "24"))
+# Pages copied per backup step, and the pause between steps that lets writers in
+PAGES_PER_STEP = 256
+STEP_SLEEP = 0.05
+
+
+class BackupError(Exception):
+    """A backup or restore failed verification."""
+
+
+def backup_dir(db_path: Path, dest_dir: Path) -> Path:
+    """
+    <dest_dir>/<stem>-<hash of the database's full path>. Households share
+    dest_dir, and neither a shared name prefix ("a" and "a-b") nor the same
+    file name in two data directories may mix their backups up.
+    """
+    digest = hashlib.sha256(str(Path(db_path).resolve()).encode("utf-8")).hexdigest()[:8]
+    return Path(dest_dir) / f"{Path(db_path).stem}-{digest}"
+
+
+def _backup_path(db_path: Path, dest_dir: Path, compress: bool) -> Path:
+    """<stem>-<YYYYmmdd-HHMMSS>.db[.gz] in dest_dir; never reuses an existing name."""
+    stamp = f"{db_path.stem}-{datetime.now():%Y%m%d-%H%M%S}"
+    suffix = ".db.gz" if compress else ".db"
+    path = dest_dir / (stamp + suffix)
+    n = 1
+    while path.exists():
+        path = dest_dir / f"{stamp}.{n}{suffix}"
+        n += 1
+    return path
+
+
+def integrity_check(path) -> str:
+    """'ok' if the database file is sound, else SQLite's first complaint."""
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        return conn.execute("PRAGMA integrity_check").fetchone()[0]
+    finally:
+        conn.close()
+
+
+@contextmanager
+def _plain_copy(backup_path: Path):
+    """Yield a path to the uncompressed database inside a backup file."""
+    if backup_path.suffix != ".gz":
+        yield backup_path
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        plain = Path(tmp) / backup_path.stem
+        with gzip.open(backup_path, "rb") as src, open(plain, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        yield plain
+
+
+def verify_backup(backup_path) -> None:
+    """Raise BackupError unless the backup (plain or .gz) passes integrity_check."""
+    backup_path = Path(backup_path)
+    try:
+        with _plain_copy(backup_path) as plain:
+            result = integrity_check(plain)
+    except (OSError, EOFError, sqlite3.DatabaseError) as e:
+        raise BackupError(f"{backup_path.name}: unreadable: {e}") from e
+    if result != "ok":
+        raise BackupError(f"{backup_path.name}: integrity_check failed: {result}")
+
+
+def _online_copy(src_path: Path, dst_path: Path, pages: int, sleep: float, standalone: bool = False):
+    """
+    Copy src to dst with the backup API; SQLite restarts the copy if another connection writes mid-way.
+    standalone=True leaves dst as a single file (rollback journal) even when src uses WAL.
+    """
+    src = sqlite3.connect(src_path)
+    dst = sqlite3.connect(dst_path)
+    try:
+        src.backup(dst, pages=pages, sleep=sleep)
+        if standalone:
+            dst.execute("PRAGMA journal_mode = DELETE")
+    finally:
+        dst.close()
+        src.close()
+
+
+def backup_database(db_path=None, dest_dir=None, compress: bool = True, keep: int = BACKUP_KEEP,
+                    pages: int = PAGES_PER_STEP, sleep: float = STEP_SLEEP) -> Path:
+    """Back up one database file, verify the copy, and keep only the newest keep backups. Returns the new file."""
+    db_path = Path(db_path or db.get_db_path())
+    dest_dir = Path(dest_dir or BACKUP_DIR)
+    household_dir = backup_dir(db_path, dest_dir)
+    household_dir.mkdir(parents=True, exist_ok=True)
+    final = _backup_path(db_path, household_dir, compress)
+    # Work under temp names so a crash never leaves a half-written file that looks like a backup
+    plain = final.with_name(final.name + ".tmp")
+    partial = final.with_name(final.name + ".partial")
+    started = time.monotonic()
+    try:
+        _online_copy(db_path, plain, pages, sleep, standalone=True)
+        result = integrity_check(plain)
+        if result != "ok":
+            raise BackupError(f"Backup of {db_path.name} failed integrity_check: {result}")
+        if compress:
+            with open(plain, "rb") as src, gzip.open(partial, "wb", compresslevel=6) as dst:
+                shutil.copyfileobj(src, dst)
+            partial.replace(final)
+        else:
+            plain.replace(final)
+    finally:
+        plain.unlink(missing_ok=True)
+        partial.unlink(missing_ok=True)
+    logger.info("Backed up %s to %s in %.1fs", db_path.name, final.name, time.monotonic() - started)
+    if keep is not None:
+        rotate_backups(db_path, dest_dir, keep)
+    return final
+
+
+def list_backups(db_path=None, dest_dir=None):
+    """Backups of one database, newest first."""
+    db_path = Path(db_path or db.get_db_path())
+    household_dir = backup_dir(db_path, Path(dest_dir or BACKUP_DIR))
+    if not household_dir.exists():
+        return []
+    found = [p for p in household_dir.glob(f"{db_path.stem}-*.db*") if p.name.endswith((".db", ".db.gz"))]
+    return sorted(found, key=lambda p: (p.stat().st_mtime, p.name), reverse=True)
+
+
+def rotate_backups(db_path=None, dest_dir=None, keep: int = BACKUP_KEEP):
+    """Delete all but the newest keep backups. Returns the deleted paths."""
+    removed = list_backups(db_path, dest_dir)[keep:]
+    for path in removed:
+        path.unlink(missing_ok=True)
+    return removed
+
+
+def restore_backup(backup_path, db_path=None, dest_dir=None, safety_backup: bool = True) -> Path:
+    """
+    Replace a database's contents with a verified backup, online.
+    Open connections see the restored data on their next query. A backup of
+    the current contents is taken into dest_dir first (unless safety_backup=False).
+    """
+    backup_path = Path(backup_path)
+    db_path = Path(db_path or db.get_db_path())
+    verify_backup(backup_path)
+    if safety_backup and db_path.exists():
+        # No rotation here: it could delete the very backup being restored
+        backup_database(db_path, dest_dir, keep=None)
+
+    live = sqlite3.connect(db_path)
+    try:
+        before = dict(live.execute("SELECT table_name, version FROM table_versions").fetchall())
+    except sqlite3.OperationalError:
+        before = {}
+    finally:
+        live.close()
+
+    with _plain_copy(backup_path) as plain:
+        _online_copy(plain, db_path, pages=-1, sleep=0)
+
+    # The restored versions may be lower than ones sessions already cached; move every table past them
+    conn = sqlite3.connect(db_path)
+    try:
+        for table_name, version in before.items():
+            conn.execute(
+                "UPDATE table_versions SET version = MAX(version, ?) + 1 WHERE table_name = ?",
+                (version, table_name)
+            )
+        conn.commit()
+    finally:
+        conn.close()
+    logger.info("Restored %s from %s", db_path.name, backup_path.name)
+    return db_path
+
+
+class BackupScheduler:
+    """Backs a database up every interval_hours, in a background thread."""
+
+    def __init__(self, db_path, interval_hours: float = BACKUP_INTERVAL_HOURS, check_interval: float = 600):
+        self.db_path = Path(db_path)
+        self.interval = interval_hours * 3600
+        self.check_interval = check_interval
+        self.last_backup = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def is_due(self) -> bool:
+        newest = list_backups(self.db_path)
+        if not newest:
+            return True
+        return time.time() - newest[0].stat().st_mtime >= self.interval
+
+    def start(self):
+        if self._thread is None and self.interval > 0:
+            self._thread = threading.Thread(target=self._run, name="backup", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.check_interval):
+            try:
+                if self.is_due():
+                    self.last_backup = backup_database(self.db_path)
+            except Exception:
+                logger.exception("Scheduled backup failed for %s", self.db_path)
+
+
+def run_command(parser, args):
+    if args.command == "backup":
+        print(backup_database(args.db, args.dir, compress=not args.no_compress, keep=args.keep))
+    elif args.command == "list":
+        for path in list_backups(args.db, args.dir):
+            print(f"{path}  {path.stat().st_size / 1024:.0f} KB")
+    elif args.command == "verify":
+        verify_backup(args.file)
+        print(f"{args.file.name}: ok")
+    elif args.command == "restore":
+        if not args.yes:
+            parser.error(f"restore overwrites {args.db}; pass --yes to confirm")
+        restore_backup(args.file, args.db, args.dir)
+        print(f"Restored {args.db} from {args.file.name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Household database backups")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name in ("backup", "list", "restore"):
+        command = sub.add_parser(name)
+        command.add_argument("--db", type=Path, default=db.DB_PATH, help="database file (default: household.db)")
+        command.add_argument("--dir", type=Path, default=BACKUP_DIR, help="backup directory")
+        if name == "backup":
+            command.add_argument("--no-compress", action="store_true")
+            command.add_argument("--keep", type=int, default=BACKUP_KEEP)
+        if name == "restore":
+            command.add_argument("file", type=Path)
+            command.add_argument("--yes", action="store_true", help="really overwrite the database")
+    verify = sub.add_parser("verify")
+    verify.add_argument("file", type=Path)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    try:
+        run_command(parser, args)
+    except BackupError as e:
+        parser.exit(1, f"{e}\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+Cat care scheduler for Household Management App.
+Keeps every care task in a min-heap keyed by when it next needs attention, so
+the tab badge is an O(1) read and each card can show how long until it is due.
+A task is due frequency_hours after it was last done, becomes overdue once its
+grace window (grace_hours) has passed too, and never turns overdue during quiet
+hours - those alerts wait until the quiet hours end.
+"""
+
+import heapq
+import itertools
+import os
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+import changefeed
+import database as db
+
+
+def parse_quiet_hours(spec: str) -> Optional[tuple]:
+    """'23-7' -> (23, 7); empty means no quiet hours."""
+    if not spec:
+        return None
+    start, _, end = spec.partition("-")
+    return int(start) % 24, int(end) % 24
+
+
+# Hours when overdue tasks wait silently, e.g. "23-7" (HOUSEHOLD_QUIET_HOURS; off by default)
+QUIET_HOURS = parse_quiet_hours(os.environ.get("HOUSEHOLD_QUIET_HOURS", ""))
+
+
+class TaskSchedule(NamedTuple):
+    task_id: int
+    due_at: datetime    # frequency_hours after last_done_at (datetime.min if never done)
+    alert_at: datetime  # due_at + grace_hours, moved past quiet hours: overdue from here on
+
+
+def after_quiet_hours(moment: datetime, quiet_hours=QUIET_HOURS) -> datetime:
+    """moment, or the end of the quiet hours it falls in."""
+    if not quiet_hours or moment == datetime.min:
+        return moment
+    start, end = quiet_hours
+    hour = moment.hour
+    in_quiet = start <= hour < end if start < end else hour >= start or hour < end
+    if not in_quiet:
+        return moment
+    wake = moment.replace(hour=end, minute=0, second=0, microsecond=0)
+    return wake if wake > moment else wake + timedelta(days=1)
+
+
+def schedule_for_row(row, quiet_hours=QUIET_HOURS) -> Optional[TaskSchedule]:
+    """When a cat_care row is due and when it turns overdue; None for deleted or malformed rows."""
+    if row is None or row['is_deleted']:
+        return None
+    try:
+        if row['last_done_at']:
+            due_at = datetime.fromisoformat(row['last_done_at']) + timedelta(hours=row['frequency_hours'])
+        else:
+            due_at = datetime.min
+        alert_at = due_at + timedelta(hours=row['grace_hours'] or 0) if due_at != datetime.min else due_at
+    except (TypeError, ValueError, OverflowError):
+        return None
+    return TaskSchedule(row['id'], due_at, after_quiet_hours(alert_at, quiet_hours))
+
+
+def status(schedule: TaskSchedule, now: datetime = None) -> str:
+    """'ok' before the due time, 'due' inside the grace window / quiet hours, 'overdue' after."""
+    now = now or datetime.now()
+    if now < schedule.due_at:
+        return "ok"
+    return "due" if now < schedule.alert_at else "overdue"
+
+
+class CatCareScheduler:
+    """
+    Min-heap of one database file's care tasks, keyed by alert time.
+
+    Tasks move from the heap into the overdue set as their alert time passes,
+    so each transition costs O(log n) once and overdue_count() is a set size.
+    Edits push a fresh entry; the old one is skipped when it reaches the top.
+    """
+
+    def __init__(self, db_path, quiet_hours=QUIET_HOURS):
+        self.db_path = Path(db_path)
+        self.quiet_hours = quiet_hours
+        self._lock = threading.RLock()
+        self._seq = itertools.count()
+        self._schedules = {}  # task_id -> current TaskSchedule
+        self._heap = []       # (alert_at, seq, task_id, schedule) for tasks not yet overdue
+        self._overdue = set()
+        self.applied_version = -1  # cat_care's table_versions value the heap is current with
+        self.unsubscribe = None
+
+    def _read(self, sql: str, params=()):
+        """Rows plus cat_care's version, from one snapshot."""
+        conn = db.get_read_connection(self.db_path)
+        try:
+            conn.execute("BEGIN")
+            rows = conn.execute(sql, params).fetchall()
+            version = conn.execute("SELECT version FROM table_versions WHERE table_name = 'cat_care'").fetchone()
+        finally:
+            conn.close()
+        return rows, version[0] if version else None
+
+    def load(self):
+        """(Re)build the heap from the table."""
+        rows, version = self._read("SELECT * FROM cat_care WHERE is_deleted = 0")
+        with self._lock:
+            self._schedules.clear()
+            self._heap.clear()
+            self._overdue.clear()
+            for row in rows:
+                self._set(row['id'], schedule_for_row(row, self.quiet_hours))
+            if version is not None:
+                self.applied_version = version
+        return self
+
+    def apply_change(self, table_name: str, row_id=None):
+        """Incremental update after update_cat_task / edit_cat_task / add / delete."""
+        if table_name != "cat_care":
+            return
+        if row_id is None:
+            self.load()
+            return
+        rows, _ = self._read("SELECT * FROM cat_care WHERE id = ?", (row_id,))
+        before, after = db.get_commit_versions(self.db_path).get("cat_care", (None, None))
+        with self._lock:
+            self._set(row_id, schedule_for_row(rows[0] if rows else None, self.quiet_hours))
+            # Nothing else changed the table since the version we had: this commit is all of it
+            if before is not None and self.applied_version == before:
+                self.applied_version = after
+
+    def on_feed_change(self, changed):
+        """Change feed callback: reloads only if another process wrote to cat_care."""
+        if changed.get("cat_care", -1) > self.applied_version:
+            self.load()
+
+    def _set(self, task_id: int, schedule: Optional[TaskSchedule]):
+        self._overdue.discard(task_id)
+        if schedule is None:
+            self._schedules.pop(task_id, None)
+            return
+        self._schedules[task_id] = schedule
+        heapq.heappush(self._heap, (schedule.alert_at, next(self._seq), task_id, schedule))
+        # Edits leave stale entries behind; compact if they pile up
+        if len(self._heap) > 2 * len(self._schedules) + 64:
+            self._heap = [e for e in self._heap if self._schedules.get(e[2]) is e[3]]
+            heapq.heapify(self._heap)
+
+    def _advance(self, now: datetime):
+        while self._heap and self._heap[0][0] <= now:
+            _, _, task_id, schedule = heapq.heappop(self._heap)
+            if self._schedules.get(task_id) is schedule:
+                self._overdue.add(task_id)
+
+    # --- Queries ---
+
+    def overdue_count(self, now: datetime = None) -> int:
+        """How many tasks are overdue right now (the tab badge)."""
+        with self._lock:
+            self._advance(now or datetime.now())
+            return len(self._overdue)
+
+    def is_overdue(self, task_id: int, now: datetime = None) -> bool:
+        with self._lock:
+            self._advance(now or datetime.now())
+            return task_id in self._overdue
+
+    def schedule(self, task_id: int) -> Optional[TaskSchedule]:
+        with self._lock:
+            return self._schedules.get(task_id)
+
+    def next_alert(self, now: datetime = None) -> Optional[datetime]:
+        """When the next task turns overdue (None if none is pending)."""
+        with self._lock:
+            self._advance(now or datetime.now())
+            while self._heap and self._schedules.get(self._heap[0][2]) is not self._heap[0][3]:
+                heapq.heappop(self._heap)
+            return self._heap[0][0] if self._heap else None
+
+
+# ============== PROCESS-WIDE REGISTRY ==============
+
+_schedulers = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(db_path) -> CatCareScheduler:
+    """Return the loaded scheduler for a database file, building it on first use."""
+    key = str(Path(db_path).resolve())
+    with _schedulers_lock:
+        scheduler = _schedulers.get(key)
+        if scheduler is None:
+            scheduler = _schedulers[key] = CatCareScheduler(key).load()
+            # Writes from other processes only show up through the change feed
+            scheduler.unsubscribe = changefeed.get_feed(key).subscribe(scheduler.on_feed_change)
+        return scheduler
+
+
+def drop_scheduler(db_path):
+    """Forget the scheduler for a database file."""
+    with _schedulers_lock:
+        scheduler = _schedulers.pop(str(Path(db_path).resolve()), None)
+    if scheduler is not None and scheduler.unsubscribe:
+        scheduler.unsubscribe()
+
+
+def _on_db_change(db_path, table_name, row_id):
+    scheduler = _schedulers.get(str(Path(db_path).resolve()))
+    if scheduler is not None:
+        scheduler.apply_change(table_name, row_id)
+
+
+db.add_change_listener(_on_db_change)
@@ -0,0 +1,126 @@
+"""
+Change feed for Household Management App.
+Watches SQLite's PRAGMA data_version and the table_versions counters so that
+open sessions learn which tables changed without re-reading them.
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# How often the shared watcher thread checks for commits (seconds)
+POLL_INTERVAL = 0.5
+
+
+class ChangeFeed:
+    """
+    One watcher per database file, shared by every session in the process.
+
+    PRAGMA data_version only changes when another connection commits, so the
+    idle cost is a single cheap pragma per poll no matter how many sessions
+    are open. When it changes, the five table_versions rows are read and
+    subscribers are told which tables moved to which version.
+    """
+
+    def __init__(self, db_path, interval: float = POLL_INTERVAL):
+        self.db_path = Path(db_path)
+        self.interval = interval
+        # The feed never writes, so every commit on the file bumps data_version here
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        self._data_version = None
+        self._versions = {}
+        self._subscribers = []
+        self._stop = threading.Event()
+        self._thread = None
+        self.last_change_at = time.monotonic()
+
+    def poll(self):
+        """Check for new commits. Returns {table_name: version} for tables that changed."""
+        with self._lock:
+            data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if data_version == self._data_version:
+                return {}
+            self._data_version = data_version
+            rows = self._conn.execute("SELECT table_name, version FROM table_versions").fetchall()
+            changed = {table: version for table, version in rows if self._versions.get(table) != version}
+            self._versions.update(changed)
+            if changed:
+                self.last_change_at = time.monotonic()
+            subscribers = list(self._subscribers)
+
+        if changed:
+            for callback in subscribers:
+                try:
+                    callback(changed)
+                except Exception:
+                    logger.exception("Change feed subscriber failed")
+        return changed
+
+    def versions(self):
+        """Last known {table_name: version}. Never touches the database."""
+        with self._lock:
+            return dict(self._versions)
+
+    def subscribe(self, callback):
+        """Call callback({table: version}) after every change. Returns an unsubscribe function."""
+        with self._lock:
+            self._subscribers.append(callback)
+
+        def unsubscribe():
+            with self._lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+        return unsubscribe
+
+    def start(self):
+        """Start the background watcher thread (idempotent)."""
+        if self._thread is None:
+            self.poll()
+            self._thread = threading.Thread(target=self._run, name=f"changefeed-{self.db_path.name}", daemon=True)
+            self._thread.start()
+        return self
+
+    def close(self):
+        """Stop the watcher and release its connection."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval * 2)
+        with self._lock:
+            self._conn.close()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except sqlite3.Error:
+                logger.exception("Change feed poll failed for %s", self.db_path)
+
+
+# ============== PROCESS-WIDE REGISTRY ==============
+
+_feeds = {}
+_feeds_lock = threading.Lock()
+
+
+def get_feed(db_path) -> ChangeFeed:
+    """Return the running feed for a database file, starting it on first use."""
+    key = str(Path(db_path).resolve())
+    with _feeds_lock:
+        feed = _feeds.get(key)
+        if feed is None:
+            feed = _feeds[key] = ChangeFeed(key).start()
+        return feed
+
+
+def close_feed(db_path):
+    """Stop and forget the feed for a database file, if one is running."""
+    key = str(Path(db_path).resolve())
+    with _feeds_lock:
+        feed = _feeds.pop(key, None)
+    if feed is not None:
+        feed.close()
@@ -0,0 +1,37 @@
+"""
+Shared pytest fixtures for Household Management App.
+Every test runs against a fresh database file in a temporary directory; the
+tracked household.db is never touched.
+
+    python -m pytest -q
+"""
+
+import pytest
+
+import database as db
+
+
+@pytest.fixture
+def members():
+    return ("דנה", "יוסי", "רון")
+
+
+@pytest.fixture
+def db_path(tmp_path, members):
+    """A migrated, empty household database that database.py points at for the test."""
+    path = tmp_path / "household.db"
+    token = db.use_database(path)
+    db.init_database()
+    db.ensure_participants(members)
+    yield path
+    db.close_read_pool(path)
+    db._active_db_path.reset(token)
+
+
+@pytest.fixture
+def add_expense(db_path, members):
+    """add_expense(amount, payer[, description]) - an expense split equally between members."""
+    def add(amount: float, payer: str, description: str = "קניות"):
+        shares = db.compute_shares(amount, payer, db.SPLIT_EQUAL, members)
+        db.add_expense(amount, description, payer, db.SPLIT_EQUAL, shares)
+    return add
@@ -3,26 +3,350 @@ Database module for Household Management App.
 Handles all SQLite database operations with Soft Delete mechanism.
 """
 
+import json
+import logging
+import os
 import sqlite3
-from datetime import datetime, timedelta
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+import calendar
+from datetime import date, datetime, timedelta, timezone
 from pathlib import Path
 
-# Database file path
+import tenacity
+
+import rows
+
+# Database file path (the default household; see use_database for others)
 DB_PATH = Path(__file__).parent / "household.db"
 
+# Database file for the current session/thread, set by the tenancy layer
+_active_db_path = ContextVar("active_db_path", default=None)
+
+# User-data tables: soft delete, Recycle Bin and change versions apply to these
+TRACKED_TABLES = ['shopping_items', 'expenses', 'events', 'chores', 'cat_care', 'recurring_expenses']
+
+# Legacy two-person expense columns and the members they belong to
+LEGACY_SHARE_COLUMNS = {"talor_share": "טלאור", "romi_share": "רומי"}
+
+# Split types offered when adding an expense
+SPLIT_EQUAL = "שווה בשווה"
+SPLIT_PAYER_ONLY = "מלא עליי"
+SPLIT_OTHERS_ONLY = "מלא עליו/ה"
+
+# Expense categories offered in the app; budgets are set per category
+EXPENSE_CATEGORIES = ["🛒 סופר", "🏠 דיור", "💡 חשבונות", "🚗 תחבורה", "🍽️ מסעדות", "🐱 חתול", "🎉 בילויים", "🩺 בריאות", "📦 אחר"]
+DEFAULT_EXPENSE_CATEGORY = "📦 אחר"
+
+# How often a recurring expense template repeats (see next_occurrence)
+RECURRING_MONTHLY = "monthly"
+RECURRING_WEEKLY = "weekly"
+
+# Bumped by one-shot data migrations in init_database (stored in PRAGMA user_version)
+SCHEMA_VERSION = 3
+
+# Chore priority -> stored sort_key (lower sorts first). Covers the English priority
+# values the add dialog uses and the Hebrew urgency values of older rows.
+CHORE_SORT_KEYS = {"Urgent 🔴": 1, "דחוף": 1, "גבוה": 2, "Regular 🔵": 3, "רגיל": 3, "נמוך": 4}
+DEFAULT_CHORE_SORT_KEY = 3
+
+# Recycle Bin retention: trashed rows older than this are purged for good
+TRASH_RETENTION_DAYS = int(os.environ.get("HOUSEHOLD_TRASH_RETENTION_DAYS", "30"))
+PURGE_BATCH_SIZE = 500
+# Free pages handed back to the OS per incremental_vacuum step
+VACUUM_STEP_PAGES = 64
+# Seconds a connection waits on another connection's lock before "database is locked"
+BUSY_TIMEOUT = float(os.environ.get("HOUSEHOLD_BUSY_TIMEOUT", "5"))
+# A write still locked out after BUSY_TIMEOUT (another server process holding the lock)
+# is tried up to this many times in all, with a random pause of up to WRITE_RETRY_MAX_WAIT between
+WRITE_RETRY_ATTEMPTS = int(os.environ.get("HOUSEHOLD_WRITE_RETRY_ATTEMPTS", "5"))
+WRITE_RETRY_MAX_WAIT = 2.0
+# Idle read-only connections kept per database file
+READ_POOL_SIZE = 8
+# Seconds a writer waits for its turn in this process before relying on SQLite's locking alone
+WRITER_TURN_TIMEOUT = 30.0
+# Change log entries older than this are folded into per-row snapshots (see compact_change_log)
+AUDIT_RETENTION_DAYS = int(os.environ.get("HOUSEHOLD_AUDIT_RETENTION_DAYS", "30"))
+
+# Tables whose every row change lands in change_log, and their key columns (default: id)
+AUDITED_TABLES = TRACKED_TABLES + ["expense_shares", "archive_expenses", "settlements"]
+AUDIT_KEYS = {"expense_shares": ("expense_id", "participant_id")}
+
+logger = logging.getLogger(__name__)
+
+# In-process subscribers told about every committed write (see add_change_listener)
+_change_listeners = []
+_lock_wait_listeners = []
+
+
+def get_db_path() -> Path:
+    """Database file the functions in this module currently work on."""
+    return _active_db_path.get() or DB_PATH
+
+
+def use_database(db_path):
+    """Point this module at another database file for the current context (e.g. one script run)."""
+    return _active_db_path.set(Path(db_path) if db_path else None)
+
+
+@contextmanager
+def using_database(db_path):
+    """Temporarily point this module at another database file (for worker threads)."""
+    token = use_database(db_path)
+    try:
+        yield
+    finally:
+        _active_db_path.reset(token)
+
+
+# ============== CONNECTIONS ==============
+# Reads use pooled read-only connections; writes go through get_connection(), one at a
+# time per database file in this process. With WAL, readers never wait for the writer.
+# Other processes (more server instances, scripts) are kept out by BEGIN IMMEDIATE: a
+# write transaction takes the file's write lock before it reads anything it will change.
+
+class _WriterGate:
+    """Per-file writer turn: re-entrant for the thread holding it, releasable from any thread."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._owner = None
+        self._depth = 0
+
+    def acquire(self, timeout: float) -> bool:
+        me = threading.get_ident()
+        with self._cond:
+            if self._owner == me:
+                self._depth += 1
+                return True
+            if not self._cond.wait_for(lambda: self._owner is None, timeout):
+                return False
+            self._owner, self._depth = me, 1
+            return True
+
+    def release(self):
+        with self._cond:
+            self._depth -= 1
+            if self._depth <= 0:
+                self._owner, self._depth = None, 0
+                self._cond.notify()
+
+
+_writer_gates = {}
+_read_pools = {}
+_pools_lock = threading.Lock()
+# Per thread: {db path: {table_name: (version before, version after)}} of its last commit
+_thread_commits = threading.local()
+
+
+def _read_versions(conn):
+    try:
+        return {row[0]: row[1] for row in conn.execute("SELECT table_name, version FROM table_versions")}
+    except sqlite3.OperationalError:
+        return None  # No table_versions yet (before init_database)
+
+
+class WriteConnection(sqlite3.Connection):
+    """Connection from get_connection(); closing it hands the writer turn to the next caller."""
+
+    gate = None
+    db_path = None
+    # table_versions as the transaction began (only known for the one get_connection() began)
+    begin_versions = None
+    # Set by undo so the entries its commit writes are marked as reversals
+    audit_undo = False
+    # Set by housekeeping writes nobody asked for (migrations, recurring expenses, cleanup,
+    # purges) so undo_last() passes over them to the user's own actions
+    audit_system = False
+
+    def commit(self):
+        if not self.in_transaction:
+            return super().commit()
+        _group_change_log(self, self.audit_undo, self.audit_system)
+        before, self.begin_versions = self.begin_versions, None
+        after = _read_versions(self) if before is not None else None
+        super().commit()
+        # Later transactions on this connection began implicitly: their versions aren't known
+        commits = _thread_commits.__dict__.setdefault("by_path", {})
+        commits[self.db_path] = {table: (before.get(table), version) for table, version in (after or {}).items()
+                                 if before.get(table) != version}
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            gate, self.gate = self.gate, None
+            if gate is not None:
+                gate.release()
+
+    def __del__(self):
+        # A connection an exception skipped closing still gives up its turn once collected
+        if self.gate is not None:
+            self.close()
+
+
+class ReadConnection(sqlite3.Connection):
+    """Read-only connection from get_read_connection(); close() returns it to the pool."""
+
+    pool_key = None
+    pooled = False
+
+    def close(self):
+        if self.pooled:
+            return
+        if self.in_transaction:
+            self.rollback()
+        with _pools_lock:
+            idle = _read_pools.setdefault(self.pool_key, [])
+            if len(idle) < READ_POOL_SIZE:
+                self.pooled = True
+                idle.append(self)
+                return
+        super().close()
+
+
+def get_connection(begin: bool = True):
+    """
+    Get a connection for writing. Writers in this process take turns per database file.
+    The transaction starts right away with BEGIN IMMEDIATE (begin=False leaves it to the
+    first write, for PRAGMAs that can't run inside one); later ones start the same way.
+    """
+    path = get_db_path()
+    with _pools_lock:
+        gate = _writer_gates.setdefault(str(Path(path).resolve()), _WriterGate())
+    # If the turn never comes (a leaked connection), fall back to SQLite's own locking
+    acquired = gate.acquire(WRITER_TURN_TIMEOUT)
+    if not acquired:
+        logger.warning("Writer turn for %s not released in %ss; writing anyway", path, WRITER_TURN_TIMEOUT)
+    try:
+        conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT, check_same_thread=False, isolation_level="IMMEDIATE",
+                               factory=WriteConnection)
+    except Exception:
+        if acquired:
+            gate.release()
+        raise
+    conn.gate = gate if acquired else None
+    conn.db_path = Path(path).resolve()
+    conn.row_factory = sqlite3.Row
+    if begin:
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.begin_versions = _read_versions(conn)
+        except Exception:
+            conn.close()
+            raise
+    return conn
+
 
-def get_connection():
-    """Get a database connection."""
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+def get_commit_versions(db_path=None) -> dict:
+    """
+    {table_name: (version before, version after)} for the tables the last transaction this
+    thread committed to db_path changed. Change listeners run right after that commit, in the
+    same thread, so they can tell their own process's writes from other processes'.
+    """
+    commits = getattr(_thread_commits, "by_path", {})
+    return commits.get(Path(db_path or get_db_path()).resolve(), {})
+
+
+def get_read_connection(db_path=None):
+    """
+    A pooled read-only connection (mode=ro, query_only) to db_path (default: the current
+    database); close() hands it back for reuse.
+    """
+    path = Path(db_path or get_db_path()).resolve()
+    with _pools_lock:
+        idle = _read_pools.get(path)
+        conn = idle.pop() if idle else None
+    if conn is None:
+        conn = sqlite3.connect(f"{path.as_uri()}?mode=ro", uri=True, timeout=BUSY_TIMEOUT,
+                               check_same_thread=False, factory=ReadConnection)
+        conn.execute("PRAGMA query_only = ON")
+        conn.pool_key = path
+    conn.pooled = False
     conn.row_factory = sqlite3.Row
     return conn
 
 
+def close_read_pool(db_path=None):
+    """Close the idle read connections of one database file (e.g. before it is replaced)."""
+    with _pools_lock:
+        idle = _read_pools.pop(Path(db_path or get_db_path()).resolve(), [])
+    for conn in idle:
+        sqlite3.Connection.close(conn)
+
+
+def _is_locked(error: BaseException) -> bool:
+    return isinstance(error, sqlite3.OperationalError) and ("locked" in str(error) or "busy" in str(error))
+
+
+def add_lock_wait_listener(callback):
+    """
+    Register callback(function_name, seconds), called each time a write found the database
+    locked and is retried; seconds is the busy timeout it waited out plus the pause before
+    the next attempt.
+    """
+    _lock_wait_listeners.append(callback)
+
+
+def _log_locked_retry(retry_state):
+    logger.warning("%s: database locked, attempt %d of %d failed; retrying in %.2fs", retry_state.fn.__name__,
+                   retry_state.attempt_number, WRITE_RETRY_ATTEMPTS, retry_state.upcoming_sleep)
+    for callback in list(_lock_wait_listeners):
+        try:
+            callback(retry_state.fn.__name__, BUSY_TIMEOUT + retry_state.upcoming_sleep)
+        except Exception:
+            logger.exception("Lock wait listener failed for %s", retry_state.fn.__name__)
+
+
+def retry_when_locked(function):
+    """
+    Decorator for the functions that write: if the database is still locked after
+    BUSY_TIMEOUT, run the whole call again after a jittered, growing pause, up to
+    WRITE_RETRY_ATTEMPTS times. A locked-out attempt has written nothing (its
+    transaction never began or was rolled back), so trying again is safe.
+    """
+    return tenacity.retry(
+        retry=tenacity.retry_if_exception(_is_locked),
+        stop=tenacity.stop_after_attempt(WRITE_RETRY_ATTEMPTS),
+        wait=tenacity.wait_random_exponential(multiplier=0.05, max=WRITE_RETRY_MAX_WAIT),
+        before_sleep=_log_locked_retry,
+        reraise=True,
+    )(function)
+
+
+def _iter_rows(table_name: str, sql: str, params=()):
+    """Yield compact typed rows (see rows.py) one at a time; the connection closes when iteration ends."""
+    conn = get_read_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.row_factory = rows.row_factory(table_name)
+        cursor.execute(sql, params)
+        yield from cursor
+    finally:
+        conn.close()
+
+
+@retry_when_locked
 def init_database():
     """Initialize the database with all required tables and migrations."""
-    conn = get_connection()
+    conn = get_connection(begin=False)
+    conn.audit_system = True
     cursor = conn.cursor()
 
+    # Let freed pages be returned to the OS a few at a time (see incremental_vacuum).
+    # An existing file needs one full VACUUM for the setting to take effect.
+    if cursor.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        try:
+            cursor.execute("VACUUM")
+        except sqlite3.OperationalError:
+            pass # Busy - try again on the next start
+
+    # WAL: readers keep reading while a writer commits (the setting is stored in the file)
+    cursor.execute("PRAGMA journal_mode = WAL")
+
     # Define tables and their creation SQL
     tables = {
         "shopping_items": """
@@ -83,6 +407,20 @@ def init_database():
                 done_by TEXT,
                 is_deleted INTEGER DEFAULT 0
             )
+        """,
+        "recurring_expenses": f"""
+            CREATE TABLE IF NOT EXISTS recurring_expenses (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                amount REAL NOT NULL,
+                description TEXT NOT NULL,
+                payer TEXT NOT NULL,
+                split_type TEXT NOT NULL,
+                frequency TEXT NOT NULL DEFAULT '{RECURRING_MONTHLY}',
+                start_date TEXT NOT NULL,
+                next_due TEXT NOT NULL,
+                is_deleted INTEGER DEFAULT 0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
         """
     }
 
@@ -103,8 +441,23 @@ def init_database():
         ("chores", "due_date", "TEXT"),
         ("chores", "created_at", "TIMESTAMP DEFAULT CURRENT_TIMESTAMP"),
         ("chores", "done_by", "TEXT"),
-        ("chores", "priority", "TEXT DEFAULT 'Regular 🔵'") # New Priority Column
+        ("chores", "priority", "TEXT DEFAULT 'Regular 🔵'"), # New Priority Column
+        ("chores", "sort_key", f"INTEGER DEFAULT {DEFAULT_CHORE_SORT_KEY}"),  # From priority, see CHORE_SORT_KEYS
+        ("cat_care", "grace_hours", "INTEGER DEFAULT 0"),  # Hours past due before a task counts as overdue
+        ("expenses", "import_hash", "TEXT"),  # Content hash of a CSV-imported expense (see importer.py)
+        ("expenses", "recurring_id", "INTEGER"),  # Template an expense was generated from
+        ("expenses", "occurrence_date", "TEXT"),  # ...and which of its dates it stands for
+        ("expenses", "category", f"TEXT DEFAULT '{DEFAULT_EXPENSE_CATEGORY}'"),
+        ("recurring_expenses", "category", f"TEXT DEFAULT '{DEFAULT_EXPENSE_CATEGORY}'"),
+        # Settled expenses keep what the month totals, imports and recurring templates look up
+        ("archive_expenses", "category", "TEXT"),
+        ("archive_expenses", "import_hash", "TEXT"),
+        ("archive_expenses", "recurring_id", "INTEGER"),
+        ("archive_expenses", "occurrence_date", "TEXT"),
+        ("archive_expenses", "settlement_id", "INTEGER")  # The settle-up that archived it
     ]
+    # When each row went to the Recycle Bin (drives the retention policy)
+    migrations += [(table, "deleted_at", "TIMESTAMP") for table in TRACKED_TABLES]
     
     for table, col, dtype in migrations:
         try:
@@ -112,6 +465,10 @@ def init_database():
         except sqlite3.OperationalError:
             pass
 
+    # Rows trashed before deleted_at existed start their retention period now
+    for table in TRACKED_TABLES:
+        cursor.execute(f"UPDATE {table} SET deleted_at = CURRENT_TIMESTAMP WHERE is_deleted = 1 AND deleted_at IS NULL")
+
     # Create Archive Tables (For Completed functionality, keeping structure simple)
     # Note: Soft Delete handles 'Trash', but 'Archive' handles 'History of Completed' (like bought items)
     # We still keep archives for history, but 'Delete' button now goes to Recycle Bin first.
@@ -120,7 +477,8 @@ def init_database():
         """CREATE TABLE IF NOT EXISTS archive_shopping (
             id INTEGER PRIMARY KEY AUTOINCREMENT, original_id INTEGER, name TEXT, category TEXT, quantity TEXT, action TEXT, archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)""",
         """CREATE TABLE IF NOT EXISTS archive_expenses (
-            id INTEGER PRIMARY KEY AUTOINCREMENT, original_id INTEGER, amount REAL, description TEXT, payer TEXT, split_type TEXT, action TEXT, original_date TEXT, archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)""",
+            id INTEGER PRIMARY KEY AUTOINCREMENT, original_id INTEGER, amount REAL, description TEXT, payer TEXT, split_type TEXT, action TEXT, original_date TEXT, archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            category TEXT, import_hash TEXT, recurring_id INTEGER, occurrence_date TEXT, settlement_id INTEGER)""",
         """CREATE TABLE IF NOT EXISTS archive_events (
             id INTEGER PRIMARY KEY AUTOINCREMENT, original_id INTEGER, title TEXT, date TEXT, time TEXT, description TEXT, action TEXT, archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)""",
         """CREATE TABLE IF NOT EXISTS archive_chores (
@@ -129,151 +487,587 @@ def init_database():
     for sql in archive_sqls:
         cursor.execute(sql)
 
+    # Settle-up checkpoints: each participant's balance when the expenses up to
+    # last_expense_id were settled and moved to archive_expenses (see settle_up)
+    cursor.execute("""CREATE TABLE IF NOT EXISTS settlements (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        settled_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        balances TEXT NOT NULL,
+        expense_count INTEGER NOT NULL DEFAULT 0,
+        total REAL NOT NULL DEFAULT 0,
+        last_expense_id INTEGER)""")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_archive_expenses_settlement ON archive_expenses (settlement_id)")
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_archive_expenses_import_hash ON archive_expenses (import_hash) WHERE import_hash IS NOT NULL")
+    cursor.execute("""CREATE INDEX IF NOT EXISTS idx_archive_expenses_occurrence
+        ON archive_expenses (recurring_id, occurrence_date) WHERE recurring_id IS NOT NULL""")
+
+    # Budgets: a monthly limit per expense category, checked against expense_month_totals -
+    # spending per month and category, kept up to date by _apply_expense
+    cursor.execute("""CREATE TABLE IF NOT EXISTS budgets (
+        category TEXT PRIMARY KEY,
+        monthly_limit REAL NOT NULL)""")
+    cursor.execute("""CREATE TABLE IF NOT EXISTS expense_month_totals (
+        month TEXT NOT NULL,
+        category TEXT NOT NULL,
+        total REAL NOT NULL DEFAULT 0,
+        count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (month, category)) WITHOUT ROWID""")
+
+    # Change feed: one version counter per table, bumped by triggers on every write.
+    # Sessions compare these counters instead of re-reading the tables.
+    cursor.execute("""CREATE TABLE IF NOT EXISTS table_versions (
+        table_name TEXT PRIMARY KEY, version INTEGER NOT NULL DEFAULT 0)""")
+    for table in TRACKED_TABLES + ["budgets", "settlements"]:
+        cursor.execute("INSERT OR IGNORE INTO table_versions (table_name) VALUES (?)", (table,))
+        for op in ("INSERT", "UPDATE", "DELETE"):
+            cursor.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_{table}_{op.lower()}_version
+                AFTER {op} ON {table}
+                BEGIN
+                    UPDATE table_versions SET version = version + 1 WHERE table_name = '{table}';
+                END""")
+
+    # Expense ledger: one row per participant per expense, plus each participant's
+    # running net balance (paid minus owed over live expenses)
+    cursor.execute("""CREATE TABLE IF NOT EXISTS participants (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL UNIQUE,
+        net_balance REAL NOT NULL DEFAULT 0,
+        is_active INTEGER DEFAULT 1)""")
+    cursor.execute("""CREATE TABLE IF NOT EXISTS expense_shares (
+        expense_id INTEGER NOT NULL,
+        participant_id INTEGER NOT NULL,
+        paid REAL NOT NULL DEFAULT 0,
+        owed REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (expense_id, participant_id)) WITHOUT ROWID""")
+    cursor.execute("""CREATE TRIGGER IF NOT EXISTS trg_expenses_delete_shares
+        AFTER DELETE ON expenses
+        BEGIN
+            DELETE FROM expense_shares WHERE expense_id = OLD.id;
+        END""")
+
+    # Re-importing a statement skips the rows already imported
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_expenses_import_hash ON expenses (import_hash) WHERE import_hash IS NOT NULL")
+
+    # Each template date becomes at most one expense; templates with a date due are found by index
+    cursor.execute("""CREATE UNIQUE INDEX IF NOT EXISTS idx_expenses_occurrence
+        ON expenses (recurring_id, occurrence_date) WHERE recurring_id IS NOT NULL""")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_recurring_due ON recurring_expenses (is_deleted, next_due)")
+
+    # The chores tab reads open and done chores in sort_key order straight off this index
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_chores_list ON chores (is_deleted, done, sort_key, due_date)")
+
     # Remove old default chores if present (cleanup)
     cursor.execute("DELETE FROM chores WHERE name IN ('כלים', 'כביסה', 'זבל', 'שואב אבק') AND is_deleted = 0")
 
+    # One-shot data migrations
+    schema_version = cursor.execute("PRAGMA user_version").fetchone()[0]
+    if schema_version < 1:
+        _migrate_legacy_expense_shares(cursor)
+    if schema_version < 2:
+        _backfill_chore_sort_keys(cursor)
+    if schema_version < 3:
+        _rebuild_month_totals(cursor)
+    if schema_version < SCHEMA_VERSION:
+        cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    # Audit log last, so the migrations above aren't recorded as user changes
+    _create_change_log(cursor)
+
     conn.commit()
     conn.close()
 
-def get_all_chores(sort_by_priority=True):
-    conn = get_connection()
+def _backfill_chore_sort_keys(cursor):
+    """Set sort_key on existing chores from priority and urgency (the more urgent of the two wins)."""
+    def key_of(column):
+        whens = " ".join(f"WHEN '{value}' THEN {key}" for value, key in CHORE_SORT_KEYS.items())
+        return f"CASE {column} {whens} ELSE {DEFAULT_CHORE_SORT_KEY} END"
+    cursor.execute(f"UPDATE chores SET sort_key = MIN({key_of('priority')}, {key_of('urgency')})")
+
+def chore_sort_key(priority: str) -> int:
+    return CHORE_SORT_KEYS.get(priority, DEFAULT_CHORE_SORT_KEY)
+
+def _migrate_legacy_expense_shares(cursor):
+    """Turn talor_share/romi_share columns into expense_shares rows and net balances."""
+    legacy = list(LEGACY_SHARE_COLUMNS.values())
+    cursor.executemany("INSERT OR IGNORE INTO participants (name) VALUES (?)", [(name,) for name in legacy])
+    cursor.execute("INSERT OR IGNORE INTO participants (name) SELECT DISTINCT payer FROM expenses")
+    owed_case = " ".join(f"WHEN '{name}' THEN e.{column}" for column, name in LEGACY_SHARE_COLUMNS.items())
+    cursor.execute(f"""
+        INSERT OR IGNORE INTO expense_shares (expense_id, participant_id, paid, owed)
+        SELECT e.id, p.id,
+               CASE WHEN e.payer = p.name THEN e.amount ELSE 0 END,
+               CASE p.name {owed_case} ELSE 0 END
+        FROM expenses e JOIN participants p ON p.name IN ({", ".join("?" * len(legacy))}) OR p.name = e.payer
+    """, legacy)
+    _recalculate_balances(cursor)
+
+# ============== CHANGE FEED ==============
+
+def get_table_versions():
+    """Return {table_name: version} for all tracked tables."""
+    conn = get_read_connection()
     cursor = conn.cursor()
-    # Sort by Priority: Urgent first, then Regular. then Due Date.
-    # Priority values: "Urgent 🔴", "Regular 🔵"
-    # Urgent > Regular
-    order_clause = "CASE priority WHEN 'Urgent 🔴' THEN 1 ELSE 2 END, due_date" if sort_by_priority else "due_date"
-    
-    # Fallback for old urgency column if priority is null? 
-    # Actually, let's just use priority.
-    
-    query = f"SELECT * FROM chores WHERE is_deleted = 0 ORDER BY done ASC, {order_clause}"
-    cursor.execute(query)
-    chores = cursor.fetchall()
+    cursor.execute("SELECT table_name, version FROM table_versions")
+    versions = {row['table_name']: row['version'] for row in cursor.fetchall()}
     conn.close()
-    return chores
+    return versions
 
-def add_chore(name: str, priority: str = "Regular 🔵", due_date: str = None):
+
+def add_change_listener(callback):
+    """
+    Register callback(db_path, table_name, row_id), called after every committed write.
+    row_id is None when one statement touched many rows.
+    """
+    _change_listeners.append(callback)
+
+
+def _notify_change(table_name: str, row_id=None):
+    for callback in list(_change_listeners):
+        try:
+            callback(get_db_path(), table_name, row_id)
+        except Exception:
+            logger.exception("Change listener failed for %s", table_name)
+
+
+# ============== AUDIT LOG ==============
+# Triggers append every row change of AUDITED_TABLES to change_log: the full row for
+# inserts and deletes, only the changed columns (before and after; after also names the row) for updates.
+# WriteConnection.commit() groups one transaction's entries into an action (action_id =
+# its first entry's id), which is what undo_last() reverts; housekeeping actions are
+# marked is_system and never undone.
+
+def _create_change_log(cursor):
+    cursor.execute("""CREATE TABLE IF NOT EXISTS change_log (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        table_name TEXT NOT NULL,
+        row_id INTEGER,
+        op TEXT NOT NULL,
+        before TEXT,
+        after TEXT,
+        action_id INTEGER,
+        is_undo INTEGER NOT NULL DEFAULT 0,
+        undone INTEGER NOT NULL DEFAULT 0,
+        is_system INTEGER NOT NULL DEFAULT 0)""")
+    try:
+        cursor.execute("ALTER TABLE change_log ADD COLUMN is_system INTEGER NOT NULL DEFAULT 0")
+    except sqlite3.OperationalError:
+        pass # Column already exists
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_change_log_changed_at ON change_log (changed_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_change_log_action ON change_log (action_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_change_log_row ON change_log (table_name, row_id)")
+    # A row's state as of the oldest change_log entry still kept for it
+    cursor.execute("""CREATE TABLE IF NOT EXISTS change_snapshots (
+        table_name TEXT NOT NULL,
+        row_id INTEGER NOT NULL,
+        taken_at TIMESTAMP NOT NULL,
+        data TEXT,
+        PRIMARY KEY (table_name, row_id)) WITHOUT ROWID""")
+
+    for table in AUDITED_TABLES:
+        columns = [row[1] for row in cursor.execute(f"PRAGMA table_info({table})")]
+        keys = AUDIT_KEYS.get(table, ("id",))
+        row_id = "{ref}.id" if keys == ("id",) else "NULL"
+
+        def image(ref):
+            return "json_object(" + ", ".join(f"'{column}', {ref}.{column}" for column in columns) + ")"
+
+        def changed(ref, other):
+            diff = (f"(SELECT json_group_object(a.key, a.value) FROM json_each({image(ref)}) a "
+                    f"JOIN json_each({image(other)}) b ON a.key = b.key WHERE a.value IS NOT b.value)")
+            if keys == ("id",):
+                return diff
+            # Rows without an id carry their key columns in the image
+            return "json_set(" + diff + "".join(f", '$.{key}', {ref}.{key}" for key in keys) + ")"
+
+        # The after image also names the row, so history lists can show it without a lookup
+        named_after = changed("NEW", "OLD")
+        if table in NAME_COLUMNS:
+            named_after = f"json_set({named_after}, '$.{NAME_COLUMNS[table]}', NEW.{NAME_COLUMNS[table]})"
+
+        # Recreated every start so new columns (migrations) are always captured
+        for op in ("insert", "update", "delete"):
+            cursor.execute(f"DROP TRIGGER IF EXISTS trg_{table}_{op}_audit")
+        cursor.execute(f"""CREATE TRIGGER trg_{table}_insert_audit AFTER INSERT ON {table}
+            BEGIN
+                INSERT INTO change_log (table_name, row_id, op, after)
+                VALUES ('{table}', {row_id.format(ref="NEW")}, 'INSERT', {image("NEW")});
+            END""")
+        cursor.execute(f"""CREATE TRIGGER trg_{table}_update_audit AFTER UPDATE ON {table}
+            WHEN {image("OLD")} IS NOT {image("NEW")}
+            BEGIN
+                INSERT INTO change_log (table_name, row_id, op, before, after)
+                VALUES ('{table}', {row_id.format(ref="NEW")}, 'UPDATE', {changed("OLD", "NEW")}, {named_after});
+            END""")
+        cursor.execute(f"""CREATE TRIGGER trg_{table}_delete_audit AFTER DELETE ON {table}
+            BEGIN
+                INSERT INTO change_log (table_name, row_id, op, before)
+                VALUES ('{table}', {row_id.format(ref="OLD")}, 'DELETE', {image("OLD")});
+            END""")
+
+def _group_change_log(conn, is_undo: bool = False, is_system: bool = False):
+    """Stamp the entries written since the last action with one action_id (called just before commit)."""
+    try:
+        conn.execute("""
+            UPDATE change_log SET action_id = (
+                SELECT MIN(id) FROM change_log
+                WHERE action_id IS NULL AND id > (SELECT COALESCE(MAX(action_id), 0) FROM change_log)
+            ), is_undo = ?, is_system = ?
+            WHERE action_id IS NULL AND id > (SELECT COALESCE(MAX(action_id), 0) FROM change_log)
+        """, (int(is_undo), int(is_system)))
+    except sqlite3.OperationalError:
+        pass # No change_log yet (before init_database)
+
+def iter_changes(since: str = None, limit: int = 200):
+    """
+    Yield change_log entries newest first; since ('YYYY-MM-DD HH:MM:SS' UTC, default: local
+    midnight today) bounds them through the changed_at index.
+    """
+    if since is None:
+        midnight = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0).astimezone(timezone.utc)
+        since = midnight.strftime("%Y-%m-%d %H:%M:%S")
+    return _iter_rows(
+        "change_log",
+        "SELECT * FROM change_log WHERE changed_at >= ? ORDER BY changed_at DESC, id DESC LIMIT ?",
+        (since, limit)
+    )
+
+def get_changes_today(limit: int = 200):
+    return tuple(iter_changes(limit=limit))
+
+def get_row_history(table_name: str, row_id: int):
+    """(snapshot dict or None, entries oldest first) for one row."""
+    conn = get_read_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT data FROM change_snapshots WHERE table_name = ? AND row_id = ?", (table_name, row_id))
+    snapshot = cursor.fetchone()
+    cursor.execute("SELECT * FROM change_log WHERE table_name = ? AND row_id = ? ORDER BY id", (table_name, row_id))
+    entries = cursor.fetchall()
+    conn.close()
+    return (json.loads(snapshot['data']) if snapshot and snapshot['data'] else None), entries
+
+def _revert_change(cursor, entry):
+    """Put one row back the way it was before a change_log entry."""
+    table = entry['table_name']
+    if table not in AUDITED_TABLES:
+        return
+    keys = AUDIT_KEYS.get(table, ("id",))
+    before = json.loads(entry['before']) if entry['before'] else {}
+    after = json.loads(entry['after']) if entry['after'] else {}
+    if keys == ("id",):
+        key_values = [entry['row_id']]
+    else:
+        key_values = [before.get(key, after.get(key)) for key in keys]
+    where = " AND ".join(f"{key} = ?" for key in keys)
+
+    if entry['op'] == "INSERT":
+        cursor.execute(f"DELETE FROM {table} WHERE {where}", key_values)
+    elif entry['op'] == "DELETE":
+        columns = list(before)
+        cursor.execute(
+            f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+            [before[column] for column in columns]
+        )
+    else:
+        changed = {column: value for column, value in before.items() if column not in keys}
+        if changed:
+            cursor.execute(
+                f"UPDATE {table} SET {', '.join(f'{column} = ?' for column in changed)} WHERE {where}",
+                list(changed.values()) + key_values
+            )
+
+@retry_when_locked
+def undo_last(steps: int = 1):
+    """
+    Revert the last steps user actions (newest first) that haven't been undone yet;
+    housekeeping writes (is_system) are skipped. Ledger changes are undone with their
+    shares and the balances are recalculated. Returns the tables that changed.
+    """
     conn = get_connection()
     cursor = conn.cursor()
-    # Also save to old urgency for compatibility if needed, but primarily priority
-    cursor.execute("INSERT INTO chores (name, priority, urgency, due_date) VALUES (?, ?, ?, ?)", (name, priority, priority, due_date))
+    # Walk back from the newest entry; stops as soon as enough actions are found
+    actions = []
+    cursor.execute("SELECT COALESCE(action_id, id) FROM change_log WHERE is_undo = 0 AND is_system = 0 AND undone = 0 "
+                   "ORDER BY id DESC")
+    for row in cursor:
+        if row[0] not in actions:
+            actions.append(row[0])
+            if len(actions) == steps:
+                break
+
+    changed = set()
+    for action_id in actions:
+        cursor.execute(
+            "SELECT * FROM change_log WHERE (action_id = ? OR id = ?) AND undone = 0 ORDER BY id DESC",
+            (action_id, action_id)
+        )
+        for entry in cursor.fetchall():
+            _revert_change(cursor, entry)
+            changed.add(entry['table_name'])
+        cursor.execute("UPDATE change_log SET undone = 1 WHERE action_id = ? OR id = ?", (action_id, action_id))
+    if changed & {"expenses", "expense_shares"}:
+        _recalculate_balances(cursor)
+        _rebuild_month_totals(cursor)
+    conn.audit_undo = True
     conn.commit()
     conn.close()
+    changed.discard("expense_shares")
+    for table in changed:
+        _notify_change(table)
+    return changed
+
+@retry_when_locked
+def compact_change_log(retention_days: int = None, batch_size: int = PURGE_BATCH_SIZE):
+    """
+    Drop change_log entries older than retention_days, keeping each affected row's
+    state as of the cutoff in change_snapshots. Works in batches. Returns entries dropped.
+    """
+    if retention_days is None:
+        retention_days = AUDIT_RETENTION_DAYS
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=retention_days)).strftime("%Y-%m-%d %H:%M:%S")
+    conn = get_connection()
+    cursor = conn.cursor()
+    dropped = 0
+    while True:
+        cursor.execute("SELECT MAX(id) FROM (SELECT id FROM change_log WHERE changed_at < ? ORDER BY id LIMIT ?)",
+                       (cutoff, batch_size))
+        last_id = cursor.fetchone()[0]
+        if last_id is None:
+            break
+        cursor.execute("SELECT DISTINCT table_name, row_id FROM change_log WHERE id <= ? AND row_id IS NOT NULL",
+                       (last_id,))
+        for table, row_id in cursor.fetchall():
+            if table not in AUDITED_TABLES:
+                continue
+            # State at the cutoff = the row now, with every later entry rolled back
+            current = cursor.execute(f"SELECT * FROM {table} WHERE id = ?", (row_id,)).fetchone()
+            state = dict(current) if current else None
+            later = cursor.execute(
+                "SELECT op, before FROM change_log WHERE table_name = ? AND row_id = ? AND id > ? ORDER BY id DESC",
+                (table, row_id, last_id)
+            ).fetchall()
+            for entry in later:
+                if entry['op'] == "INSERT":
+                    state = None
+                elif entry['op'] == "DELETE":
+                    state = json.loads(entry['before'])
+                elif state is not None:
+                    state.update(json.loads(entry['before'] or "{}"))
+            cursor.execute(
+                "INSERT OR REPLACE INTO change_snapshots (table_name, row_id, taken_at, data) VALUES (?, ?, ?, ?)",
+                (table, row_id, cutoff, json.dumps(state, ensure_ascii=False) if state is not None else None)
+            )
+        cursor.execute("DELETE FROM change_log WHERE id <= ?", (last_id,))
+        dropped += cursor.rowcount
+        conn.commit()
+    conn.close()
+    return dropped
 
 
 # ============== GENERIC SAFETY NET ==============
 
+# Friendly names, and the column that names a row, per tracked table
+TABLE_LABELS = {
+    'shopping_items': 'קניות',
+    'expenses': 'הוצאות',
+    'events': 'אירועים',
+    'chores': 'משימות',
+    'cat_care': 'חתול',
+    'recurring_expenses': 'הוצאות קבועות'
+}
+NAME_COLUMNS = {
+    "shopping_items": "name",
+    "expenses": "description",
+    "events": "title",
+    "chores": "name",
+    "cat_care": "task_name",
+    "recurring_expenses": "description"
+}
+
+def iter_deleted_items():
+    """Yield soft-deleted items from all tables (id, name, table_name, type_name) in one query."""
+    sql = " UNION ALL ".join(
+        f"SELECT id, {column} AS name, '{table}' AS table_name, '{TABLE_LABELS[table]}' AS type_name FROM {table} WHERE is_deleted = 1"
+        for table, column in NAME_COLUMNS.items()
+    )
+    return _iter_rows("deleted_items", sql)
+
 def get_deleted_items():
     """Fetch all soft-deleted items from all tables."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    deleted = []
-    
-    # Map friendly names
-    type_map = {
-        'shopping_items': 'קניות',
-        'expenses': 'הוצאות',
-        'events': 'אירועים',
-        'chores': 'משימות',
-        'cat_care': 'חתול'
-    }
-    
-    queries = [
-        ("shopping_items", "id, name, 'shopping_items' as table_name"),
-        ("expenses", "id, description as name, 'expenses' as table_name"),
-        ("events", "id, title as name, 'events' as table_name"),
-        ("chores", "id, name, 'chores' as table_name"),
-        ("cat_care", "id, task_name as name, 'cat_care' as table_name")
-    ]
-    
-    for table, query in queries:
-        cursor.execute(f"SELECT {query} FROM {table} WHERE is_deleted = 1")
-        rows = cursor.fetchall()
-        for row in rows:
-            deleted.append({
-                "id": row['id'],
-                "name": row['name'],
-                "table_name": row['table_name'],
-                "type_name": type_map.get(row['table_name'], row['table_name'])
-            })
-            
-    conn.close()
-    return deleted
+    return tuple(iter_deleted_items())
 
+@retry_when_locked
 def restore_item(table_name: str, item_id: int):
     """Restore a soft-deleted item."""
     conn = get_connection()
     cursor = conn.cursor()
     # Validate table name to prevent SQL injection risks
-    allowed = ['shopping_items', 'expenses', 'events', 'chores', 'cat_care']
-    if table_name in allowed:
-        cursor.execute(f"UPDATE {table_name} SET is_deleted = 0 WHERE id = ?", (item_id,))
+    if table_name in TRACKED_TABLES:
+        cursor.execute(f"UPDATE {table_name} SET is_deleted = 0, deleted_at = NULL WHERE id = ? AND is_deleted = 1", (item_id,))
+        if table_name == "expenses" and cursor.rowcount:
+            _apply_expense(cursor, item_id, +1)
     conn.commit()
     conn.close()
+    _notify_change(table_name, item_id)
 
+@retry_when_locked
 def permanently_delete_item(table_name: str, item_id: int):
     """Permanently delete an item (from Recycle Bin)."""
     conn = get_connection()
     cursor = conn.cursor()
-    allowed = ['shopping_items', 'expenses', 'events', 'chores', 'cat_care']
-    if table_name in allowed:
+    if table_name in TRACKED_TABLES:
+        if table_name == "expenses":
+            # A live expense leaves the ledger before it disappears (trashed ones already did)
+            cursor.execute("SELECT is_deleted FROM expenses WHERE id = ?", (item_id,))
+            row = cursor.fetchone()
+            if row and not row['is_deleted']:
+                _apply_expense(cursor, item_id, -1)
         cursor.execute(f"DELETE FROM {table_name} WHERE id = ?", (item_id,))
     conn.commit()
     conn.close()
+    _notify_change(table_name, item_id)
 
+@retry_when_locked
+def purge_trash(retention_days: int = None, batch_size: int = PURGE_BATCH_SIZE):
+    """
+    Permanently delete Recycle Bin rows trashed more than retention_days ago.
+    Works in small batches so writers are never blocked for long.
+    Returns {table_name: rows purged}.
+    """
+    if retention_days is None:
+        retention_days = TRASH_RETENTION_DAYS
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=retention_days)).strftime("%Y-%m-%d %H:%M:%S")
+    purged = {}
+    conn = get_connection()
+    conn.audit_system = True
+    cursor = conn.cursor()
+    for table in TRACKED_TABLES:
+        total = 0
+        while True:
+            cursor.execute(
+                f"""DELETE FROM {table} WHERE id IN (
+                        SELECT id FROM {table} WHERE is_deleted = 1 AND deleted_at < ? LIMIT ?)""",
+                (cutoff, batch_size)
+            )
+            deleted = cursor.rowcount
+            conn.commit()
+            total += deleted
+            if deleted < batch_size:
+                break
+        if total:
+            purged[table] = total
+    conn.close()
+    for table in purged:
+        _notify_change(table)
+    return purged
 
-# ============== SHOPPING LIST FUNCTIONS ==============
-
-def get_all_shopping_items():
+@retry_when_locked
+def incremental_vacuum(pages_per_step: int = VACUUM_STEP_PAGES, max_steps: int = None, pause: float = 0.05):
+    """
+    Return free pages to the OS in small steps, pausing between them so other
+    connections get the lock. Returns the number of bytes reclaimed.
+    """
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute("SELECT * FROM shopping_items WHERE is_deleted = 0 ORDER BY category, name")
-    items = cursor.fetchall()
+    page_size = cursor.execute("PRAGMA page_size").fetchone()[0]
+    free_before = cursor.execute("PRAGMA freelist_count").fetchone()[0]
+    free_now = free_before
+    steps = 0
+    while free_now and (max_steps is None or steps < max_steps):
+        cursor.execute(f"PRAGMA incremental_vacuum({int(pages_per_step)})").fetchall()
+        conn.commit()
+        free_now = cursor.execute("PRAGMA freelist_count").fetchone()[0]
+        steps += 1
+        if free_now and pause:
+            time.sleep(pause)
+    conn.close()
+    return (free_before - free_now) * page_size
+
+def get_trash_counts():
+    """Number of Recycle Bin rows per table."""
+    conn = get_read_connection()
+    cursor = conn.cursor()
+    counts = {}
+    for table in TRACKED_TABLES:
+        cursor.execute(f"SELECT COUNT(*) FROM {table} WHERE is_deleted = 1")
+        counts[table] = cursor.fetchone()[0]
     conn.close()
-    return items
+    return counts
+
 
+# ============== SHOPPING LIST FUNCTIONS ==============
+
+def iter_shopping_items(bought: bool = None):
+    """Yield the shopping list; bought=False/True returns only items still to buy / already in the basket."""
+    sql = "SELECT * FROM shopping_items WHERE is_deleted = 0"
+    params = ()
+    if bought is not None:
+        sql += " AND bought = ?"
+        params = (int(bought),)
+    return _iter_rows("shopping_items", sql + " ORDER BY category, name", params)
+
+def get_all_shopping_items(bought: bool = None):
+    return tuple(iter_shopping_items(bought))
+
+@retry_when_locked
 def add_shopping_item(name: str, category: str, quantity: str = "1"):
     conn = get_connection()
     cursor = conn.cursor()
     cursor.execute("INSERT INTO shopping_items (name, category, quantity) VALUES (?, ?, ?)", (name, category, quantity))
     conn.commit()
     conn.close()
+    _notify_change("shopping_items", cursor.lastrowid)
 
+def _write_shopping_bought(cursor, item_id: int, bought: bool):
+    cursor.execute("UPDATE shopping_items SET bought = ? WHERE id = ?", (1 if bought else 0, item_id))
+    return "shopping_items", item_id
+
+@retry_when_locked
 def update_shopping_item(item_id: int, bought: bool = None):
     conn = get_connection()
     cursor = conn.cursor()
     if bought is not None:
-        cursor.execute("UPDATE shopping_items SET bought = ? WHERE id = ?", (1 if bought else 0, item_id))
+        _write_shopping_bought(cursor, item_id, bought)
     conn.commit()
     conn.close()
+    _notify_change("shopping_items", item_id)
 
+@retry_when_locked
 def delete_shopping_item(item_id: int):
     """Soft Delete."""
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute("UPDATE shopping_items SET is_deleted = 1 WHERE id = ?", (item_id,))
+    cursor.execute("UPDATE shopping_items SET is_deleted = 1, deleted_at = CURRENT_TIMESTAMP WHERE id = ?", (item_id,))
     conn.commit()
     conn.close()
+    _notify_change("shopping_items", item_id)
 
+@retry_when_locked
 def auto_cleanup_old_items():
     """Automatically soft-delete items older than 2 days."""
     conn = get_connection()
+    conn.audit_system = True
     cursor = conn.cursor()
     
     # Cutoff date (string) - 2 days ago
     cutoff_date = (datetime.now() - timedelta(days=2)).strftime("%Y-%m-%d")
     
     # 1. Cleanup Events (All past events older than 2 days)
-    cursor.execute("UPDATE events SET is_deleted = 1 WHERE is_deleted = 0 AND date < ?", (cutoff_date,))
+    cursor.execute("UPDATE events SET is_deleted = 1, deleted_at = CURRENT_TIMESTAMP WHERE is_deleted = 0 AND date < ?", (cutoff_date,))
+    events_cleaned = cursor.rowcount
     
     # 2. Cleanup Chores (Completed chores older than 2 days relative to due_date)
     # Only clean COMPLETED chores.
-    cursor.execute("UPDATE chores SET is_deleted = 1 WHERE is_deleted = 0 AND done = 1 AND due_date IS NOT NULL AND due_date < ?", (cutoff_date,))
+    cursor.execute("UPDATE chores SET is_deleted = 1, deleted_at = CURRENT_TIMESTAMP WHERE is_deleted = 0 AND done = 1 AND due_date IS NOT NULL AND due_date < ?", (cutoff_date,))
+    chores_cleaned = cursor.rowcount
     
     conn.commit()
     conn.close()
+    # Runs on every rerun, so only notify when something was actually cleaned
+    if events_cleaned: _notify_change("events")
+    if chores_cleaned: _notify_change("chores")
 
+@retry_when_locked
 def clear_bought_items():
     """Moves bought items to ARCHIVE (History), then deletes them permanently from active list."""
     conn = get_connection()
@@ -292,283 +1086,680 @@ def clear_bought_items():
         
     conn.commit()
     conn.close()
+    if items:
+        _notify_change("shopping_items")
+        _notify_change("archive_shopping")
 
 def get_archive_shopping():
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM archive_shopping ORDER BY archived_at DESC LIMIT 50")
-    items = cursor.fetchall()
-    conn.close()
-    return items
+    return tuple(_iter_rows("archive_shopping", "SELECT * FROM archive_shopping ORDER BY archived_at DESC LIMIT 50"))
 
 
 # ============== EXPENSES FUNCTIONS ==============
 
+def iter_expenses():
+    materialize_recurring()
+    return _iter_rows("expenses", "SELECT * FROM expenses WHERE is_deleted = 0 ORDER BY created_at DESC")
+
 def get_all_expenses():
+    return tuple(iter_expenses())
+
+def compute_shares(amount: float, payer: str, split_type: str, participants):
+    """
+    Split an expense into {participant: amount owed} by the dialog's split rules:
+    equal between everyone, all on the payer, or all on the others.
+    Shares are rounded to agorot; the rounding remainder goes to the first debtor.
+    """
+    if split_type == SPLIT_PAYER_ONLY:
+        debtors = [payer]
+    elif split_type == SPLIT_OTHERS_ONLY:
+        debtors = [p for p in participants if p != payer] or [payer]
+    else:
+        debtors = list(participants) or [payer]
+    share = round(amount / len(debtors), 2)
+    shares = {name: share for name in debtors}
+    shares[debtors[0]] = round(amount - share * (len(debtors) - 1), 2)
+    return shares
+
+def _insert_expense(cursor, amount: float, description: str, payer: str, split_type: str, shares: dict,
+                    created_at: str = None, import_hash: str = None, recurring_id: int = None,
+                    occurrence_date: str = None, category: str = None):
+    """Insert an expense with its ledger rows and apply it to the balances and month totals. Returns the new id."""
+    legacy = {column: shares.get(name, 0) for column, name in LEGACY_SHARE_COLUMNS.items()}
+    cursor.execute(
+        """INSERT INTO expenses (amount, description, payer, split_type, talor_share, romi_share, created_at,
+                                 import_hash, recurring_id, occurrence_date, category)
+           VALUES (?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP), ?, ?, ?, ?)""",
+        (amount, description, payer, split_type, legacy["talor_share"], legacy["romi_share"], created_at,
+         import_hash, recurring_id, occurrence_date, category or DEFAULT_EXPENSE_CATEGORY)
+    )
+    expense_id = cursor.lastrowid
+    names = set(shares) | {payer}
+    cursor.executemany("INSERT OR IGNORE INTO participants (name) VALUES (?)", [(name,) for name in names])
+    cursor.executemany(
+        """INSERT INTO expense_shares (expense_id, participant_id, paid, owed)
+           SELECT ?, id, ?, ? FROM participants WHERE name = ?""",
+        [(expense_id, amount if name == payer else 0, shares.get(name, 0), name) for name in names]
+    )
+    _apply_expense(cursor, expense_id, +1)
+    return expense_id
+
+def _apply_expense(cursor, expense_id: int, sign: int):
+    """Add (+1) or remove (-1) one expense's effect on the participants' net balances and its month's total."""
+    cursor.execute(
+        """UPDATE participants SET net_balance = net_balance + ? * (
+               SELECT paid - owed FROM expense_shares
+               WHERE expense_id = ? AND participant_id = participants.id)
+           WHERE id IN (SELECT participant_id FROM expense_shares WHERE expense_id = ?)""",
+        (sign, expense_id, expense_id)
+    )
+    cursor.execute(
+        f"""INSERT INTO expense_month_totals (month, category, total, count)
+            SELECT substr(created_at, 1, 7), COALESCE(category, '{DEFAULT_EXPENSE_CATEGORY}'), ? * amount, ?
+            FROM expenses WHERE id = ?
+            ON CONFLICT (month, category) DO UPDATE SET
+                total = total + excluded.total, count = count + excluded.count""",
+        (sign, sign, expense_id)
+    )
+
+def _rebuild_month_totals(cursor):
+    """Rebuild expense_month_totals from the live and settled expenses (migration / undo)."""
+    cursor.execute("DELETE FROM expense_month_totals")
+    cursor.execute(
+        f"""INSERT INTO expense_month_totals (month, category, total, count)
+            SELECT substr(created_at, 1, 7), COALESCE(category, '{DEFAULT_EXPENSE_CATEGORY}'), SUM(amount), COUNT(*)
+            FROM (SELECT created_at, category, amount FROM expenses WHERE is_deleted = 0
+                  UNION ALL
+                  SELECT original_date, category, amount FROM archive_expenses WHERE settlement_id IS NOT NULL)
+            GROUP BY 1, 2"""
+    )
+
+def _recalculate_balances(cursor):
+    """Rebuild every net balance from expense_shares (migration / repair)."""
+    cursor.execute(
+        """UPDATE participants SET net_balance = COALESCE((
+               SELECT SUM(s.paid - s.owed) FROM expense_shares s JOIN expenses e ON e.id = s.expense_id
+               WHERE s.participant_id = participants.id AND e.is_deleted = 0), 0)"""
+    )
+
+@retry_when_locked
+def add_expense(amount: float, description: str, payer: str, split_type: str, shares: dict,
+                category: str = DEFAULT_EXPENSE_CATEGORY):
+    """Add an expense. shares maps each participant to the amount they owe; the payer paid it all."""
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute("SELECT * FROM expenses WHERE is_deleted = 0 ORDER BY created_at DESC")
-    expenses = cursor.fetchall()
+    expense_id = _insert_expense(cursor, amount, description, payer, split_type, shares, category=category)
+    conn.commit()
     conn.close()
-    return expenses
+    _notify_change("expenses", expense_id)
 
-def add_expense(amount: float, description: str, payer: str, split_type: str, talor_share: float, romi_share: float):
+def find_import_hashes(hashes):
+    """The subset of hashes that already belong to imported expenses (live or settled)."""
+    hashes = list(hashes)
+    found = set()
+    conn = get_read_connection()
+    cursor = conn.cursor()
+    for start in range(0, len(hashes), 500):
+        chunk = hashes[start:start + 500]
+        placeholders = ', '.join('?' * len(chunk))
+        cursor.execute(f"""SELECT import_hash FROM expenses WHERE import_hash IN ({placeholders})
+                           UNION ALL
+                           SELECT import_hash FROM archive_expenses WHERE import_hash IN ({placeholders})""",
+                       chunk + chunk)
+        found.update(row[0] for row in cursor.fetchall())
+    conn.close()
+    return found
+
+@retry_when_locked
+def add_imported_expenses(expenses):
+    """
+    Insert (amount, description, payer, split_type, category, shares, created_at, import_hash)
+    tuples in one transaction, skipping hashes imported before. expenses may be a generator; it is
+    consumed as it goes. Returns the number inserted.
+    """
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute(
-        """INSERT INTO expenses (amount, description, payer, split_type, talor_share, romi_share)
-           VALUES (?, ?, ?, ?, ?, ?)""",
-        (amount, description, payer, split_type, talor_share, romi_share)
-    )
+    inserted = 0
+    for amount, description, payer, split_type, category, shares, created_at, import_hash in expenses:
+        cursor.execute(
+            "SELECT 1 FROM expenses WHERE import_hash = ? UNION ALL SELECT 1 FROM archive_expenses WHERE import_hash = ?",
+            (import_hash, import_hash)
+        )
+        if cursor.fetchone():
+            continue
+        _insert_expense(cursor, amount, description, payer, split_type, shares, created_at, import_hash,
+                        category=category)
+        inserted += 1
     conn.commit()
     conn.close()
+    if inserted:
+        _notify_change("expenses")
+    return inserted
 
+@retry_when_locked
 def delete_expense(expense_id: int):
     """Soft Delete."""
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute("UPDATE expenses SET is_deleted = 1 WHERE id = ?", (expense_id,))
+    cursor.execute("UPDATE expenses SET is_deleted = 1, deleted_at = CURRENT_TIMESTAMP WHERE id = ? AND is_deleted = 0", (expense_id,))
+    if cursor.rowcount:
+        _apply_expense(cursor, expense_id, -1)
     conn.commit()
     conn.close()
+    _notify_change("expenses", expense_id)
 
-def calculate_balance():
-    """
-    Calculate the balance between Talor and Romi.
-    Returns positive if Romi owes Talor, negative if Talor owes Romi.
-    
-    Logic: When Talor pays for shared expenses, Romi owes her share to Talor.
-           When Romi pays for shared expenses, Talor owes his share to Romi.
-    """
-    expenses = get_all_expenses() # Only gets is_deleted=0
-    talor_owes = 0
-    romi_owes = 0
-    for expense in expenses:
-        if expense['payer'] == 'טלאור': 
-            # Talor paid - Romi owes her share
-            romi_owes += expense['romi_share']
-        else: 
-            # Romi paid - Talor owes his share
-            talor_owes += expense['talor_share']
-    # Positive = Romi owes Talor, Negative = Talor owes Romi
-    return romi_owes - talor_owes
-
+@retry_when_locked
+def set_expense_category(expense_id: int, category: str):
+    """Move an expense to another category (and its amount to that category's month total)."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT is_deleted FROM expenses WHERE id = ?", (expense_id,))
+    row = cursor.fetchone()
+    if row:
+        live = not row['is_deleted']
+        if live:
+            _apply_expense(cursor, expense_id, -1)
+        cursor.execute("UPDATE expenses SET category = ? WHERE id = ?", (category, expense_id))
+        if live:
+            _apply_expense(cursor, expense_id, +1)
+    conn.commit()
+    conn.close()
+    _notify_change("expenses", expense_id)
 
-# ============== EVENTS FUNCTIONS ==============
+def get_month_totals(month: str = None):
+    """{category: amount spent} in a month ('YYYY-MM', default this month), from the pre-aggregated totals."""
+    month = month or datetime.now().strftime("%Y-%m")
+    materialize_recurring()
+    conn = get_read_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT category, total FROM expense_month_totals WHERE month = ? AND count > 0 ORDER BY total DESC", (month,))
+    totals = {row['category']: row['total'] for row in cursor.fetchall()}
+    conn.close()
+    return totals
 
-def get_all_events():
-    conn = get_connection()
+def get_budgets():
+    """{category: monthly limit}."""
+    conn = get_read_connection()
     cursor = conn.cursor()
-    cursor.execute("SELECT * FROM events WHERE is_deleted = 0 ORDER BY date, time")
-    events = cursor.fetchall()
+    cursor.execute("SELECT category, monthly_limit FROM budgets ORDER BY category")
+    budgets = {row['category']: row['monthly_limit'] for row in cursor.fetchall()}
     conn.close()
-    return events
+    return budgets
 
-def add_event(title: str, date: str, time: str, description: str):
+@retry_when_locked
+def set_budget(category: str, monthly_limit: float = None):
+    """Set a category's monthly limit; None or 0 removes it."""
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute("INSERT INTO events (title, date, time, description) VALUES (?, ?, ?, ?)", (title, date, time, description))
+    if monthly_limit:
+        cursor.execute(
+            "INSERT INTO budgets (category, monthly_limit) VALUES (?, ?) ON CONFLICT (category) DO UPDATE SET monthly_limit = excluded.monthly_limit",
+            (category, monthly_limit)
+        )
+    else:
+        cursor.execute("DELETE FROM budgets WHERE category = ?", (category,))
     conn.commit()
     conn.close()
+    _notify_change("budgets")
 
-def delete_event(event_id: int):
-    """Soft Delete."""
+@retry_when_locked
+def ensure_participants(names):
+    """Make sure the household's members exist in the ledger; others are marked inactive."""
     conn = get_connection()
+    conn.audit_system = True
     cursor = conn.cursor()
-    cursor.execute("UPDATE events SET is_deleted = 1 WHERE id = ?", (event_id,))
+    cursor.executemany("INSERT OR IGNORE INTO participants (name) VALUES (?)", [(name,) for name in names])
+    cursor.execute(
+        f"UPDATE participants SET is_active = name IN ({', '.join('?' * len(names))})", list(names)
+    )
     conn.commit()
     conn.close()
 
-def get_urgent_events_count():
-    conn = get_connection()
+def get_participant_balances():
+    """{name: net balance} - positive means the others owe this participant."""
+    materialize_recurring()
+    conn = get_read_connection()
     cursor = conn.cursor()
-    today = datetime.now().date().isoformat()
-    tomorrow = (datetime.now().date() + timedelta(days=1)).isoformat()
-    cursor.execute("SELECT COUNT(*) FROM events WHERE date IN (?, ?) AND is_deleted = 0", (today, tomorrow))
-    count = cursor.fetchone()[0]
+    cursor.execute("SELECT name, net_balance FROM participants WHERE is_active = 1 OR ABS(net_balance) >= 0.01 ORDER BY id")
+    balances = {row['name']: row['net_balance'] for row in cursor.fetchall()}
     conn.close()
-    return count
+    return balances
 
+def calculate_balance(first_member: str = 'טלאור'):
+    """
+    Net balance of one participant (two-person view of the ledger).
+    Positive if the others owe first_member, negative if first_member owes.
+    """
+    return get_participant_balances().get(first_member, 0.0)
 
-# ============== CHORES FUNCTIONS ==============
 
-def get_all_chores():
-    conn = get_connection()
-    cursor = conn.cursor()
-    # Return ALL chores (done and active) that are not deleted, so App can split them
-    cursor.execute("SELECT * FROM chores WHERE is_deleted = 0 ORDER BY  done ASC, CASE urgency WHEN 'דחוף' THEN 1 WHEN 'גבוה' THEN 2 WHEN 'רגיל' THEN 3 WHEN 'נמוך' THEN 4 END, due_date")
-    chores = cursor.fetchall()
-    conn.close()
-    return chores
+# ============== SETTLE UP ==============
+# Settling moves the expenses out of the live table, so the balances, the expenses list
+# and everything else that scans expenses only see what was added since the last settle-up.
 
-def add_chore(name: str, urgency: str = "רגיל", due_date: str = None):
+@retry_when_locked
+def settle_up():
+    """
+    Record a settlement with every participant's balance right now and move all live
+    expenses to archive_expenses, in one transaction; the balances start again from zero.
+    Trashed expenses stay in the Recycle Bin. Returns the settlement id, or None if there
+    was nothing to settle.
+    """
+    materialize_recurring()
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute("INSERT INTO chores (name, urgency, due_date) VALUES (?, ?, ?)", (name, urgency, due_date))
+    cursor.execute("SELECT MAX(id), COUNT(*), COALESCE(ROUND(SUM(amount), 2), 0) FROM expenses WHERE is_deleted = 0")
+    last_id, count, total = cursor.fetchone()
+    if not count:
+        conn.close()
+        return None
+    cursor.execute("SELECT name, net_balance FROM participants WHERE is_active = 1 OR ABS(net_balance) >= 0.01 ORDER BY id")
+    balances = {row['name']: round(row['net_balance'], 2) for row in cursor.fetchall()}
+    cursor.execute(
+        "INSERT INTO settlements (balances, expense_count, total, last_expense_id) VALUES (?, ?, ?, ?)",
+        (json.dumps(balances, ensure_ascii=False), count, total, last_id)
+    )
+    settlement_id = cursor.lastrowid
+    cursor.execute(
+        """INSERT INTO archive_expenses (original_id, amount, description, payer, split_type, action, original_date,
+                                         category, import_hash, recurring_id, occurrence_date, settlement_id)
+           SELECT id, amount, description, payer, split_type, 'התחשבנות', created_at,
+                  category, import_hash, recurring_id, occurrence_date, ?
+           FROM expenses WHERE is_deleted = 0 AND id <= ?""",
+        (settlement_id, last_id)
+    )
+    # Their shares go with them (trg_expenses_delete_shares); the month totals keep counting them
+    cursor.execute("DELETE FROM expenses WHERE is_deleted = 0 AND id <= ?", (last_id,))
+    _recalculate_balances(cursor)
     conn.commit()
     conn.close()
-
-def mark_chore_done(chore_id: int, user: str):
-    """Marks chore as done (Active -> Completed section)."""
+    _notify_change("expenses")
+    _notify_change("archive_expenses")
+    _notify_change("settlements", settlement_id)
+    return settlement_id
+
+def get_settlements():
+    """Past settle-ups, newest first; balances is a JSON {name: balance} as of each one."""
+    return tuple(_iter_rows("settlements", "SELECT * FROM settlements ORDER BY id DESC LIMIT 50"))
+
+def get_settled_expenses(settlement_id: int):
+    """The expenses one settle-up archived, newest first."""
+    return tuple(_iter_rows(
+        "archive_expenses",
+        "SELECT * FROM archive_expenses WHERE settlement_id = ? ORDER BY original_date DESC",
+        (settlement_id,)
+    ))
+
+
+# ============== RECURRING EXPENSES ==============
+# Templates (rent, bills, subscriptions) turn into ordinary expenses the first time the
+# ledger is read on or after each due date. next_due is the watermark: the first date
+# not generated yet, so a read costs one indexed lookup unless something is due.
+# Generated expenses are real ledger rows - editing or deleting a template only changes
+# the dates that haven't been generated.
+
+def next_occurrence(frequency: str, start_date: str, after: str = None) -> str:
+    """First template date after `after` (or start_date itself). Monthly dates keep start_date's day, clamped to short months."""
+    start = date.fromisoformat(start_date)
+    if after is None or date.fromisoformat(after) < start:
+        return start.isoformat()
+    after = date.fromisoformat(after)
+    if frequency == RECURRING_WEEKLY:
+        return (after + timedelta(days=7 - (after - start).days % 7)).isoformat()
+    year, month = after.year, after.month
+    while True:
+        candidate = date(year, month, min(start.day, calendar.monthrange(year, month)[1]))
+        if candidate > after:
+            return candidate.isoformat()
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+def iter_recurring_expenses():
+    return _iter_rows("recurring_expenses", "SELECT * FROM recurring_expenses WHERE is_deleted = 0 ORDER BY next_due, id")
+
+def get_recurring_expenses():
+    return tuple(iter_recurring_expenses())
+
+@retry_when_locked
+def add_recurring_expense(amount: float, description: str, payer: str, split_type: str,
+                          frequency: str = RECURRING_MONTHLY, start_date: str = None,
+                          category: str = DEFAULT_EXPENSE_CATEGORY):
+    """Add a template; its first expense is generated on start_date (today by default)."""
+    start_date = start_date or date.today().isoformat()
     conn = get_connection()
     cursor = conn.cursor()
-    done_at = datetime.now().isoformat()
-    # Update status instead of deleting
-    cursor.execute("UPDATE chores SET done = 1, done_by = ?, done_at = ? WHERE id = ?", (user, done_at, chore_id))
+    cursor.execute(
+        """INSERT INTO recurring_expenses (amount, description, payer, split_type, frequency, start_date, next_due, category)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+        (amount, description, payer, split_type, frequency, start_date, next_occurrence(frequency, start_date), category)
+    )
     conn.commit()
     conn.close()
+    _notify_change("recurring_expenses", cursor.lastrowid)
 
-def mark_chore_undone(chore_id: int):
-    """Reverts chore to active status."""
+@retry_when_locked
+def edit_recurring_expense(recurring_id: int, amount: float = None, description: str = None, payer: str = None,
+                           split_type: str = None, frequency: str = None, start_date: str = None):
+    """Change a template from its next date on; expenses already generated keep their amounts."""
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute("UPDATE chores SET done = 0, done_by = NULL, done_at = NULL WHERE id = ?", (chore_id,))
+    cursor.execute("SELECT * FROM recurring_expenses WHERE id = ?", (recurring_id,))
+    template = cursor.fetchone()
+    if template:
+        frequency = frequency or template['frequency']
+        start_date = start_date or template['start_date']
+        # A new schedule continues after the last date already generated
+        cursor.execute(
+            """SELECT MAX(occurrence_date) FROM (
+                   SELECT occurrence_date FROM expenses WHERE recurring_id = ?
+                   UNION ALL
+                   SELECT occurrence_date FROM archive_expenses WHERE recurring_id = ?)""",
+            (recurring_id, recurring_id)
+        )
+        next_due = next_occurrence(frequency, start_date, cursor.fetchone()[0])
+        cursor.execute(
+            """UPDATE recurring_expenses SET amount = COALESCE(?, amount), description = COALESCE(?, description),
+                   payer = COALESCE(?, payer), split_type = COALESCE(?, split_type),
+                   frequency = ?, start_date = ?, next_due = ?
+               WHERE id = ?""",
+            (amount, description, payer, split_type, frequency, start_date, next_due, recurring_id)
+        )
     conn.commit()
     conn.close()
+    _notify_change("recurring_expenses", recurring_id)
 
-def delete_chore(chore_id: int):
-    """Soft Delete (Trash)."""
+@retry_when_locked
+def delete_recurring_expense(recurring_id: int):
+    """Soft Delete - stops new expenses; restoring it catches up on the dates missed meanwhile."""
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute("UPDATE chores SET is_deleted = 1 WHERE id = ?", (chore_id,))
+    cursor.execute("UPDATE recurring_expenses SET is_deleted = 1, deleted_at = CURRENT_TIMESTAMP WHERE id = ?", (recurring_id,))
     conn.commit()
     conn.close()
+    _notify_change("recurring_expenses", recurring_id)
+
+@retry_when_locked
+def materialize_recurring(today: str = None) -> int:
+    """Generate the expenses of every template date up to today that hasn't been generated. Returns how many."""
+    today = today or date.today().isoformat()
+    due_sql = "SELECT * FROM recurring_expenses WHERE is_deleted = 0 AND next_due <= ?"
+    # Common case: nothing due, answered from the index without taking the write lock
+    conn = get_read_connection()
+    try:
+        due = conn.execute(due_sql, (today,)).fetchone()
+    except sqlite3.OperationalError:
+        due = None  # Database not initialised yet
+    conn.close()
+    if not due:
+        return 0
 
-def get_archive_chores():
     conn = get_connection()
+    conn.audit_system = True
     cursor = conn.cursor()
-    cursor.execute("SELECT * FROM archive_chores ORDER BY archived_at DESC LIMIT 50")
-    items = cursor.fetchall()
+    cursor.execute("SELECT name FROM participants WHERE is_active = 1 ORDER BY id")
+    members = [row['name'] for row in cursor.fetchall()]
+    generated = 0
+    # Re-read under the write lock: another session may have generated them meanwhile
+    for template in cursor.execute(due_sql, (today,)).fetchall():
+        occurrence = template['next_due']
+        while occurrence <= today:
+            cursor.execute("SELECT 1 FROM expenses WHERE recurring_id = ? AND occurrence_date = ?", (template['id'], occurrence))
+            if not cursor.fetchone():
+                shares = compute_shares(template['amount'], template['payer'], template['split_type'], members or [template['payer']])
+                _insert_expense(cursor, template['amount'], template['description'], template['payer'], template['split_type'],
+                                shares, f"{occurrence} 00:00:00", recurring_id=template['id'], occurrence_date=occurrence,
+                                category=template['category'])
+                generated += 1
+            occurrence = next_occurrence(template['frequency'], template['start_date'], occurrence)
+        cursor.execute("UPDATE recurring_expenses SET next_due = ? WHERE id = ?", (occurrence, template['id']))
+    conn.commit()
     conn.close()
-    return items
+    _notify_change("recurring_expenses")
+    if generated:
+        _notify_change("expenses")
+    return generated
 
 
-# ============== CAT CARE FUNCTIONS ==============
+# ============== EVENTS FUNCTIONS ==============
 
-def get_all_cat_tasks():
+# When an event starts; NULL for dates SQLite can't parse (those count as upcoming)
+_EVENT_START = "datetime(date || ' ' || COALESCE(NULLIF(time, ''), '00:00'))"
+
+def iter_events(past: bool = None, now: str = None):
+    """
+    Yield events by date and time. past=True/False splits them at now
+    ('YYYY-MM-DD HH:MM:SS', default: the current time) into started and upcoming.
+    """
+    sql = "SELECT * FROM events WHERE is_deleted = 0"
+    params = ()
+    if past is not None:
+        now = now or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        if past:
+            sql += f" AND {_EVENT_START} < ?"
+        else:
+            sql += f" AND ({_EVENT_START} IS NULL OR {_EVENT_START} >= ?)"
+        params = (now,)
+    return _iter_rows("events", sql + " ORDER BY date, time", params)
+
+def get_all_events(past: bool = None, now: str = None):
+    return tuple(iter_events(past, now))
+
+@retry_when_locked
+def add_event(title: str, date: str, time: str, description: str):
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute("SELECT * FROM cat_care WHERE is_deleted = 0 ORDER BY id")
-    tasks = cursor.fetchall()
+    cursor.execute("INSERT INTO events (title, date, time, description) VALUES (?, ?, ?, ?)", (title, date, time, description))
+    conn.commit()
     conn.close()
-    return tasks
+    _notify_change("events", cursor.lastrowid)
 
-def add_cat_task(name: str, hours: int):
+@retry_when_locked
+def delete_event(event_id: int):
+    """Soft Delete."""
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute("INSERT OR IGNORE INTO cat_care (task_name, frequency_hours) VALUES (?, ?)", (name, hours))
+    cursor.execute("UPDATE events SET is_deleted = 1, deleted_at = CURRENT_TIMESTAMP WHERE id = ?", (event_id,))
     conn.commit()
     conn.close()
+    _notify_change("events", event_id)
 
-def edit_cat_task(task_id: int, name: str, hours: int):
-    conn = get_connection()
+def get_urgent_events_count(today: str = None):
+    """Events today or tomorrow (today as 'YYYY-MM-DD', default: the current date)."""
+    conn = get_read_connection()
     cursor = conn.cursor()
-    cursor.execute("UPDATE cat_care SET task_name = ?, frequency_hours = ? WHERE id = ?", (name, hours, task_id))
-    conn.commit()
+    day = datetime.fromisoformat(today).date() if today else datetime.now().date()
+    today = day.isoformat()
+    tomorrow = (day + timedelta(days=1)).isoformat()
+    cursor.execute("SELECT COUNT(*) FROM events WHERE date IN (?, ?) AND is_deleted = 0", (today, tomorrow))
+    count = cursor.fetchone()[0]
     conn.close()
+    return count
+
+
+# ============== CHORES FUNCTIONS ==============
+
+def iter_chores(done: bool = None):
+    """Yield chores (open first, by sort_key and due date); done=False/True returns only open / completed ones."""
+    sql = "SELECT * FROM chores WHERE is_deleted = 0"
+    params = ()
+    if done is not None:
+        sql += " AND done = ?"
+        params = (int(done),)
+    # Matches idx_chores_list, so SQLite walks the index instead of sorting
+    return _iter_rows("chores", sql + " ORDER BY done, sort_key, due_date", params)
+
+def get_all_chores(done: bool = None):
+    return tuple(iter_chores(done))
 
-def update_cat_task(task_id: int, user: str):
+@retry_when_locked
+def add_chore(name: str, priority: str = "Regular 🔵", due_date: str = None):
+    """Add a chore; priority is any CHORE_SORT_KEYS value ("Urgent 🔴" / "Regular 🔵" or the Hebrew urgencies)."""
     conn = get_connection()
     cursor = conn.cursor()
-    now = datetime.now().isoformat()
-    cursor.execute("UPDATE cat_care SET last_done_at = ?, done_by = ? WHERE id = ?", (now, user, task_id))
+    # urgency keeps the same value for older readers of that column
+    cursor.execute(
+        "INSERT INTO chores (name, priority, urgency, due_date, sort_key) VALUES (?, ?, ?, ?, ?)",
+        (name, priority, priority, due_date, chore_sort_key(priority))
+    )
     conn.commit()
     conn.close()
+    _notify_change("chores", cursor.lastrowid)
 
-def delete_cat_task(task_id: int):
-    """Soft Delete."""
+def _write_chore_done(cursor, chore_id: int, user: str, done_at: str = None):
+    done_at = done_at or datetime.now().isoformat()
+    # Update status instead of deleting
+    cursor.execute("UPDATE chores SET done = 1, done_by = ?, done_at = ? WHERE id = ?", (user, done_at, chore_id))
+    return "chores", chore_id
+
+def _write_chore_undone(cursor, chore_id: int):
+    cursor.execute("UPDATE chores SET done = 0, done_by = NULL, done_at = NULL WHERE id = ?", (chore_id,))
+    return "chores", chore_id
+
+@retry_when_locked
+def mark_chore_done(chore_id: int, user: str, done_at: str = None):
+    """Marks chore as done (Active -> Completed section)."""
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute("UPDATE cat_care SET is_deleted = 1 WHERE id = ?", (task_id,))
+    _write_chore_done(cursor, chore_id, user, done_at)
     conn.commit()
     conn.close()
+    _notify_change("chores", chore_id)
 
-def get_overdue_cat_tasks():
+@retry_when_locked
+def mark_chore_undone(chore_id: int):
+    """Reverts chore to active status."""
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute("SELECT * FROM cat_care WHERE is_deleted = 0")
-    tasks = cursor.fetchall()
-    
-    overdue = []
-    now = datetime.now()
-    for task in tasks:
-        is_overdue = False
-        if not task['last_done_at']:
-             is_overdue = True
-        else:
-             last_done = datetime.fromisoformat(task['last_done_at'])
-             diff = (now - last_done).total_seconds() / 3600
-             if diff > task['frequency_hours']: is_overdue = True
-        
-        if is_overdue: overdue.append(task)
-        
+    _write_chore_undone(cursor, chore_id)
+    conn.commit()
     conn.close()
-    return overdue
+    _notify_change("chores", chore_id)
 
-def is_cat_task_overdue(last_done_at, frequency_hours):
-    if not last_done_at: return True
-    last_dt = datetime.fromisoformat(last_done_at)
-    hours_since = (datetime.now() - last_dt).total_seconds() / 3600
-    return hours_since > frequency_hours
+@retry_when_locked
+def delete_chore(chore_id: int):
+    """Soft Delete (Trash)."""
+    conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute(
-        "UPDATE cat_care SET last_done_at = ?, done_by = ? WHERE id = ?",
-        (datetime.now().isoformat(), user, task_id)
-    )
+    cursor.execute("UPDATE chores SET is_deleted = 1, deleted_at = CURRENT_TIMESTAMP WHERE id = ?", (chore_id,))
     conn.commit()
     conn.close()
+    _notify_change("chores", chore_id)
 
+def get_archive_chores():
+    return tuple(_iter_rows("archive_chores", "SELECT * FROM archive_chores ORDER BY archived_at DESC LIMIT 50"))
 
-def is_cat_task_overdue(last_done_at: str, frequency_hours: int) -> bool:
-    """Check if a cat care task is overdue."""
-    if last_done_at is None:
-        return True
-    
-    last_done = datetime.fromisoformat(last_done_at)
-    now = datetime.now()
-    hours_elapsed = (now - last_done).total_seconds() / 3600
-    return hours_elapsed > frequency_hours
 
+# ============== CAT CARE FUNCTIONS ==============
 
-def edit_cat_task(task_id: int, task_name: str = None, frequency_hours: int = None):
-    """Edit a cat care task's name and/or frequency."""
+def iter_cat_tasks():
+    return _iter_rows("cat_care", "SELECT * FROM cat_care WHERE is_deleted = 0 ORDER BY id")
+
+def get_all_cat_tasks():
+    return tuple(iter_cat_tasks())
+
+@retry_when_locked
+def add_cat_task(task_name: str, frequency_hours: int):
+    """
+    Add a new cat care task. Names are unique: a task of that name in the Recycle Bin is
+    restored with the new frequency instead, and an existing live one is left as it is.
+    """
     conn = get_connection()
     cursor = conn.cursor()
-    
-    if task_name is not None:
-        cursor.execute("UPDATE cat_care SET task_name = ? WHERE id = ?", (task_name, task_id))
-    if frequency_hours is not None:
-        cursor.execute("UPDATE cat_care SET frequency_hours = ? WHERE id = ?", (frequency_hours, task_id))
-    
+    cursor.execute("SELECT id FROM cat_care WHERE task_name = ?", (task_name,))
+    existing = cursor.fetchone()
+    if existing:
+        task_id = existing['id']
+        cursor.execute(
+            "UPDATE cat_care SET is_deleted = 0, deleted_at = NULL, frequency_hours = ? WHERE id = ? AND is_deleted = 1",
+            (frequency_hours, task_id)
+        )
+    else:
+        cursor.execute("INSERT INTO cat_care (task_name, frequency_hours) VALUES (?, ?)", (task_name, frequency_hours))
+        task_id = cursor.lastrowid
     conn.commit()
     conn.close()
+    _notify_change("cat_care", task_id)
 
-
-def add_cat_task(task_name: str, frequency_hours: int):
-    """Add a new cat care task."""
+@retry_when_locked
+def edit_cat_task(task_id: int, task_name: str = None, frequency_hours: int = None, grace_hours: int = None):
+    """Edit a cat care task's name, frequency and/or grace window."""
     conn = get_connection()
     cursor = conn.cursor()
     cursor.execute(
-        "INSERT OR IGNORE INTO cat_care (task_name, frequency_hours) VALUES (?, ?)",
-        (task_name, frequency_hours)
+        """UPDATE cat_care SET task_name = COALESCE(?, task_name), frequency_hours = COALESCE(?, frequency_hours),
+               grace_hours = COALESCE(?, grace_hours)
+           WHERE id = ?""",
+        (task_name, frequency_hours, grace_hours, task_id)
     )
     conn.commit()
     conn.close()
+    _notify_change("cat_care", task_id)
+
+def _write_cat_task_done(cursor, task_id: int, user: str, done_at: str = None):
+    done_at = done_at or datetime.now().isoformat()
+    cursor.execute("UPDATE cat_care SET last_done_at = ?, done_by = ? WHERE id = ?", (done_at, user, task_id))
+    return "cat_care", task_id
 
+@retry_when_locked
+def update_cat_task(task_id: int, user: str, done_at: str = None):
+    conn = get_connection()
+    cursor = conn.cursor()
+    _write_cat_task_done(cursor, task_id, user, done_at)
+    conn.commit()
+    conn.close()
+    _notify_change("cat_care", task_id)
 
+@retry_when_locked
 def delete_cat_task(task_id: int):
-    """Delete a cat care task."""
+    """Soft Delete."""
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute("DELETE FROM cat_care WHERE id = ?", (task_id,))
+    cursor.execute("UPDATE cat_care SET is_deleted = 1, deleted_at = CURRENT_TIMESTAMP WHERE id = ?", (task_id,))
     conn.commit()
     conn.close()
+    _notify_change("cat_care", task_id)
+
+
+# ============== BATCHED WRITES ==============
+
+# Tap-sized mutations the write queue (writequeue.py) may group into one transaction.
+# Each takes a cursor plus the public function's arguments and returns (table_name, row_id).
+BATCHABLE_WRITES = {
+    "update_shopping_item": _write_shopping_bought,
+    "mark_chore_done": _write_chore_done,
+    "mark_chore_undone": _write_chore_undone,
+    "update_cat_task": _write_cat_task_done,
+}
 
 
-def get_overdue_cat_tasks():
-    """Get all overdue cat care tasks for notifications."""
-    tasks = get_all_cat_tasks()
-    overdue = []
-    for task in tasks:
-        if is_cat_task_overdue(task['last_done_at'], task['frequency_hours']):
-            overdue.append(task)
-    return overdue
+@retry_when_locked
+def apply_writes(ops):
+    """
+    Apply [(name, args), ...] from BATCHABLE_WRITES in a single transaction (one fsync).
+    Every op runs in its own savepoint, so one failure does not undo the others.
+    Returns a list with None (applied) or the exception for each op.
+    """
+    results = []
+    changed = []
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        for name, args in ops:
+            cursor.execute("SAVEPOINT queued_write")
+            try:
+                changed.append(BATCHABLE_WRITES[name](cursor, *args))
+                cursor.execute("RELEASE queued_write")
+                # Taps from different sessions share this transaction but are undone one by one
+                _group_change_log(conn)
+                results.append(None)
+            except Exception as e:
+                cursor.execute("ROLLBACK TO queued_write")
+                cursor.execute("RELEASE queued_write")
+                results.append(e)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    for table_name, row_id in changed:
+        _notify_change(table_name, row_id)
+    return results
@@ -0,0 +1,252 @@
+"""
+Bank / card statement import for Household Management App.
+Streams a CSV export row by row, maps its columns to expenses, splits each one
+with the add dialog's rules (database.compute_shares) and inserts them all in
+one transaction. Every row gets a content hash stored in expenses.import_hash,
+so importing the same (or an overlapping) statement again skips what's there.
+
+    python importer.py statement.csv --payer טלאור [--amount סכום --description "שם בית העסק"] [--dry-run]
+"""
+
+import argparse
+import csv
+import hashlib
+import io
+import itertools
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+import database as db
+
+# Rows checked against the database per query in preview()
+CHUNK_ROWS = 2000
+# Statement exports are UTF-8 or, from Israeli banks, Windows-1255
+ENCODINGS = ("utf-8-sig", "cp1255")
+DATE_FORMATS = ("%d/%m/%Y", "%d/%m/%y", "%Y-%m-%d", "%d.%m.%Y", "%d.%m.%y", "%d-%m-%Y")
+
+# Header names recognised for each field (lower-cased), in order of preference
+HEADER_ALIASES = {
+    "amount": ("amount", "סכום", "סכום חיוב", "סכום החיוב", "סכום העסקה", "סכום בש\"ח", "חיוב"),
+    "description": ("description", "תיאור", "שם בית העסק", "שם בית עסק", "בית עסק", "פירוט", "merchant"),
+    "date": ("date", "תאריך", "תאריך עסקה", "תאריך רכישה", "תאריך החיוב"),
+    "payer": ("payer", "משלם", "שולם ע\"י"),
+    "split_type": ("split", "split_type", "חלוקה"),
+}
+REQUIRED_FIELDS = ("amount", "description")
+
+
+class ImportRow(NamedTuple):
+    line: int
+    amount: float
+    description: str
+    payer: str
+    split_type: str
+    category: str
+    shares: dict
+    created_at: Optional[str]
+    import_hash: str
+
+
+class ImportResult(NamedTuple):
+    imported: int
+    duplicates: int
+    skipped: list   # (line, reason) for rows that couldn't be read
+
+
+@contextmanager
+def open_text(source):
+    """Text stream over a path, bytes, or binary file-like (e.g. a Streamlit upload), rewound first."""
+    if isinstance(source, (str, Path)):
+        raw = open(source, "rb")
+    elif isinstance(source, bytes):
+        raw = io.BytesIO(source)
+    else:
+        raw = source
+        raw.seek(0)
+    head = raw.read(65536)
+    raw.seek(0)
+    encoding = ENCODINGS[-1]
+    for candidate in ENCODINGS:
+        try:
+            head.decode(candidate)
+        except UnicodeDecodeError as e:
+            # A multi-byte character cut off at the end of the sample is fine
+            if e.start < len(head) - 3:
+                continue
+        encoding = candidate
+        break
+    text = io.TextIOWrapper(raw, encoding=encoding, newline="")
+    try:
+        yield text
+    finally:
+        text.detach()
+        if isinstance(source, (str, Path)):
+            raw.close()
+
+
+def read_header(source) -> list:
+    with open_text(source) as text:
+        return next(csv.reader(text), [])
+
+
+def guess_mapping(header) -> dict:
+    """{field: column name} for the columns HEADER_ALIASES recognises."""
+    by_name = {column.strip().lower(): column for column in header}
+    mapping = {}
+    for field, aliases in HEADER_ALIASES.items():
+        for alias in aliases:
+            if alias in by_name:
+                mapping[field] = by_name[alias]
+                break
+    return mapping
+
+
+def parse_amount(text: str) -> float:
+    """'₪1,234.50' / '(12.00)' / '-12' -> float; raises ValueError."""
+    text = (text or "").strip().replace("₪", "").replace(",", "").replace("‏", "").strip()
+    negative = text.startswith("(") and text.endswith(")")
+    value = float(text.strip("()"))
+    return -value if negative else value
+
+
+def parse_date(text: str) -> str:
+    """Statement date -> 'YYYY-MM-DD 00:00:00' (the expenses.created_at format); raises ValueError."""
+    text = (text or "").strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).strftime("%Y-%m-%d 00:00:00")
+        except ValueError:
+            continue
+    raise ValueError(f"unknown date format: {text!r}")
+
+
+class ExpenseImport:
+    """
+    One statement file with its column mapping and defaults.
+
+    mapping: {field: column} for amount, description and optionally date, payer and split_type.
+    Rows without a usable payer / split type column get the defaults; every row goes to
+    category. negate=True flips the
+    sign for exports that list charges as negative numbers; rows that end up <= 0 (refunds,
+    payments) are skipped.
+    """
+
+    def __init__(self, source, mapping: dict, members, payer: str, split_type: str = db.SPLIT_EQUAL,
+                 negate: bool = False, category: str = db.DEFAULT_EXPENSE_CATEGORY):
+        missing = [field for field in REQUIRED_FIELDS if not mapping.get(field)]
+        if missing:
+            raise ValueError(f"No column mapped for: {', '.join(missing)}")
+        self.source = source
+        self.mapping = mapping
+        self.members = list(members)
+        self.payer = payer
+        self.split_type = split_type
+        self.negate = negate
+        self.category = category
+        self.skipped = []
+
+    def rows(self):
+        """Yield an ImportRow per usable line, streaming the file; unusable lines go to self.skipped."""
+        self.skipped = []
+        splits = (db.SPLIT_EQUAL, db.SPLIT_PAYER_ONLY, db.SPLIT_OTHERS_ONLY)
+        # Identical purchases on one day are still separate expenses: number the repeats
+        seen = Counter()
+        with open_text(self.source) as text:
+            for line, record in enumerate(csv.DictReader(text), start=2):
+                try:
+                    amount = parse_amount(record.get(self.mapping["amount"]))
+                    if self.negate:
+                        amount = -amount
+                    if amount <= 0:
+                        raise ValueError("not a charge")
+                    description = " ".join((record.get(self.mapping["description"]) or "").split())
+                    if not description:
+                        raise ValueError("no description")
+                    created_at = parse_date(record.get(self.mapping["date"])) if self.mapping.get("date") else None
+                except (TypeError, ValueError) as e:
+                    self.skipped.append((line, str(e)))
+                    continue
+                payer = (record.get(self.mapping.get("payer") or "") or "").strip()
+                payer = payer if payer in self.members else self.payer
+                split_type = (record.get(self.mapping.get("split_type") or "") or "").strip()
+                split_type = split_type if split_type in splits else self.split_type
+
+                amount = round(amount, 2)
+                key = f"{created_at or ''}|{amount:.2f}|{description.casefold()}|{payer}"
+                seen[key] += 1
+                import_hash = hashlib.sha1(f"{key}|{seen[key]}".encode("utf-8")).hexdigest()
+                shares = db.compute_shares(amount, payer, split_type, self.members)
+                yield ImportRow(line, amount, description, payer, split_type, self.category, shares, created_at,
+                                import_hash)
+
+    def preview(self, limit: int = 20):
+        """(first limit rows, how many rows are new, how many were imported before) - reads the whole file."""
+        first, new, duplicates = [], 0, 0
+        rows = self.rows()
+        while True:
+            chunk = list(itertools.islice(rows, CHUNK_ROWS))
+            if not chunk:
+                break
+            existing = db.find_import_hashes(row.import_hash for row in chunk)
+            duplicates += len(existing)
+            new += len(chunk) - len(existing)
+            if len(first) < limit:
+                first += [(row, row.import_hash in existing) for row in chunk[:limit - len(first)]]
+        return first, new, duplicates
+
+    def run(self) -> ImportResult:
+        """Import every new row in one transaction."""
+        total = 0
+
+        def counted():
+            nonlocal total
+            for row in self.rows():
+                total += 1
+                # (amount, description, payer, split_type, category, shares, created_at, import_hash)
+                yield row[1:]
+
+        imported = db.add_imported_expenses(counted())
+        return ImportResult(imported, total - imported, self.skipped)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import a bank / card statement CSV as expenses")
+    parser.add_argument("file", type=Path)
+    parser.add_argument("--db", type=Path, default=db.DB_PATH, help="database file (default: household.db)")
+    parser.add_argument("--payer", required=True, help="who paid rows without a payer column")
+    parser.add_argument("--split", default=db.SPLIT_EQUAL, help="split type for rows without one")
+    parser.add_argument("--negate", action="store_true", help="charges are negative numbers in this export")
+    parser.add_argument("--category", default=db.DEFAULT_EXPENSE_CATEGORY, help="expense category for every row")
+    for field in HEADER_ALIASES:
+        parser.add_argument(f"--{field.replace('_', '-')}", dest=field, help=f"column holding the {field}")
+    parser.add_argument("--dry-run", action="store_true", help="only show what would be imported")
+    args = parser.parse_args()
+
+    db.use_database(args.db)
+    db.init_database()
+    mapping = guess_mapping(read_header(args.file))
+    mapping.update({field: getattr(args, field) for field in HEADER_ALIASES if getattr(args, field)})
+    members = sorted(db.get_participant_balances()) or [args.payer]
+    try:
+        statement = ExpenseImport(args.file, mapping, members, args.payer, args.split, args.negate, args.category)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.dry_run:
+        first, new, duplicates = statement.preview()
+        for row, duplicate in first:
+            print(f"{row.line:>6}  {row.created_at or '':<19}  {row.amount:>10.2f}  {row.payer}  {row.description}"
+                  f"{'  (already imported)' if duplicate else ''}")
+        print(f"{new} new, {duplicates} already imported, {len(statement.skipped)} unreadable")
+        return
+    result = statement.run()
+    print(f"Imported {result.imported}, skipped {result.duplicates} already imported, {len(result.skipped)} unreadable")
+    for line, reason in result.skipped[:20]:
+        print(f"  line {line}: {reason}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Settle-up computation for Household Management App.
+Turns the participants' net balances into the smallest set of transfers.
+"""
+
+from typing import List, NamedTuple
+
+# Households up to this size get the optimal answer (O(n * 2^n)); larger ones use greedy matching
+EXACT_SETTLE_LIMIT = 12
+
+
+class Transfer(NamedTuple):
+    debtor: str
+    creditor: str
+    amount: float
+
+
+def _greedy(balances: dict) -> List[Transfer]:
+    """Match the largest debtor with the largest creditor until everyone is even (amounts in agorot)."""
+    creditors = sorted(((v, k) for k, v in balances.items() if v > 0), reverse=True)
+    debtors = sorted(((-v, k) for k, v in balances.items() if v < 0), reverse=True)
+    transfers = []
+    i = j = 0
+    while i < len(debtors) and j < len(creditors):
+        owe, debtor = debtors[i]
+        due, creditor = creditors[j]
+        paid = min(owe, due)
+        transfers.append(Transfer(debtor, creditor, paid / 100))
+        debtors[i] = (owe - paid, debtor)
+        creditors[j] = (due - paid, creditor)
+        if debtors[i][0] == 0:
+            i += 1
+        if creditors[j][0] == 0:
+            j += 1
+    return transfers
+
+
+def _zero_sum_groups(names: list, cents: list) -> List[list]:
+    """
+    Split people into as many groups that settle among themselves as possible.
+    A group of k people needs k - 1 transfers, so more groups means fewer transfers.
+    """
+    n = len(names)
+    full = (1 << n) - 1
+    sums = [0] * (1 << n)
+    for mask in range(1, full + 1):
+        low = mask & -mask
+        sums[mask] = sums[mask ^ low] + cents[low.bit_length() - 1]
+
+    # best[mask] = most zero-sum prefixes when the people in mask are added one at a time
+    best = [0] * (1 << n)
+    last = [0] * (1 << n)
+    for mask in range(1, full + 1):
+        top = -1
+        for i in range(n):
+            if mask >> i & 1 and best[mask ^ (1 << i)] > top:
+                top = best[mask ^ (1 << i)]
+                last[mask] = i
+        best[mask] = top + (1 if sums[mask] == 0 else 0)
+
+    order = []
+    mask = full
+    while mask:
+        order.append(last[mask])
+        mask ^= 1 << last[mask]
+    order.reverse()
+
+    groups, current, running = [], [], 0
+    for i in order:
+        current.append(names[i])
+        running += cents[i]
+        if running == 0:
+            groups.append(current)
+            current = []
+    return groups
+
+
+def minimal_transfers(balances: dict) -> List[Transfer]:
+    """
+    balances: {name: net balance}, positive = is owed money. Returns transfers that
+    settle everyone, with the fewest transfers possible for up to EXACT_SETTLE_LIMIT people.
+    """
+    cents = {name: round(value * 100) for name, value in balances.items()}
+    cents = {name: value for name, value in cents.items() if value}
+    # Float drift can leave the total a few agorot off zero; absorb it in the largest balance
+    drift = sum(cents.values())
+    if drift and cents:
+        largest = max(cents, key=lambda name: abs(cents[name]))
+        cents[largest] -= drift
+        cents = {name: value for name, value in cents.items() if value}
+    if not cents:
+        return []
+    if len(cents) > EXACT_SETTLE_LIMIT:
+        return _greedy(cents)
+
+    names = list(cents)
+    transfers = []
+    for group in _zero_sum_groups(names, [cents[name] for name in names]):
+        transfers.extend(_greedy({name: cents[name] for name in group}))
+    return transfers
@@ -0,0 +1,358 @@
+"""
+Load test for Household Management App.
+Drives app.py with N concurrent AppTest sessions against one SQLite file.
+AppTest keeps process-wide state, so every session runs in its own process;
+the sessions contend for the database like phones on one server do, but each
+warms its own Streamlit caches.
+Each session switches tabs, toggles edit mode, taps items and adds new ones.
+The report gives rerun latency percentiles per tab and how often SQLite made a
+connection wait for another connection's lock.
+
+    python loadtest.py --sessions 20 --iterations 30 --max-p95 800
+
+Runs against a temporary copy of household.db unless --db is given.
+"""
+
+import argparse
+import json
+import multiprocessing
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import database as db
+
+APP_FILE = Path(__file__).parent / "app.py"
+TABS = ["expenses", "shopping", "chores", "events", "cat"]
+
+# The same busy wait sqlite3.connect() does by default, but counted
+LOCK_TIMEOUT = 5.0
+LOCK_RETRY_SLEEP = 0.001
+
+# Text inputs filled in the add dialog of each tab
+ADD_FIELDS = {
+    "expenses": {"dlg_exp_amount": "12.5", "dlg_exp_desc": "loadtest"},
+    "shopping": {"dlg_shop_name": "loadtest"},
+    "chores": {"dlg_chore_name": "loadtest"},
+    "events": {"dlg_event_title": "loadtest"},
+    "cat": {"dlg_cat_name": "loadtest"},
+}
+
+# Buttons that are one-tap writes (go through the write queue)
+TAP_PREFIXES = ("buy_", "do_chore_", "undo_chore_", "do_cat_")
+
+# Session state a session keeps when its AppTest is rebuilt
+CARRIED_STATE = ("authenticated", "household_id", "active_tab", "edit_mode", "pending_writes")
+
+# Relative frequency of each session action
+ACTION_WEIGHTS = {"tab": 5, "edit": 2, "tap": 2, "add": 1}
+
+
+# ============== LOCK WAIT COUNTING ==============
+
+class LockStats:
+    """Thread-safe counters filled by the instrumented connections."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.statements_waited = 0
+        self.retries = 0
+        self.wait_seconds = 0.0
+        self.timeouts = 0
+
+    def record(self, retries: int, waited: float, timed_out: bool):
+        with self._lock:
+            self.statements_waited += 1
+            self.retries += retries
+            self.wait_seconds += waited
+            self.timeouts += timed_out
+
+    def as_dict(self):
+        return {
+            "statements_waited": self.statements_waited,
+            "retries": self.retries,
+            "wait_ms": round(self.wait_seconds * 1000, 1),
+            "timeouts": self.timeouts,
+        }
+
+
+lock_stats = LockStats()
+
+
+def _with_lock_retry(call, *args):
+    """Run a sqlite3 call with timeout=0 semantics, retrying SQLITE_BUSY like the busy handler would."""
+    started = None
+    retries = 0
+    while True:
+        try:
+            result = call(*args)
+        except sqlite3.OperationalError as e:
+            if "locked" not in str(e) and "busy" not in str(e):
+                raise
+            now = time.perf_counter()
+            started = started or now
+            if now - started >= LOCK_TIMEOUT:
+                lock_stats.record(retries, now - started, timed_out=True)
+                raise
+            retries += 1
+            time.sleep(LOCK_RETRY_SLEEP)
+            continue
+        if started is not None:
+            lock_stats.record(retries, time.perf_counter() - started, timed_out=False)
+        return result
+
+
+class CountingCursor(sqlite3.Cursor):
+    def execute(self, *args):
+        return _with_lock_retry(super().execute, *args)
+
+    def executemany(self, *args):
+        return _with_lock_retry(super().executemany, *args)
+
+
+class CountingConnection:
+    """Mixin for database.py's connection classes."""
+
+    def cursor(self, factory=CountingCursor):
+        return super().cursor(factory)
+
+    def execute(self, *args):
+        return _with_lock_retry(super().execute, *args)
+
+    def executemany(self, *args):
+        return _with_lock_retry(super().executemany, *args)
+
+    def commit(self):
+        return _with_lock_retry(super().commit)
+
+
+class CountingWriteConnection(CountingConnection, db.WriteConnection):
+    pass
+
+
+class CountingReadConnection(CountingConnection, db.ReadConnection):
+    pass
+
+
+def count_lock_waits():
+    """Make database.py's connections count lock waits instead of hiding them in the busy timeout."""
+    db.BUSY_TIMEOUT = 0
+    db.WriteConnection = CountingWriteConnection
+    db.ReadConnection = CountingReadConnection
+
+
+# ============== SESSIONS ==============
+
+class Session:
+    """One simulated phone: an AppTest instance doing random actions."""
+
+    def __init__(self, index: int, iterations: int, think: float, seed: int):
+        self.name = f"session-{index}"
+        self.iterations = iterations
+        self.think = think
+        self.random = random.Random(seed + index)
+        self.timings = defaultdict(list)
+        self.errors = []
+        self.at = None
+
+    def _run_app(self, action: str):
+        started = time.perf_counter()
+        self.at.run()
+        elapsed = time.perf_counter() - started
+        if self.at.exception:
+            self.errors.append(f"{action}: {self.at.exception[0].message}")
+        # The first (cold) run is only reported under action:login
+        if action != "login":
+            self.timings[self.at.session_state["active_tab"]].append(elapsed)
+        self.timings[f"action:{action}"].append(elapsed)
+
+    def _button(self, key: str):
+        for button in self.at.button:
+            if button.key == key:
+                return button
+        return None
+
+    def do_tab(self):
+        self._button(f"nav_{self.random.choice(TABS)}").click()
+        self._run_app("tab")
+
+    def do_edit(self):
+        self._button("edit_mode_toggle").click()
+        self._run_app("edit")
+
+    def do_tap(self):
+        taps = [b for b in self.at.button if b.key and b.key.startswith(TAP_PREFIXES)]
+        if not taps:
+            return self.do_tab()
+        self.random.choice(taps).click()
+        self._run_app("tap")
+
+    def do_add(self):
+        tab = self.at.session_state["active_tab"]
+        # AppTest forgets an open dialog on rerun, so the FAB is pressed again with Save
+        self._button("fab_button").click()
+        self._run_app("open_dialog")
+        text_keys = {widget.key for widget in self.at.text_input}
+        for key, value in ADD_FIELDS[tab].items():
+            if key in text_keys:
+                self.at.text_input(key=key).input(f"{value} {self.name}" if key.endswith(("name", "desc", "title")) else value)
+                continue
+            # The shopping name is a selectbox of past purchases; AppTest can't type a new entry into it
+            options = self.at.selectbox(key=key).options
+            if not options:
+                return
+            self.at.selectbox(key=key).set_value(self.random.choice(options))
+        save = [b for b in self.at.button if b.key is None and "שמור" in b.label]
+        if not save:
+            return
+        save[0].click()
+        self._button("fab_button").click()
+        self._run_app("add")
+        # The dialog's st.rerun() leaves its widgets in AppTest's element tree; start from a clean one
+        self._new_app()
+
+    def _new_app(self):
+        from streamlit.testing.v1 import AppTest
+        state = {}
+        if self.at is not None:
+            state = {key: self.at.session_state[key] for key in CARRIED_STATE if key in self.at.session_state}
+        self.at = AppTest.from_file(str(APP_FILE), default_timeout=60)
+        for key, value in state.items():
+            self.at.session_state[key] = value
+        self.at.run()
+
+    def run(self, barrier=None):
+        from streamlit.testing.v1 import AppTest
+        self.at = AppTest.from_file(str(APP_FILE), default_timeout=60)
+        self.at.session_state["authenticated"] = True
+        self._run_app("login")
+        # Start the actions together, once every session has imported and logged in
+        if barrier is not None:
+            barrier.wait()
+        actions = list(ACTION_WEIGHTS)
+        weights = list(ACTION_WEIGHTS.values())
+        for _ in range(self.iterations):
+            action = self.random.choices(actions, weights)[0]
+            try:
+                getattr(self, f"do_{action}")()
+            except Exception as e:
+                self.errors.append(f"{action}: {e!r}")
+            if self.think:
+                time.sleep(self.random.uniform(0, 2 * self.think))
+
+
+def run_session(index: int, args, barrier, results):
+    """Process entry point: run one Session and send back its timings, errors and lock stats."""
+    # Sessions log in without a PIN, so they all use the default household
+    db.DB_PATH = args.db
+    count_lock_waits()
+    session = Session(index, args.iterations, args.think, args.seed)
+    try:
+        session.run(barrier)
+    except Exception as e:
+        session.errors.append(f"session: {e!r}")
+    results.put((dict(session.timings), session.errors, lock_stats.as_dict()))
+
+
+# ============== REPORT ==============
+
+def percentile(values, p: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(p / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(timings) -> dict:
+    return {
+        name: {
+            "runs": len(values),
+            "p50_ms": round(percentile(values, 50) * 1000, 1),
+            "p90_ms": round(percentile(values, 90) * 1000, 1),
+            "p95_ms": round(percentile(values, 95) * 1000, 1),
+            "p99_ms": round(percentile(values, 99) * 1000, 1),
+            "max_ms": round(max(values) * 1000, 1),
+        }
+        for name, values in sorted(timings.items()) if values
+    }
+
+
+def print_report(report: dict):
+    print(f"\n{report['sessions']} sessions x {report['iterations']} actions in {report['wall_seconds']:.1f}s")
+    print(f"{'':<20}{'runs':>6}{'p50':>9}{'p90':>9}{'p95':>9}{'p99':>9}{'max':>9}  (ms)")
+    for name, row in report["latency"].items():
+        print(f"{name:<20}{row['runs']:>6}{row['p50_ms']:>9}{row['p90_ms']:>9}{row['p95_ms']:>9}{row['p99_ms']:>9}{row['max_ms']:>9}")
+    locks = report["lock_waits"]
+    print(f"\nLock waits: {locks['statements_waited']} statements, {locks['retries']} retries, "
+          f"{locks['wait_ms']} ms waiting, {locks['timeouts']} timed out")
+    if report["errors"]:
+        print(f"\n{len(report['errors'])} errors, first few:")
+        for error in report["errors"][:5]:
+            print(f"  {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent-session load test for app.py")
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--iterations", type=int, default=20, help="actions per session")
+    parser.add_argument("--think", type=float, default=0.0, help="mean pause between actions (seconds)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--db", type=Path, help="database to run against (default: a temporary copy of household.db)")
+    parser.add_argument("--json", type=Path, help="also write the report here")
+    parser.add_argument("--max-p95", type=float, help="exit with 1 if any tab's p95 is above this (ms)")
+    args = parser.parse_args()
+
+    if args.db is None:
+        args.db = Path(tempfile.mkdtemp()) / "household.db"
+        shutil.copy(db.DB_PATH, args.db)
+
+    ctx = multiprocessing.get_context("spawn")
+    barrier = ctx.Barrier(args.sessions)
+    results = ctx.Queue()
+    processes = [ctx.Process(target=run_session, args=(i, args, barrier, results), daemon=True) for i in range(args.sessions)]
+    started = time.perf_counter()
+    for process in processes:
+        process.start()
+
+    timings = defaultdict(list)
+    errors = []
+    locks = defaultdict(int)
+    for _ in processes:
+        session_timings, session_errors, session_locks = results.get()
+        for name, values in session_timings.items():
+            timings[name].extend(values)
+        errors.extend(session_errors)
+        for name, value in session_locks.items():
+            locks[name] += value
+    for process in processes:
+        process.join()
+    locks["wait_ms"] = round(locks["wait_ms"], 1)
+
+    report = {
+        "sessions": args.sessions,
+        "iterations": args.iterations,
+        "wall_seconds": time.perf_counter() - started,
+        "latency": summarize(timings),
+        "lock_waits": dict(locks),
+        "errors": errors,
+    }
+    print_report(report)
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+
+    if args.max_p95 is not None:
+        slow = [tab for tab in TABS if tab in report["latency"] and report["latency"][tab]["p95_ms"] > args.max_p95]
+        if slow:
+            print(f"\np95 above {args.max_p95} ms on: {', '.join(slow)}")
+            sys.exit(1)
+    if report["errors"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Background maintenance for Household Management App.
+Purges expired Recycle Bin rows, folds old change log entries into snapshots
+and shrinks household.db with incremental VACUUM, but only while nobody is writing.
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import changefeed
+import database as db
+
+logger = logging.getLogger(__name__)
+
+# Check for idleness this often (seconds)
+CHECK_INTERVAL = 60
+# No writes for this long counts as idle (seconds)
+IDLE_SECONDS = 300
+# incremental_vacuum steps per idle cycle; the rest waits for the next cycle
+VACUUM_STEPS_PER_CYCLE = 16
+
+
+class MaintenanceWorker:
+    """Runs purge_trash(), compact_change_log() and a few incremental_vacuum() steps whenever the database is idle."""
+
+    def __init__(self, db_path, check_interval: float = CHECK_INTERVAL, idle_seconds: float = IDLE_SECONDS):
+        self.db_path = Path(db_path)
+        self.check_interval = check_interval
+        self.idle_seconds = idle_seconds
+        self.last_report = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def is_idle(self) -> bool:
+        feed = changefeed.get_feed(self.db_path)
+        return time.monotonic() - feed.last_change_at >= self.idle_seconds
+
+    def run_once(self):
+        """One maintenance cycle. Returns a report dict (also kept in last_report)."""
+        with db.using_database(self.db_path):
+            purged = db.purge_trash()
+            compacted = db.compact_change_log()
+            reclaimed = db.incremental_vacuum(max_steps=VACUUM_STEPS_PER_CYCLE)
+        self.last_report = {
+            "ran_at": datetime.now(),
+            "purged": purged,
+            "log_entries_compacted": compacted,
+            "bytes_reclaimed": reclaimed,
+        }
+        if purged or reclaimed:
+            logger.info("Maintenance: purged %s, reclaimed %d bytes", purged, reclaimed)
+        return self.last_report
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="maintenance", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.check_interval):
+            try:
+                if self.is_idle():
+                    self.run_once()
+            except Exception:
+                logger.exception("Maintenance cycle failed for %s", self.db_path)
@@ -0,0 +1,316 @@
+"""
+Prometheus-style metrics for Household Management App.
+A small in-process registry (counters, gauges, histograms with labels) fed by the
+data layer and main_app(), served in the Prometheus text format from a local HTTP
+endpoint. Once the endpoint is started the database.py queries and writes are
+timed and locked-out write attempts counted; database file sizes and Recycle Bin
+counts are read when it is scraped.
+Nothing is instrumented unless HOUSEHOLD_METRICS_EMBED is set.
+
+    HOUSEHOLD_METRICS_EMBED=1 streamlit run app.py
+    curl http://127.0.0.1:9464/metrics
+"""
+
+import bisect
+import functools
+import http.server
+import logging
+import math
+import os
+import threading
+import time
+
+import database as db
+
+logger = logging.getLogger(__name__)
+
+METRICS_HOST = os.environ.get("HOUSEHOLD_METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.environ.get("HOUSEHOLD_METRICS_PORT", "9464"))
+
+# Seconds; database calls are mostly sub-millisecond, reruns tens to hundreds of milliseconds
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+RERUN_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# Busy timeout plus the retry pause, which grows up to WRITE_RETRY_MAX_WAIT
+LOCK_WAIT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# A session counts as active if it reran within this many seconds
+ACTIVE_SESSION_SECONDS = 300
+
+# database.py functions that run queries or writes; connection plumbing, decorators,
+# generators and pure helpers (compute_shares, next_occurrence, ...) are left alone
+TIMED_DB_FUNCTIONS = (
+    "init_database", "get_table_versions", "get_changes_today", "get_row_history", "undo_last",
+    "compact_change_log", "get_deleted_items", "restore_item", "permanently_delete_item", "purge_trash",
+    "incremental_vacuum", "get_trash_counts",
+    "get_all_shopping_items", "add_shopping_item", "update_shopping_item", "delete_shopping_item",
+    "auto_cleanup_old_items", "clear_bought_items", "get_archive_shopping",
+    "get_all_expenses", "add_expense", "find_import_hashes", "add_imported_expenses", "delete_expense",
+    "set_expense_category", "get_month_totals", "get_budgets", "set_budget", "ensure_participants",
+    "get_participant_balances", "calculate_balance", "settle_up", "get_settlements", "get_settled_expenses",
+    "get_recurring_expenses", "add_recurring_expense", "edit_recurring_expense", "delete_recurring_expense",
+    "materialize_recurring",
+    "get_all_events", "add_event", "delete_event", "get_urgent_events_count",
+    "get_all_chores", "add_chore", "mark_chore_done", "mark_chore_undone", "delete_chore", "get_archive_chores",
+    "get_all_cat_tasks", "add_cat_task", "edit_cat_task", "update_cat_task", "delete_cat_task",
+    "apply_writes",
+)
+
+
+def _format_labels(names, values) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name: str, help_text: str, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels.get(name, "") for name in self.labels)
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines += self._sample_lines(key, value)
+        return lines
+
+    def _sample_lines(self, key, value):
+        return [f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def replace(self, samples):
+        """Swap in a fresh set of (labels dict, value) samples, dropping label sets that vanished."""
+        values = {self._key(labels): value for labels, value in samples}
+        with self._lock:
+            self._values = values
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels=(), buckets=DB_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # per-bucket counts (non-cumulative) + the +Inf bucket, sum
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][bisect.bisect_left(self.buckets, value)] += 1
+            state[1] += value
+
+    def _sample_lines(self, key, state):
+        counts, total = state
+        lines = []
+        cumulative = 0
+        for bound, count in zip((*self.buckets, math.inf), counts):
+            cumulative += count
+            lines.append(f"{self.name}_bucket{_format_labels(self.labels + ('le',), key + (_format_value(bound),))} {cumulative}")
+        lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(total)}")
+        lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {cumulative}")
+        return lines
+
+
+# ============== REGISTRY ==============
+
+_metrics = []
+_collectors = []
+
+
+def _register(metric):
+    _metrics.append(metric)
+    return metric
+
+
+def add_collector(callback):
+    """Register callback(), run before every scrape to refresh gauges that are read, not pushed."""
+    _collectors.append(callback)
+
+
+def expose() -> str:
+    """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+    for callback in list(_collectors):
+        try:
+            callback()
+        except Exception:
+            logger.exception("Metrics collector %s failed", getattr(callback, "__name__", callback))
+    lines = []
+    for metric in _metrics:
+        lines += metric.expose()
+    return "\n".join(lines) + "\n"
+
+
+db_calls = _register(Histogram(
+    "household_db_call_duration_seconds", "Time spent in each database.py function.", ("function",), DB_BUCKETS))
+db_errors = _register(Counter(
+    "household_db_call_errors_total", "database.py calls that raised, per function.", ("function",)))
+db_lock_waits = _register(Counter(
+    "household_db_lock_waits_total", "Writes that found the database locked and were retried, per function.",
+    ("function",)))
+db_lock_wait_seconds = _register(Histogram(
+    "household_db_lock_wait_seconds", "Time a locked write lost before its next attempt, per function.",
+    ("function",), LOCK_WAIT_BUCKETS))
+reruns = _register(Histogram(
+    "household_rerun_duration_seconds", "main_app() rerun duration per tab.", ("tab",), RERUN_BUCKETS))
+active_sessions = _register(Gauge(
+    "household_active_sessions", f"Sessions that reran in the last {ACTIVE_SESSION_SECONDS} seconds."))
+db_size = _register(Gauge(
+    "household_db_size_bytes", "Size of each open household's database file.", ("household",)))
+wal_size = _register(Gauge(
+    "household_db_wal_size_bytes", "Size of each open household's write-ahead log.", ("household",)))
+trash_rows = _register(Gauge(
+    "household_trash_rows", "Rows waiting in the Recycle Bin, per household and table.", ("household", "table")))
+
+
+# ============== FEEDS ==============
+
+def timed(function, name: str = None):
+    """Wrap a function so each call lands in household_db_call_duration_seconds{function=name}."""
+    name = name or function.__name__
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        except Exception:
+            db_errors.inc(function=name)
+            raise
+        finally:
+            db_calls.observe(time.perf_counter() - started, function=name)
+
+    wrapper.metric_name = name
+    return wrapper
+
+
+def _record_lock_wait(function: str, seconds: float):
+    """database.py lock wait listener: one locked-out write attempt that is being retried."""
+    db_lock_waits.inc(function=function)
+    db_lock_wait_seconds.observe(seconds, function=function)
+
+
+def instrument(module=db, names=TIMED_DB_FUNCTIONS):
+    """Time the named functions of module (database.py queries and writes by default); safe to call twice."""
+    for name in names:
+        value = getattr(module, name, None)
+        if value is None or hasattr(value, "metric_name"):
+            continue
+        setattr(module, name, timed(value, name))
+
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def record_rerun(tab: str, seconds: float, session_id: str = None):
+    """Called once per rerun, around main_app()."""
+    reruns.observe(seconds, tab=tab)
+    if session_id:
+        with _sessions_lock:
+            _sessions[session_id] = time.monotonic()
+
+
+def _collect_sessions():
+    cutoff = time.monotonic() - ACTIVE_SESSION_SECONDS
+    with _sessions_lock:
+        for session_id in [s for s, seen in _sessions.items() if seen < cutoff]:
+            del _sessions[session_id]
+        active_sessions.set(len(_sessions))
+
+
+def _collect_households():
+    """File sizes and Recycle Bin counts of every household with its database open in this process."""
+    import tenancy
+    sizes, wal_sizes, trash = [], [], []
+    get_trash_counts = getattr(db.get_trash_counts, "__wrapped__", db.get_trash_counts)
+    for handle in tenancy.open_handles():
+        household = handle.household.id
+        path = handle.db_path
+        wal = path.with_name(path.name + "-wal")
+        sizes.append(({"household": household}, path.stat().st_size if path.exists() else 0))
+        wal_sizes.append(({"household": household}, wal.stat().st_size if wal.exists() else 0))
+        with db.using_database(path):
+            counts = get_trash_counts()
+        trash += [({"household": household, "table": table}, count) for table, count in counts.items()]
+    db_size.replace(sizes)
+    wal_size.replace(wal_sizes)
+    trash_rows.replace(trash)
+
+
+add_collector(_collect_sessions)
+add_collector(_collect_households)
+
+
+# ============== HTTP ENDPOINT ==============
+
+class MetricsHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = expose().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug("metrics %s", format % args)
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_in_background(host: str = METRICS_HOST, port: int = METRICS_PORT) -> http.server.ThreadingHTTPServer:
+    """Time the database calls and serve /metrics from a daemon thread of the current process (once per process)."""
+    global _server
+    with _server_lock:
+        if _server is None:
+            instrument(db)
+            db.add_lock_wait_listener(_record_lock_wait)
+            _server = http.server.ThreadingHTTPServer((host, port), MetricsHandler)
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
+            logger.info("Metrics on http://%s:%d/metrics", host, _server.server_address[1])
+    return _server
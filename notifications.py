@@ -0,0 +1,249 @@
+"""
+Notification engine for Household Management App.
+Keeps the alert banner's triggers (event start, chore due date, cat task next due)
+in time-ordered heaps so "active alerts now" never rescans the tables. Budget
+alerts come from the month totals instead (see budget_alerts).
+"""
+
+import heapq
+import itertools
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+import catcare
+import changefeed
+import database as db
+
+# Banner order: events, then chores, then cat care, then budgets
+KIND_ORDER = {"event": 0, "chore": 1, "cat": 2, "budget": 3}
+
+# Table -> alert kind
+WATCHED_TABLES = {"events": "event", "chores": "chore", "cat_care": "cat"}
+
+
+class Alert(NamedTuple):
+    key: str                     # "<kind>:<row id>"
+    kind: str                    # "event" / "chore" / "cat" / "budget"
+    emoji: str
+    text: str
+    starts_at: datetime          # alert becomes active
+    ends_at: Optional[datetime]  # alert stops being active (None = until the row changes)
+
+
+def alert_for_row(table_name: str, row) -> Optional[Alert]:
+    """Build the alert a row should raise, or None if it never alerts."""
+    if row is None or row['is_deleted']:
+        return None
+    try:
+        if table_name == "events":
+            day = datetime.fromisoformat(row['date'])
+            day = datetime.combine(day.date(), datetime.min.time())
+            if row['time']:
+                # Shown during the event's day until the event starts
+                ends_at = datetime.combine(day.date(), datetime.strptime(row['time'], "%H:%M").time())
+                time_part = f" ב-{row['time']}"
+            else:
+                ends_at = day + timedelta(days=1)
+                time_part = ""
+            return Alert(f"event:{row['id']}", "event", "📅", f"אירוע היום: {row['title']}{time_part}", day, ends_at)
+
+        if table_name == "chores":
+            if row['done'] or not row['due_date']:
+                return None
+            day = datetime.combine(datetime.fromisoformat(row['due_date']).date(), datetime.min.time())
+            return Alert(f"chore:{row['id']}", "chore", "✅", f"משימה להיום: {row['name']}", day, day + timedelta(days=1))
+
+        if table_name == "cat_care":
+            # Same clock as the cat tab: alert once the grace window (and any quiet hours) have passed
+            schedule = catcare.schedule_for_row(row)
+            if schedule is None:
+                return None
+            return Alert(f"cat:{row['id']}", "cat", "🐱", f"{row['task_name']} דורש טיפול!", schedule.alert_at, None)
+    except (TypeError, ValueError):
+        # Malformed dates never alerted in the old banner either
+        return None
+    return None
+
+
+def budget_alerts(budgets: dict, totals: dict, now: datetime = None):
+    """One alert per category whose spending this month is over its limit (budgets/totals: {category: amount})."""
+    now = now or datetime.now()
+    return [
+        Alert(f"budget:{category}", "budget", "💸",
+              f"חריגה מהתקציב: {category} ₪{totals[category]:,.0f} מתוך ₪{limit:,.0f}", now, None)
+        for category, limit in budgets.items()
+        if totals.get(category, 0) > limit
+    ]
+
+
+class NotificationEngine:
+    """
+    Time-ordered alert queue for one database file.
+
+    Alerts wait in a heap keyed by start time and, once active, sit in a second
+    heap keyed by end time. Each transition costs O(log n), so asking for the
+    active alerts only pays for what became due or expired since the last call.
+    Replaced or removed alerts are dropped lazily when they reach the top.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        self._lock = threading.RLock()
+        self._seq = itertools.count()
+        self._entries = {}   # key -> current Alert
+        self._active = {}    # key -> Alert currently showing
+        self._pending = []   # (starts_at, seq, key, alert)
+        self._expiring = []  # (ends_at, seq, key, alert)
+        self._applied = {}   # table_name -> table_versions value the triggers are current with
+        self.unsubscribe = None
+
+    # --- Loading ---
+
+    def _read(self, table_name: str, sql: str, params=()):
+        """Rows plus the table's version, from one snapshot."""
+        conn = db.get_read_connection(self.db_path)
+        try:
+            conn.execute("BEGIN")
+            rows = conn.execute(sql, params).fetchall()
+            version = conn.execute("SELECT version FROM table_versions WHERE table_name = ?", (table_name,)).fetchone()
+        finally:
+            conn.close()
+        return rows, version[0] if version else None
+
+    def load(self):
+        """(Re)build every trigger from the tables."""
+        with self._lock:
+            for table_name in WATCHED_TABLES:
+                self.reload_table(table_name)
+        return self
+
+    def reload_table(self, table_name: str):
+        """Replace all triggers of one table (used for bulk writes and other processes' changes)."""
+        kind = WATCHED_TABLES[table_name]
+        rows, version = self._read(table_name, f"SELECT * FROM {table_name} WHERE is_deleted = 0")
+        with self._lock:
+            for key in [k for k, alert in self._entries.items() if alert.kind == kind]:
+                self._remove(key)
+            for row in rows:
+                alert = alert_for_row(table_name, row)
+                if alert:
+                    self._upsert(alert)
+            if version is not None:
+                self._applied[table_name] = version
+
+    def apply_change(self, table_name: str, row_id=None):
+        """Incremental update after a write; row_id None means many rows changed."""
+        if table_name not in WATCHED_TABLES:
+            return
+        if row_id is None:
+            self.reload_table(table_name)
+            return
+        rows, _ = self._read(table_name, f"SELECT * FROM {table_name} WHERE id = ?", (row_id,))
+        alert = alert_for_row(table_name, rows[0] if rows else None)
+        before, after = db.get_commit_versions(self.db_path).get(table_name, (None, None))
+        with self._lock:
+            if alert:
+                self._upsert(alert)
+            else:
+                self._remove(f"{WATCHED_TABLES[table_name]}:{row_id}")
+            # Nothing else changed the table since the version we had: this commit is all of it
+            if before is not None and self._applied.get(table_name) == before:
+                self._applied[table_name] = after
+
+    def on_feed_change(self, changed):
+        """Change feed callback: reloads a table only if another process wrote to it."""
+        for table_name, version in changed.items():
+            if table_name in WATCHED_TABLES and version > self._applied.get(table_name, -1):
+                self.reload_table(table_name)
+
+    # --- Heap maintenance ---
+
+    def _upsert(self, alert: Alert):
+        self._entries[alert.key] = alert
+        self._active.pop(alert.key, None)
+        heapq.heappush(self._pending, (alert.starts_at, next(self._seq), alert.key, alert))
+        # Stale heap entries are normally dropped when they surface; compact if edits pile them up
+        if len(self._pending) > 2 * len(self._entries) + 64:
+            self._pending = [e for e in self._pending if self._is_current(e[2], e[3]) and e[2] not in self._active]
+            heapq.heapify(self._pending)
+
+    def _remove(self, key: str):
+        self._entries.pop(key, None)
+        self._active.pop(key, None)
+
+    def _is_current(self, key: str, alert: Alert) -> bool:
+        return self._entries.get(key) is alert
+
+    def _advance(self, now: datetime):
+        while self._pending and self._pending[0][0] <= now:
+            _, _, key, alert = heapq.heappop(self._pending)
+            if not self._is_current(key, alert):
+                continue
+            if alert.ends_at is None or alert.ends_at > now:
+                self._active[key] = alert
+                if alert.ends_at is not None:
+                    heapq.heappush(self._expiring, (alert.ends_at, next(self._seq), key, alert))
+        while self._expiring and self._expiring[0][0] <= now:
+            _, _, key, alert = heapq.heappop(self._expiring)
+            if self._active.get(key) is alert:
+                del self._active[key]
+
+    # --- Queries ---
+
+    def active_alerts(self, now: datetime = None):
+        """Alerts that should show right now, in banner order."""
+        now = now or datetime.now()
+        with self._lock:
+            self._advance(now)
+            active = list(self._active.values())
+        return sorted(active, key=lambda a: (KIND_ORDER[a.kind], a.starts_at, a.key))
+
+    def next_fire_time(self, now: datetime = None) -> Optional[datetime]:
+        """When the set of active alerts next changes (None if nothing is scheduled)."""
+        now = now or datetime.now()
+        with self._lock:
+            self._advance(now)
+            # Drop stale tops so the answer reflects live triggers only
+            while self._pending and not self._is_current(self._pending[0][2], self._pending[0][3]):
+                heapq.heappop(self._pending)
+            while self._expiring and self._active.get(self._expiring[0][2]) is not self._expiring[0][3]:
+                heapq.heappop(self._expiring)
+            times = [heap[0][0] for heap in (self._pending, self._expiring) if heap]
+        return min(times) if times else None
+
+
+# ============== PROCESS-WIDE REGISTRY ==============
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def get_engine(db_path) -> NotificationEngine:
+    """Return the loaded engine for a database file, building it on first use."""
+    key = str(Path(db_path).resolve())
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None:
+            engine = _engines[key] = NotificationEngine(key).load()
+            # Writes from other processes only show up through the change feed
+            engine.unsubscribe = changefeed.get_feed(key).subscribe(engine.on_feed_change)
+        return engine
+
+
+def drop_engine(db_path):
+    """Forget the engine for a database file."""
+    with _engines_lock:
+        engine = _engines.pop(str(Path(db_path).resolve()), None)
+    if engine is not None and engine.unsubscribe:
+        engine.unsubscribe()
+
+
+def _on_db_change(db_path, table_name, row_id):
+    engine = _engines.get(str(Path(db_path).resolve()))
+    if engine is not None:
+        engine.apply_change(table_name, row_id)
+
+
+db.add_change_listener(_on_db_change)
@@ -0,0 +1,128 @@
+"""
+HTML rendering for Household Management App.
+Every card and banner the app draws with st.markdown comes from one of the Jinja2
+templates below. They are compiled once at import and autoescape their input, so
+names, descriptions and titles typed by users are shown as text, never as markup.
+Each *_card template draws one row; its *_list twin draws a whole section in one
+string, so a list that needs no per-row widget goes out as a single markdown element.
+"""
+
+from datetime import datetime
+
+from jinja2 import DictLoader, Environment
+
+
+def _finalize(value):
+    # One line per value: a blank line would end Streamlit's HTML block mid-card
+    if type(value) is str:
+        return " ".join(value.split())
+    return "" if value is None else value
+
+
+def _strftime(value: str, fmt: str) -> str:
+    """'2025-03-01 18:30:00' | strftime("%d/%m/%Y")"""
+    return datetime.fromisoformat(value).strftime(fmt)
+
+
+_SOURCES = {
+    "tab_indicator": """
+<div style="text-align: center; color: #667eea; font-weight: 600; margin: 5px 0; padding: 0;">{{ label }}</div>
+""",
+
+    "alerts_banner": """
+<div style="background: linear-gradient(135deg, rgba(102, 126, 234, 0.1) 0%, rgba(118, 75, 162, 0.1) 100%); border-radius: 15px; padding: 15px; margin-bottom: 15px; border: 1px solid rgba(102, 126, 234, 0.2);">
+<div style="font-weight: 700; color: #667eea; margin-bottom: 10px; font-size: 16px;">🔔 התראות ({{ alerts | length }})</div>
+{% for alert in alerts %}
+<div style="padding: 8px 12px; margin: 5px 0; background: {{ colors.get(alert.kind, '#f39c12') }}; border-radius: 10px; color: white; font-size: 14px;">{{ alert.emoji }} {{ alert.text }}</div>
+{% endfor %}
+</div>
+""",
+
+    "balance_summary": """
+<div style="background: {{ background }}; color: white; padding: 30px; border-radius: 25px; text-align: center; box-shadow: 0 15px 30px rgba(0,0,0,0.2); margin-bottom: 30px; position: relative; overflow: hidden;">
+<div style="font-size: 1.2rem; opacity: 0.9;">{{ title }}</div>
+<div style="font-size: 3.5rem; font-weight: 900;">{{ amount }}</div>
+{% for line in extra_lines %}
+<div style="font-size: 1.1rem; opacity: 0.9;">{{ line }}</div>
+{% endfor %}
+</div>
+""",
+
+    "expense_card": """
+<div class="custom-card border-blue" style="padding: 15px;">
+<div class="card-price" style="color: #3498db; float: left;">₪{{ '%.0f' | format(row.amount) }}</div>
+<div class="card-title" style="margin-right: 0;">{% if row.recurring_id %}🔁 {% endif %}{{ row.description }}</div>
+<div class="card-sub">{{ row.created_at | strftime("%d/%m/%Y • %H:%M") }} • {{ row.category }} • שולם ע"י {{ row.payer }}</div>
+<div style="clear: both;"></div>
+</div>
+""",
+
+    "shopping_card": """
+<div class="custom-card border-green" style="padding: 15px; margin-bottom: 5px;">
+<div class="card-title" style="font-size: 16px;">{{ row.name }} <span style="color:#2ecc71; font-weight:400;">({{ row.quantity }})</span></div>
+</div>
+""",
+
+    "chore_card": """
+<div class="custom-card {{ 'border-orange' if urgent else 'border-blue' }}">
+<div class="card-title">{{ row.name }}</div>
+<div class="card-sub">📅 {{ row.due_date or 'ללא תאריך' }} • {{ '🔴' if urgent else '🔵' }}</div>
+</div>
+""",
+
+    "event_card": """
+<div class="custom-card border-green">
+<div class="card-title">{{ row.title }}</div>
+<div class="card-sub">📅 {{ row.date }}{% if row.time %} • ⏰ {{ row.time }}{% endif %}</div>
+<div class="card-sub" style="font-size: 13px;">{{ row.description }}</div>
+</div>
+""",
+
+    "struck_text": """
+<s style="color: #888;">{{ text }}</s>
+""",
+
+    "past_event_card": """
+<div style="border-bottom: 1px solid rgba(49, 51, 63, 0.2); padding: 8px 0; margin-bottom: 8px;">
+<div><s style="color: #888;">{{ row.title }}</s></div>
+<div style="color: #888; font-size: 14px;">{{ row.date }} • {{ row.time }}</div>
+</div>
+""",
+
+    "cat_card": """
+<div style="border: 1px solid #ddd; border-radius: 12px; padding: 15px; margin-bottom: 10px; background-color: white; box-shadow: 0 2px 4px rgba(0,0,0,0.05);">
+<div style="display: flex; justify-content: space-between; align-items: start; margin-bottom: 10px;">
+<div style="background-color: {{ row.status_color }}; color: white; padding: 2px 10px; border-radius: 15px; font-size: 0.8rem; font-weight: bold;">{{ row.status_text }}</div>
+<div style="text-align: left;"><span style="font-size: 1.2rem; font-weight: bold;">{{ row.task.task_name }}</span> <span style="font-size: 1.2rem;">🐱</span></div>
+</div>
+<div style="text-align: left; font-size: 0.9rem; color: #666; direction: rtl;">
+<div>תדירות: כל {{ row.task.frequency_hours }} שעות</div>
+<div>בוצע לאחרונה: {{ row.last_done_text }}</div>
+<div>מועד הבא: {{ row.eta_text }}</div>
+</div>
+</div>
+""",
+}
+
+# Cards drawn a whole section at a time: expense_card -> expense_list, the same card once per row
+LIST_CARDS = ("expense_card", "event_card", "past_event_card")
+_SOURCES.update({
+    name[:-len("_card")] + "_list": '{%% for row in rows %%}{%% include "%s" %%}{%% endfor %%}' % name
+    for name in LIST_CARDS
+})
+
+_env = Environment(loader=DictLoader({name: source.strip("\n") + "\n" for name, source in _SOURCES.items()}),
+                   autoescape=True, trim_blocks=True, lstrip_blocks=True, finalize=_finalize)
+_env.filters["strftime"] = _strftime
+# Compile everything now rather than on the first rerun that needs it
+_TEMPLATES = {name: _env.get_template(name) for name in _SOURCES}
+
+
+def render(name: str, **context) -> str:
+    """One template filled in, e.g. render("shopping_card", row=item)."""
+    return _TEMPLATES[name].render(**context)
+
+
+def render_list(name: str, rows) -> str:
+    """A whole section in one string, e.g. render_list("expense_list", expenses)."""
+    return _TEMPLATES[name].render(rows=rows)
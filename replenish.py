@@ -0,0 +1,163 @@
+"""
+Replenishment prediction for Household Management App.
+Learns how often each item is bought from archive_shopping's timestamps and
+flags the ones likely to run out in the next few days. Statistics are kept per
+database file and only the items touched by new archive rows are recomputed.
+pandas is imported on first use, so it stays off the app's startup path.
+"""
+
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import NamedTuple
+
+import autocomplete
+import database as db
+
+# Items need this many purchases (on different days) before their rhythm is trusted
+MIN_PURCHASES = 3
+# Suggest items predicted to run out within this many days
+HORIZON_DAYS = 3
+
+
+class Prediction(NamedTuple):
+    name: str
+    category: str
+    quantity: str
+    interval_days: float   # typical days between purchases
+    due_at: datetime       # last purchase + interval (naive UTC, like archived_at)
+
+
+class ReplenishmentModel:
+    """Per-item purchase intervals for one database file."""
+
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        self._lock = threading.RLock()
+        self.watermark = 0      # highest archive_shopping.id already seen
+        self._purchases = None  # DataFrame: key, name, day (one row per item per day)
+        self._stats = None      # DataFrame indexed by key: name, count, last_day, interval_days
+
+    def _read(self, sql: str, params=()):
+        import pandas as pd
+        conn = db.get_read_connection(self.db_path)
+        try:
+            return pd.read_sql_query(sql, conn, params=params)
+        except (sqlite3.OperationalError, pd.errors.DatabaseError):
+            # No archive table yet (database not initialised)
+            return pd.DataFrame(columns=["id", "name", "archived_at"])
+        finally:
+            conn.close()
+
+    def refresh(self):
+        """Fold in archive rows added since the last call; recompute only the items they touch."""
+        import pandas as pd
+        with self._lock:
+            newest = self._read("SELECT MAX(id) AS id FROM archive_shopping")
+            newest = int(newest["id"].iloc[0]) if len(newest) and pd.notna(newest["id"].iloc[0]) else 0
+            if newest < self.watermark or self._purchases is None:
+                # First load, or the archive went backwards (restored from a backup)
+                self.watermark = 0
+                self._purchases = pd.DataFrame({"key": [], "name": [], "day": pd.Series([], dtype="datetime64[ns]")})
+                self._stats = None
+            if newest == self.watermark and self._stats is not None:
+                return self
+
+            new = self._read(
+                "SELECT id, name, archived_at FROM archive_shopping WHERE id > ? ORDER BY id",
+                (self.watermark,)
+            )
+            self.watermark = newest
+            new = new[new["name"].notna()]
+            new = pd.DataFrame({
+                "key": new["name"].map(autocomplete.normalize),
+                "name": new["name"].str.split().str.join(" "),
+                "day": pd.to_datetime(new["archived_at"], errors="coerce").dt.normalize(),
+            }).dropna()
+            new = new[new["key"] != ""]
+            # Clearing the basket twice on one day is still one purchase
+            self._purchases = pd.concat([self._purchases, new], ignore_index=True).drop_duplicates(["key", "day"])
+
+            touched = self._purchases[self._purchases["key"].isin(new["key"].unique())]
+            stats = self._summarize(touched)
+            if self._stats is None:
+                self._stats = stats
+            else:
+                self._stats = pd.concat([self._stats.drop(stats.index, errors="ignore"), stats])
+        return self
+
+    @staticmethod
+    def _summarize(purchases):
+        """count, last_day and median days between purchases, per item (vectorized over all items)."""
+        purchases = purchases.sort_values(["key", "day"])
+        gaps = purchases.groupby("key")["day"].diff().dt.total_seconds() / 86400
+        grouped = purchases.assign(gap=gaps).groupby("key")
+        return grouped.agg(
+            name=("name", "last"),
+            count=("day", "size"),
+            last_day=("day", "max"),
+            interval_days=("gap", "median"),
+        )
+
+    def due_items(self, horizon_days: float = HORIZON_DAYS, now: datetime = None, exclude=()):
+        """Items predicted to run out by now + horizon_days, soonest first; exclude holds names already listed."""
+        # archived_at is SQLite's CURRENT_TIMESTAMP, i.e. naive UTC - compare against UTC now, not local time
+        now = now or datetime.now(timezone.utc).replace(tzinfo=None)
+        with self._lock:
+            stats = self._stats
+            if stats is None or stats.empty:
+                return []
+            stats = stats[stats["count"] >= MIN_PURCHASES]
+            due_at = stats["last_day"] + stats["interval_days"].clip(lower=1) * timedelta(days=1)
+            stats = stats.assign(due_at=due_at)
+            stats = stats[(stats["due_at"] <= now + timedelta(days=horizon_days)) & (stats["last_day"] < now)]
+            stats = stats[~stats.index.isin({autocomplete.normalize(name) for name in exclude})]
+            stats = stats.sort_values("due_at")
+
+        usual = autocomplete.get_index(self.db_path)
+        predictions = []
+        for key, row in stats.iterrows():
+            suggestion = usual.lookup(key)
+            predictions.append(Prediction(
+                row["name"],
+                suggestion.category if suggestion else None,
+                suggestion.quantity if suggestion else "1",
+                float(row["interval_days"]),
+                row["due_at"].to_pydatetime(),
+            ))
+        return predictions
+
+
+# ============== PROCESS-WIDE REGISTRY ==============
+
+_models = {}
+_models_lock = threading.Lock()
+
+
+def get_model(db_path) -> ReplenishmentModel:
+    """Return the up-to-date model for a database file, building it on first use."""
+    key = str(Path(db_path).resolve())
+    with _models_lock:
+        model = _models.get(key)
+        if model is None:
+            model = _models[key] = ReplenishmentModel(key)
+    # One MAX(id) query when nothing new was archived (also catches other processes)
+    return model.refresh()
+
+
+def drop_model(db_path):
+    """Forget the model for a database file."""
+    with _models_lock:
+        _models.pop(str(Path(db_path).resolve()), None)
+
+
+def _on_db_change(db_path, table_name, row_id):
+    if table_name != "archive_shopping":
+        return
+    model = _models.get(str(Path(db_path).resolve()))
+    if model is not None:
+        model.refresh()
+
+
+db.add_change_listener(_on_db_change)
@@ -0,0 +1,50 @@
+"""
+Compact row types for Household Management App.
+Every (table, columns) shape gets its own namedtuple subclass, so a row is a
+plain tuple plus a schema shared by all rows of that shape. Rows still support
+row['column'] and dict(row) like sqlite3.Row, and _replace() for overlays.
+"""
+
+from collections import namedtuple
+from functools import lru_cache
+
+
+class RowMixin:
+    """sqlite3.Row-style access for namedtuple rows."""
+
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        return tuple.__getitem__(self, key)
+
+    def keys(self):
+        return self._fields
+
+    def get(self, key, default=None):
+        return getattr(self, key, default) if key in self._fields else default
+
+
+@lru_cache(maxsize=None)
+def row_type(table_name: str, columns: tuple) -> type:
+    """The row class for one result shape, e.g. ShoppingItemsRow."""
+    name = "".join(part.title() for part in table_name.split("_")) + "Row"
+    return type(name, (RowMixin, namedtuple(name, columns)), {"__slots__": ()})
+
+
+def row_factory(table_name: str):
+    """sqlite3 row_factory that builds row_type(table_name, <result columns>) rows."""
+    current = {"description": None, "cls": None}
+
+    def factory(cursor, values):
+        # cursor.description is the same object for every row of one statement
+        if cursor.description is not current["description"]:
+            current["description"] = cursor.description
+            current["cls"] = row_type(table_name, tuple(column[0] for column in cursor.description))
+        return current["cls"]._make(values)
+
+    return factory
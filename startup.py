@@ -0,0 +1,91 @@
+"""
+Startup report for Household Management App.
+Shows where a cold start spends its time: the slowest imports of app.py's
+modules (python -X importtime) and the time until the first page is rendered.
+
+    python startup.py --top 15
+"""
+
+import argparse
+import ast
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+APP_DIR = Path(__file__).parent
+
+FIRST_PAINT_SCRIPT = """
+import time
+started = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file("app.py", default_timeout=120)
+at.run()
+assert not at.exception, at.exception
+print(time.perf_counter() - started)
+"""
+
+
+def app_imports(path=APP_DIR / "app.py"):
+    """Modules app.py imports at the top level, i.e. on every cold start (imports inside tabs and functions are lazy)."""
+    modules = []
+    for node in ast.parse(path.read_text(encoding="utf-8-sig")).body:
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names = [node.module]
+        else:
+            continue
+        modules += [name for name in names if name not in modules]
+    return modules
+
+
+def import_times(modules):
+    """[(cumulative_us, self_us, module)] for one cold import of modules, slowest first."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {', '.join(modules)}"],
+        cwd=APP_DIR, capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        # One space after the bar, two more per nesting level
+        rows.append((int(cumulative_us), int(self_us), name[1:].rstrip()))
+    return sorted(rows, reverse=True)
+
+
+def first_paint_seconds():
+    """(seconds from process start, seconds inside AppTest) for the first run of app.py - the login screen."""
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", FIRST_PAINT_SCRIPT],
+        cwd=APP_DIR, capture_output=True, text=True, check=True,
+        env={**os.environ, "PYTHONWARNINGS": "ignore"},
+    )
+    inside = float(result.stdout.strip().splitlines()[-1])
+    return time.perf_counter() - started, inside
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold start report for app.py")
+    parser.add_argument("--top", type=int, default=15, help="how many imports to list")
+    parser.add_argument("--no-paint", action="store_true", help="skip the first-paint measurement")
+    args = parser.parse_args()
+
+    rows = import_times(app_imports())
+    top_level = [row for row in rows if not row[2].startswith(" ")]
+    print(f"Cold import of app.py's modules: {sum(row[0] for row in top_level) / 1e6:.2f}s")
+    print(f"{'cumulative':>12}{'self':>10}  module")
+    for cumulative_us, self_us, name in rows[:args.top]:
+        print(f"{cumulative_us / 1000:>10.1f}ms{self_us / 1000:>8.1f}ms  {name}")
+
+    if not args.no_paint:
+        total, script = first_paint_seconds()
+        print(f"\nFirst paint (login screen): {total:.2f}s from process start, {script:.2f}s in Streamlit")
+
+
+if __name__ == "__main__":
+    main()
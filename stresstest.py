@@ -0,0 +1,195 @@
+"""
+Multi-process write stress test for Household Management App.
+Starts N processes, like N Streamlit servers behind one proxy, that all write to
+the same SQLite file at once: each adds expenses and shopping items, and they all
+race to generate the same overdue recurring expense. Afterwards the file is
+checked for lost updates: every write that succeeded is there exactly once, the
+net balances and monthly totals match the (live and settled) expenses, and no
+recurring date was generated twice. Writes that gave up after WRITE_RETRY_ATTEMPTS
+are reported too.
+
+    python stresstest.py --processes 8 --writes 200 [--busy-timeout 0.05]
+
+Runs against a temporary copy of household.db unless --db is given. A short
+--busy-timeout makes the processes fall through to the retry path more often.
+"""
+
+import argparse
+import logging
+import multiprocessing
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+import database as db
+
+# The recurring template every process tries to catch up at the same moment
+RECURRING_DESCRIPTION = "stress weekly"
+RECURRING_WEEKS = 52
+
+
+class RetryCounter(logging.Handler):
+    """Counts the "database locked, retrying" warnings database.py logs."""
+
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.retries = 0
+
+    def emit(self, record):
+        if "database locked" in record.getMessage():
+            self.retries += 1
+
+
+def run_writer(index: int, args, members, barrier, results):
+    """Process entry point: write as fast as possible, then report what went wrong."""
+    db.DB_PATH = args.db
+    if args.busy_timeout is not None:
+        db.BUSY_TIMEOUT = args.busy_timeout
+    counter = RetryCounter()
+    logging.getLogger(db.__name__).addHandler(counter)
+    errors = []
+    generated = 0
+    added = {"expenses": 0, "shopping_items": 0}
+    barrier.wait()
+    started = time.perf_counter()
+    try:
+        generated = db.materialize_recurring()
+    except Exception as e:
+        errors.append(f"materialize_recurring: {e!r}")
+    for n in range(args.writes):
+        name = f"stress {index}-{n}"
+        amount = float(1 + (index * args.writes + n) % 97)
+        payer = members[n % len(members)]
+        try:
+            db.add_expense(amount, name, payer, db.SPLIT_EQUAL, db.compute_shares(amount, payer, db.SPLIT_EQUAL, members))
+            added["expenses"] += 1
+            db.add_shopping_item(name, "stress")
+            added["shopping_items"] += 1
+        except Exception as e:
+            errors.append(f"{name}: {e!r}")
+    results.put((generated, added, errors, counter.retries, time.perf_counter() - started))
+
+
+# ============== CHECKS ==============
+
+def _scalar(cursor, sql: str, params=()):
+    return cursor.execute(sql, params).fetchone()[0]
+
+
+def check(added: dict, recurring_id: int, expected_occurrences: int, generated: int) -> list:
+    """Every problem found in the database after the run (empty list = no lost updates)."""
+    problems = []
+    conn = db.get_read_connection()
+    cursor = conn.cursor()
+
+    for table, expected in added.items():
+        column = "description" if table == "expenses" else "name"
+        found = _scalar(cursor, f"SELECT COUNT(*) FROM {table} WHERE {column} LIKE 'stress %-%' AND is_deleted = 0")
+        distinct = _scalar(cursor, f"SELECT COUNT(DISTINCT {column}) FROM {table} WHERE {column} LIKE 'stress %-%'")
+        if found != expected or distinct != expected:
+            problems.append(f"{table}: {found} rows ({distinct} distinct), expected {expected}")
+
+    occurrences = _scalar(cursor, "SELECT COUNT(*) FROM expenses WHERE recurring_id = ?", (recurring_id,))
+    distinct = _scalar(cursor, "SELECT COUNT(DISTINCT occurrence_date) FROM expenses WHERE recurring_id = ?",
+                       (recurring_id,))
+    if occurrences != expected_occurrences or distinct != occurrences or generated != expected_occurrences:
+        problems.append(f"recurring: {occurrences} occurrences ({distinct} distinct dates), "
+                        f"{generated} reported generated, expected {expected_occurrences}")
+
+    cursor.execute(
+        """SELECT p.name, p.net_balance, COALESCE((
+               SELECT SUM(s.paid - s.owed) FROM expense_shares s JOIN expenses e ON e.id = s.expense_id
+               WHERE s.participant_id = p.id AND e.is_deleted = 0), 0)
+           FROM participants p"""
+    )
+    for name, balance, from_shares in cursor.fetchall():
+        if abs(balance - from_shares) >= 0.01:
+            problems.append(f"balance of {name}: {balance:.2f} stored, {from_shares:.2f} from the shares")
+
+    cursor.execute(
+        f"""SELECT e.month, e.category, e.total, t.total FROM (
+                SELECT substr(created_at, 1, 7) AS month, COALESCE(category, '{db.DEFAULT_EXPENSE_CATEGORY}') AS category,
+                       SUM(amount) AS total
+                FROM (SELECT created_at, category, amount FROM expenses WHERE is_deleted = 0
+                      UNION ALL
+                      SELECT original_date, category, amount FROM archive_expenses WHERE settlement_id IS NOT NULL)
+                GROUP BY 1, 2) e
+            LEFT JOIN expense_month_totals t ON t.month = e.month AND t.category = e.category"""
+    )
+    for month, category, total, stored in cursor.fetchall():
+        if stored is None or abs(total - stored) >= 0.01:
+            problems.append(f"month total {month} {category}: {stored} stored, {total:.2f} from the expenses")
+    conn.close()
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent multi-process writers against one database file")
+    parser.add_argument("--processes", type=int, default=8)
+    parser.add_argument("--writes", type=int, default=100, help="expenses (and shopping items) added per process")
+    parser.add_argument("--busy-timeout", type=float, help=f"seconds SQLite waits on a lock (default {db.BUSY_TIMEOUT})")
+    parser.add_argument("--db", type=Path, help="database to run against (default: a temporary copy of household.db)")
+    args = parser.parse_args()
+
+    if args.db is None:
+        args.db = Path(tempfile.mkdtemp()) / "household.db"
+        shutil.copy(db.DB_PATH, args.db)
+    db.use_database(args.db)
+    db.init_database()
+    conn = db.get_read_connection()
+    members = [row['name'] for row in conn.execute("SELECT name FROM participants WHERE is_active = 1 ORDER BY id")]
+    conn.close()
+    if not members:
+        parser.error(f"{args.db} has no participants")
+
+    # Overdue for a year: the first process to get the write lock generates it all, the rest find nothing to do
+    start_date = (date.today() - timedelta(weeks=RECURRING_WEEKS)).isoformat()
+    db.add_recurring_expense(10.0, RECURRING_DESCRIPTION, members[0], db.SPLIT_EQUAL, db.RECURRING_WEEKLY, start_date)
+    conn = db.get_read_connection()
+    recurring_id = conn.execute("SELECT MAX(id) FROM recurring_expenses").fetchone()[0]
+    conn.close()
+    expected_occurrences = RECURRING_WEEKS + 1
+
+    ctx = multiprocessing.get_context("spawn")
+    barrier = ctx.Barrier(args.processes)
+    results = ctx.Queue()
+    processes = [ctx.Process(target=run_writer, args=(i, args, members, barrier, results), daemon=True)
+                 for i in range(args.processes)]
+    started = time.perf_counter()
+    for process in processes:
+        process.start()
+
+    generated = retries = 0
+    added = {"expenses": 0, "shopping_items": 0}
+    errors = []
+    slowest = 0.0
+    for _ in processes:
+        process_generated, process_added, process_errors, process_retries, elapsed = results.get()
+        generated += process_generated
+        for table, count in process_added.items():
+            added[table] += count
+        errors += process_errors
+        retries += process_retries
+        slowest = max(slowest, elapsed)
+    for process in processes:
+        process.join()
+
+    writes = sum(added.values())
+    print(f"{args.processes} processes x {args.writes * 2} writes in {time.perf_counter() - started:.1f}s "
+          f"({writes / slowest:.0f} writes/s once started), {retries} locked-out attempts retried")
+    problems = check(added, recurring_id, expected_occurrences, generated)
+    for error in errors[:5]:
+        print(f"  gave up: {error}")
+    for problem in problems:
+        print(f"  lost update: {problem}")
+    if errors or problems:
+        print(f"{len(errors)} writes gave up after {db.WRITE_RETRY_ATTEMPTS} attempts, {len(problems)} lost updates")
+        sys.exit(1)
+    print("No lost updates")
+
+
+if __name__ == "__main__":
+    main()
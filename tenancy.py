@@ -0,0 +1,331 @@
+"""
+Multi-household tenancy for Household Management App.
+Maps a PIN to its household, gives every household its own SQLite file, and
+keeps an LRU-bounded pool of open per-household resources so one server
+process can serve many households without opening every database at startup.
+"""
+
+import argparse
+import hashlib
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+import autocomplete
+import backup
+import catcare
+import changefeed
+import database as db
+import maintenance
+import notifications
+import replenish
+
+logger = logging.getLogger(__name__)
+
+# households.json lists every household; without it only the default household exists
+REGISTRY_PATH = Path(os.environ.get("HOUSEHOLD_REGISTRY", Path(__file__).parent / "households.json"))
+# Where per-household database files live (db_file entries are relative to this)
+DATA_DIR = Path(os.environ.get("HOUSEHOLD_DATA_DIR", Path(__file__).parent / "households"))
+# How many households may hold open resources at once
+MAX_OPEN_HOUSEHOLDS = int(os.environ.get("HOUSEHOLD_MAX_OPEN", "32"))
+# auto_cleanup_old_items runs at most this often per household (seconds), not on every rerun
+CLEANUP_INTERVAL = 600
+
+DEFAULT_HOUSEHOLD_ID = "default"
+# PINs are short, so they are stored salted and stretched: "pbkdf2_sha256$<iterations>$<salt hex>$<hash hex>"
+PIN_HASH_ITERATIONS = 100_000
+# Wrong PINs one client may enter within PIN_ATTEMPT_WINDOW seconds before it has to wait
+PIN_ATTEMPTS = int(os.environ.get("HOUSEHOLD_PIN_ATTEMPTS", "5"))
+PIN_ATTEMPT_WINDOW = 300
+
+
+def hash_pin(pin: str, salt: bytes = None, iterations: int = PIN_HASH_ITERATIONS) -> str:
+    salt = os.urandom(16) if salt is None else salt
+    digest = hashlib.pbkdf2_hmac("sha256", pin.encode("utf-8"), salt, iterations)
+    return f"pbkdf2_sha256${iterations}${salt.hex()}${digest.hex()}"
+
+
+def hash_token(token: str) -> str:
+    """API tokens are long and random, so a plain sha256 is enough."""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def verify_pin(pin: str, stored: str) -> bool:
+    """Check pin against a hash_pin() value, or a bare sha256 hex digest from older households.json files."""
+    if stored.startswith("pbkdf2_sha256$"):
+        _, iterations, salt, _ = stored.split("$")
+        candidate = hash_pin(pin, bytes.fromhex(salt), int(iterations))
+    else:
+        candidate = hash_token(pin)
+    return hmac.compare_digest(candidate, stored)
+
+
+@dataclass(frozen=True)
+class Household:
+    id: str
+    title: str
+    members: tuple
+    pin_hash: str  # hash_pin() value, or a bare sha256 hex digest from older households.json files
+    db_file: Optional[Path] = None  # None = database.DB_PATH (the original single household)
+    api_token_sha256: Optional[str] = None  # bearer token for the JSON API (api.py)
+
+    @property
+    def db_path(self) -> Path:
+        return self.db_file or db.DB_PATH
+
+    @property
+    def members_label(self) -> str:
+        """'טלאור ורומי' style label."""
+        if len(self.members) == 1:
+            return self.members[0]
+        return ", ".join(self.members[:-1]) + f" ו{self.members[-1]}"
+
+
+DEFAULT_HOUSEHOLD = Household(
+    id=DEFAULT_HOUSEHOLD_ID,
+    title="משק הבית שלנו",
+    members=("טלאור", "רומי"),
+    pin_hash="pbkdf2_sha256$100000$fc1d14474a167afc7e8509bc548bfa6c$948496a9aa926125cd12c33d15e6b45b106271c8028d2e540a6b60fa062a7df9",
+    api_token_sha256=hash_token(os.environ["HOUSEHOLD_API_TOKEN"]) if os.environ.get("HOUSEHOLD_API_TOKEN") else None,
+)
+
+
+# ============== REGISTRY ==============
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def _load_registry():
+    """
+    Read households.json:
+        {"households": [{"id": "...", "title": "...", "members": ["...", "..."],
+                         "pin_hash": "...", "db_file": "name.db", "api_token_sha256": "..."}]}
+    pin_hash is a hash_pin() value (python tenancy.py hash-pin 123456) or, in older files, the
+    PIN's bare sha256 hex digest, also accepted under the old key pin_sha256; api_token_sha256
+    is hash_token() of the token.
+    """
+    if not REGISTRY_PATH.exists():
+        return {DEFAULT_HOUSEHOLD_ID: DEFAULT_HOUSEHOLD}
+    with open(REGISTRY_PATH, encoding="utf-8") as f:
+        data = json.load(f)
+    households = {}
+    pins = set()
+    for entry in data.get("households", []):
+        household = Household(
+            id=entry["id"],
+            title=entry.get("title", DEFAULT_HOUSEHOLD.title),
+            members=tuple(entry["members"]),
+            pin_hash=entry["pin_hash"] if "pin_hash" in entry else entry["pin_sha256"],
+            db_file=DATA_DIR / entry["db_file"] if entry.get("db_file") else None,
+            api_token_sha256=entry.get("api_token_sha256"),
+        )
+        if household.id in households:
+            raise ValueError(f"Duplicate household id in {REGISTRY_PATH}: {household.id}")
+        # Only catches identical hashes (legacy sha256 entries); salted ones are caught by authenticate()
+        if household.pin_hash in pins:
+            raise ValueError(f"Two households share a PIN in {REGISTRY_PATH}")
+        households[household.id] = household
+        pins.add(household.pin_hash)
+    return households
+
+
+def get_registry():
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = _load_registry()
+        return _registry
+
+
+def get_household(household_id: str) -> Optional[Household]:
+    return get_registry().get(household_id)
+
+
+_failed_pins = {}  # client -> monotonic times of its wrong PINs within PIN_ATTEMPT_WINDOW
+_failed_pins_lock = threading.Lock()
+
+
+def pin_retry_after(client: str) -> float:
+    """Seconds until client may enter another PIN; 0 if it may now."""
+    with _failed_pins_lock:
+        now = time.monotonic()
+        recent = [at for at in _failed_pins.get(client, ()) if now - at < PIN_ATTEMPT_WINDOW]
+        if recent:
+            _failed_pins[client] = recent
+        else:
+            _failed_pins.pop(client, None)
+        if len(recent) < PIN_ATTEMPTS:
+            return 0.0
+        return recent[-PIN_ATTEMPTS] + PIN_ATTEMPT_WINDOW - now
+
+
+def authenticate(pin: str, client: str = "") -> Optional[Household]:
+    """
+    Return the household whose PIN this is, or None - also when the PIN opens more than
+    one household, and without checking it while client is locked out (see pin_retry_after).
+    Every check costs one PBKDF2 per household, so wrong guesses are limited per client.
+    """
+    if pin_retry_after(client):
+        return None
+    matches = [household for household in get_registry().values() if verify_pin(pin, household.pin_hash)]
+    if len(matches) > 1:
+        # Salted hashes can't be compared when households.json is loaded, so a shared PIN only shows up here
+        logger.error("A PIN matches %d households in %s (%s); refusing it",
+                     len(matches), REGISTRY_PATH, ", ".join(household.id for household in matches))
+        return None
+    if not matches:
+        with _failed_pins_lock:
+            _failed_pins.setdefault(client, []).append(time.monotonic())
+        return None
+    return matches[0]
+
+
+def authenticate_token(token: str) -> Optional[Household]:
+    """Return the household an API token belongs to, or None."""
+    token_hash = hash_token(token)
+    for household in get_registry().values():
+        if household.api_token_sha256 and hmac.compare_digest(household.api_token_sha256, token_hash):
+            return household
+    return None
+
+
+# ============== OPEN HANDLES ==============
+
+class HouseholdHandle:
+    """Per-household resources that stay open while the household is in use."""
+
+    def __init__(self, household: Household):
+        self.household = household
+        self.db_path = household.db_path
+        self.feed = None
+        self.maintenance = None
+        self.backups = None
+        self._cleaned_at = None
+        self._cleanup_lock = threading.Lock()
+
+    def open(self, migrate: bool):
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        if migrate:
+            with db.using_database(self.db_path):
+                db.init_database()
+                db.ensure_participants(self.household.members)
+        self.feed = changefeed.get_feed(self.db_path)
+        self.maintenance = maintenance.MaintenanceWorker(self.db_path).start()
+        self.backups = backup.BackupScheduler(self.db_path).start()
+        return self
+
+    def cleanup_if_due(self):
+        """Run auto_cleanup_old_items if it hasn't run for CLEANUP_INTERVAL."""
+        with self._cleanup_lock:
+            now = time.monotonic()
+            if self._cleaned_at is not None and now - self._cleaned_at < CLEANUP_INTERVAL:
+                return
+            self._cleaned_at = now
+        with db.using_database(self.db_path):
+            db.auto_cleanup_old_items()
+
+    def close(self):
+        if self.maintenance:
+            self.maintenance.stop()
+        if self.backups:
+            self.backups.stop()
+        notifications.drop_engine(self.db_path)
+        catcare.drop_scheduler(self.db_path)
+        autocomplete.drop_index(self.db_path)
+        replenish.drop_model(self.db_path)
+        changefeed.close_feed(self.db_path)
+        db.close_read_pool(self.db_path)
+
+
+class HandlePool:
+    """LRU of open HouseholdHandles; the least recently used is closed past max_open."""
+
+    def __init__(self, max_open: int = MAX_OPEN_HOUSEHOLDS):
+        self.max_open = max_open
+        self._handles = OrderedDict()
+        self._migrated = set()
+        self._opening = {}  # household id -> lock held while that household is being opened
+        self._lock = threading.Lock()
+
+    def get(self, household: Household) -> HouseholdHandle:
+        with self._lock:
+            handle = self._handles.get(household.id)
+            if handle is not None:
+                self._handles.move_to_end(household.id)
+                return handle
+            opening = self._opening.setdefault(household.id, threading.Lock())
+        # Opening may run migrations: do it outside the pool lock so other households aren't held up,
+        # while a second session asking for the same household waits here and then reuses the handle
+        evicted = []
+        with opening:
+            with self._lock:
+                handle = self._handles.get(household.id)
+                migrate = household.id not in self._migrated
+            if handle is None:
+                # Migrations run once per file per process, on first access
+                handle = HouseholdHandle(household).open(migrate=migrate)
+            with self._lock:
+                self._migrated.add(household.id)
+                self._handles[household.id] = handle
+                self._handles.move_to_end(household.id)
+                while len(self._handles) > self.max_open:
+                    evicted.append(self._handles.popitem(last=False)[1])
+        for old in evicted:
+            logger.info("Closing idle household %s", old.household.id)
+            old.close()
+        return handle
+
+    def open_count(self) -> int:
+        with self._lock:
+            return len(self._handles)
+
+    def handles(self):
+        with self._lock:
+            return list(self._handles.values())
+
+
+_pool = HandlePool()
+
+
+def get_handle(household: Household) -> HouseholdHandle:
+    """Open (if needed) the household's resources without touching the current context."""
+    return _pool.get(household)
+
+
+def open_handles():
+    """Handles of every household currently open in this process."""
+    return _pool.handles()
+
+
+def warm_up(household: Household) -> threading.Thread:
+    """Open a household in the background (migrations included) so its first page view doesn't wait."""
+    thread = threading.Thread(target=get_handle, args=(household,), name=f"warm-up-{household.id}", daemon=True)
+    thread.start()
+    return thread
+
+
+def activate(household: Household) -> HouseholdHandle:
+    """Open (if needed) the household's resources and point database.py at its file."""
+    handle = get_handle(household)
+    db.use_database(handle.db_path)
+    return handle
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hash a PIN or API token for households.json")
+    parser.add_argument("command", choices=["hash-pin", "hash-token"])
+    parser.add_argument("secret")
+    args = parser.parse_args()
+    print(hash_pin(args.secret) if args.command == "hash-pin" else hash_token(args.secret))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Tests for api.py: a real server on a free port, talking to one household
+through its bearer token.
+"""
+
+import asyncio
+import json
+import threading
+import urllib.error
+import urllib.request
+from datetime import date, timedelta
+
+import pytest
+import tornado.httpserver
+import tornado.ioloop
+import tornado.testing
+
+import api
+import database as db
+import ledger
+import tenancy
+
+API_TOKEN = "test-token"
+
+
+@pytest.fixture
+def api_url(db_path, members, tmp_path, monkeypatch):
+    """Base URL of api.py served from a background thread for one household on db_path."""
+    registry = tmp_path / "households.json"
+    registry.write_text(json.dumps({"households": [{
+        "id": "test", "title": "בית", "members": list(members), "pin_hash": tenancy.hash_pin("123456"),
+        "db_file": db_path.name, "api_token_sha256": tenancy.hash_token(API_TOKEN),
+    }]}), encoding="utf-8")
+    monkeypatch.setattr(tenancy, "REGISTRY_PATH", registry)
+    monkeypatch.setattr(tenancy, "DATA_DIR", db_path.parent)
+    monkeypatch.setattr(tenancy, "_registry", None)
+    monkeypatch.setattr(tenancy, "_pool", tenancy.HandlePool())
+
+    sock, port = tornado.testing.bind_unused_port()
+    started = threading.Event()
+    loops = []
+
+    def run():
+        asyncio.set_event_loop(asyncio.new_event_loop())
+        server = tornado.httpserver.HTTPServer(api.make_app())
+        server.add_sockets([sock])
+        loops.append(tornado.ioloop.IOLoop.current())
+        started.set()
+        loops[0].start()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    started.wait(timeout=5)
+    yield f"http://127.0.0.1:{port}/api/"
+    loops[0].add_callback(loops[0].stop)
+    thread.join(timeout=5)
+    for handle in tenancy.open_handles():
+        handle.close()
+
+
+def call(url, method="GET", body=None, token=API_TOKEN, headers=None):
+    """(status, ETag, decoded JSON or None) of one request."""
+    headers = dict(headers or {})
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    data = json.dumps(body).encode("utf-8") if body is not None else None
+    request = urllib.request.Request(url, data=data, method=method, headers=headers)
+    try:
+        with urllib.request.urlopen(request) as response:
+            status, etag, raw = response.status, response.headers.get("ETag"), response.read()
+    except urllib.error.HTTPError as e:
+        status, etag, raw = e.code, e.headers.get("ETag"), e.read()
+    return status, etag, json.loads(raw) if raw else None
+
+
+def test_api_requires_a_valid_token(api_url):
+    assert call(api_url + "shopping", token=None)[0] == 401
+    assert call(api_url + "shopping", token="wrong")[0] == 401
+
+
+def test_api_status_codes(api_url):
+    assert call(api_url + "nope")[0] == 404
+    assert call(api_url + "shopping", "POST", {})[2] == {"error": "Missing field: name"}
+    assert call(api_url + "shopping", "POST", {"name": "חלב"})[0] == 201
+    item_id = call(api_url + "shopping")[2][0]["id"]
+    assert call(api_url + f"shopping/{item_id}/bought", "POST", {})[0] == 200
+    assert call(api_url + f"shopping/{item_id}/nope", "POST", {})[0] == 404
+    assert call(api_url + f"shopping/{item_id}", "DELETE")[0] == 200
+
+
+@pytest.mark.parametrize("amount", ["abc", None, [1], 0, -5])
+def test_api_rejects_invalid_amounts(api_url, amount):
+    status, _, body = call(api_url + "expenses", "POST", {"amount": amount, "payer": "דנה"})
+    assert status == 400
+    assert body["error"] in ("Invalid amount", "Missing field: amount")
+
+
+def test_api_etag_follows_table_versions(api_url):
+    status, etag, rows = call(api_url + "shopping")
+    assert status == 200 and rows == [] and etag
+
+    assert call(api_url + "shopping", headers={"If-None-Match": etag})[:2] == (304, etag)
+
+    call(api_url + "shopping", "POST", {"name": "חלב"})
+    status, new_etag, rows = call(api_url + "shopping", headers={"If-None-Match": etag})
+    assert status == 200 and new_etag != etag
+    assert [row["name"] for row in rows] == ["חלב"]
+
+
+def test_api_expenses_etag_covers_due_recurring_expenses(api_url):
+    _, etag, rows = call(api_url + "expenses")
+    assert rows == []
+    # A template that's already due: the next GET generates its expense, so the old tag must not match
+    week_ago = (date.today() - timedelta(days=7)).isoformat()
+    db.add_recurring_expense(50.0, "ועד בית", "דנה", db.SPLIT_EQUAL, db.RECURRING_WEEKLY, week_ago)
+    status, new_etag, rows = call(api_url + "expenses", headers={"If-None-Match": etag})
+    assert status == 200 and new_etag != etag and rows
+
+
+def test_api_balance_matches_ledger(api_url):
+    assert call(api_url + "expenses", "POST", {"amount": 90, "payer": "דנה"})[0] == 201
+    status, _, body = call(api_url + "balance")
+    assert status == 200
+    assert body["balances"] == pytest.approx({"דנה": 60.0, "יוסי": -30.0, "רון": -30.0})
+    transfers = sorted(ledger.Transfer(**t) for t in body["transfers"])
+    assert transfers == [ledger.Transfer("יוסי", "דנה", 30.0), ledger.Transfer("רון", "דנה", 30.0)]
+
+
+@pytest.mark.parametrize("hours", ["abc", None, 0, -1, [24]])
+def test_api_rejects_invalid_cat_frequencies(api_url, hours):
+    status, _, body = call(api_url + "cat", "POST", {"task_name": "אוכל", "frequency_hours": hours})
+    assert status == 400
+    assert body["error"] in ("Invalid frequency_hours", "Missing field: frequency_hours")
+
+
+@pytest.mark.parametrize("limit", ["abc", "0", "-3"])
+def test_api_rejects_invalid_suggest_limits(api_url, limit):
+    status, _, body = call(api_url + f"suggest?q=a&limit={limit}")
+    assert status == 400
+    assert body["error"] == "Invalid limit"
@@ -0,0 +1,60 @@
+"""Tests for backup.py: online backups, restores and rotation."""
+
+import pytest
+
+import backup
+import database as db
+
+
+def test_backup_and_restore_round_trip(db_path, tmp_path):
+    backups = tmp_path / "backups"
+    db.add_shopping_item("חלב", "🥛 מוצרי חלב")
+    saved = backup.backup_database(db_path, backups)
+    assert saved.name.endswith(".db.gz")
+    backup.verify_backup(saved)
+
+    db.add_shopping_item("לחם", "🍞 מאפים")
+    versions = db.get_table_versions()
+    backup.restore_backup(saved, db_path, backups)
+
+    assert [item["name"] for item in db.get_all_shopping_items()] == ["חלב"]
+    # Caches keyed on the old versions must not mistake the restored data for what they hold
+    assert db.get_table_versions()["shopping_items"] > versions["shopping_items"]
+    # The contents before the restore were kept as a safety backup
+    assert len(backup.list_backups(db_path, backups)) == 2
+
+
+def test_restore_rejects_a_corrupt_backup(db_path, tmp_path):
+    broken = tmp_path / "household-20260101-030000.db"
+    broken.write_bytes(b"not a database")
+    with pytest.raises(backup.BackupError):
+        backup.restore_backup(broken, db_path, tmp_path / "backups")
+
+
+def test_rotate_keeps_the_newest(db_path, tmp_path):
+    backups = tmp_path / "backups"
+    for _ in range(3):
+        backup.backup_database(db_path, backups, compress=False, keep=None, sleep=0)
+    removed = backup.rotate_backups(db_path, backups, keep=2)
+    assert len(removed) == 1
+    assert len(backup.list_backups(db_path, backups)) == 2
+
+
+@pytest.mark.parametrize("other_name", ["household-b/household.db", "household-b.db"])
+def test_rotate_leaves_other_households_alone(db_path, tmp_path, other_name):
+    backups = tmp_path / "backups"
+    other = tmp_path / other_name
+    other.parent.mkdir(exist_ok=True)
+    token = db.use_database(other)
+    try:
+        db.init_database()
+        theirs = backup.backup_database(other, backups, keep=None, sleep=0)
+    finally:
+        db.close_read_pool(other)
+        db._active_db_path.reset(token)
+
+    for _ in range(2):
+        backup.backup_database(db_path, backups, keep=1, sleep=0)
+    assert theirs.exists()
+    assert backup.list_backups(other, backups) == [theirs]
+    assert theirs not in backup.list_backups(db_path, backups)
@@ -0,0 +1,33 @@
+"""Cat care tasks: the Recycle Bin and unique task names."""
+
+import database as db
+
+
+def tasks():
+    return {task["task_name"]: task["frequency_hours"] for task in db.get_all_cat_tasks()}
+
+
+def test_delete_moves_the_task_to_the_trash(db_path):
+    db.add_cat_task("אוכל", 12)
+    db.delete_cat_task(db.get_all_cat_tasks()[0]["id"])
+
+    assert tasks() == {}
+    assert [item["name"] for item in db.get_deleted_items()] == ["אוכל"]
+
+
+def test_adding_a_trashed_name_restores_it(db_path):
+    db.add_cat_task("אוכל", 12)
+    task_id = db.get_all_cat_tasks()[0]["id"]
+    db.delete_cat_task(task_id)
+
+    db.add_cat_task("אוכל", 8)
+
+    assert tasks() == {"אוכל": 8}
+    assert db.get_all_cat_tasks()[0]["id"] == task_id
+    assert db.get_deleted_items() == ()
+
+
+def test_adding_a_live_name_again_keeps_one_task(db_path):
+    db.add_cat_task("ארגז חול", 24)
+    db.add_cat_task("ארגז חול", 48)
+    assert tasks() == {"ארגז חול": 24}
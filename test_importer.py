@@ -0,0 +1,55 @@
+"""Tests for importer.py: bank statement CSVs imported as expenses."""
+
+import csv
+
+import database as db
+import importer
+
+
+def write_statement(path, rows):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["תאריך", "שם בית העסק", "סכום"])
+        writer.writerows(rows)
+    return path
+
+
+def run_import(path, members):
+    mapping = importer.guess_mapping(importer.read_header(path))
+    return importer.ExpenseImport(path, mapping, members, "דנה").run()
+
+
+def test_import_skips_rows_imported_before(db_path, members, tmp_path):
+    first = write_statement(tmp_path / "march.csv", [
+        ("01/03/2026", "סופר", "120.50"),
+        ("02/03/2026", "מכולת", "35"),
+    ])
+    overlapping = write_statement(tmp_path / "march-again.csv", [
+        ("02/03/2026", "מכולת", "35"),
+        ("03/03/2026", "בית מרקחת", "48.90"),
+    ])
+
+    assert run_import(first, members)[:2] == (2, 0)
+    assert run_import(first, members)[:2] == (0, 2)
+    assert run_import(overlapping, members)[:2] == (1, 1)
+    assert sorted(e["description"] for e in db.get_all_expenses()) == ["בית מרקחת", "מכולת", "סופר"]
+
+
+def test_import_keeps_identical_purchases_on_one_day(db_path, members, tmp_path):
+    statement = write_statement(tmp_path / "coffee.csv", [
+        ("05/03/2026", "קפה", "14"),
+        ("05/03/2026", "קפה", "14"),
+    ])
+    assert run_import(statement, members)[:2] == (2, 0)
+    assert run_import(statement, members)[:2] == (0, 2)
+
+
+def test_import_reports_unreadable_rows(db_path, members, tmp_path):
+    statement = write_statement(tmp_path / "bad.csv", [
+        ("05/03/2026", "קפה", "abc"),
+        ("06/03/2026", "החזר", "-20"),
+        ("07/03/2026", "סופר", "80"),
+    ])
+    result = run_import(statement, members)
+    assert result.imported == 1
+    assert [line for line, _ in result.skipped] == [2, 3]
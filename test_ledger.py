@@ -0,0 +1,45 @@
+"""Tests for the settle-up transfers in ledger.py and how expenses are split into shares."""
+
+import pytest
+
+import database as db
+import ledger
+
+
+def settles(balances: dict, transfers) -> bool:
+    """True if applying the transfers leaves everyone at zero (to the agora)."""
+    left = dict(balances)
+    for transfer in transfers:
+        left[transfer.debtor] += transfer.amount
+        left[transfer.creditor] -= transfer.amount
+    return all(abs(value) < 0.01 for value in left.values())
+
+
+def test_minimal_transfers_settles_everyone():
+    balances = {"a": 30.0, "b": -10.0, "c": -20.0}
+    transfers = ledger.minimal_transfers(balances)
+    assert len(transfers) == 2
+    assert settles(balances, transfers)
+
+
+def test_minimal_transfers_uses_zero_sum_groups():
+    # Two pairs that settle among themselves: 2 transfers, where a naive matching may need 3
+    balances = {"a": 10.0, "b": -7.0, "c": 7.0, "d": -10.0}
+    transfers = ledger.minimal_transfers(balances)
+    assert len(transfers) == 2
+    assert settles(balances, transfers)
+
+
+def test_minimal_transfers_absorbs_float_drift():
+    assert ledger.minimal_transfers({"a": 0.001, "b": -0.002}) == []
+    transfers = ledger.minimal_transfers({"a": 10.01, "b": -10.0})
+    assert transfers == [ledger.Transfer("b", "a", 10.0)]
+
+
+def test_equal_split_gives_the_remainder_to_the_first_debtor():
+    assert db.compute_shares(100, "a", db.SPLIT_EQUAL, ["a", "b", "c"]) == {"a": 33.34, "b": 33.33, "c": 33.33}
+
+
+@pytest.mark.parametrize("split_type", [db.SPLIT_EQUAL, db.SPLIT_PAYER_ONLY, db.SPLIT_OTHERS_ONLY])
+def test_split_without_members_falls_on_the_payer(split_type):
+    assert db.compute_shares(50, "a", split_type, []) == {"a": 50}
@@ -0,0 +1,61 @@
+"""Metrics: database call timing and lock waits, in the Prometheus text format."""
+
+import sqlite3
+import threading
+
+import pytest
+
+import api
+import database as db
+import metrics
+
+
+def samples(name: str, function: str) -> float:
+    """Value of one sample line, e.g. samples("household_db_lock_waits_total", "add_shopping_item")."""
+    prefix = f'{name}{{function="{function}"}} '
+    lines = [line for line in metrics.expose().splitlines() if line.startswith(prefix)]
+    return float(lines[0][len(prefix):]) if lines else 0.0
+
+
+@pytest.fixture
+def instrumented(monkeypatch):
+    """metrics.instrument() for one test; the unwrapped functions are put back afterwards."""
+    for name in metrics.TIMED_DB_FUNCTIONS:
+        monkeypatch.setattr(db, name, getattr(db, name))
+    metrics.instrument(db)
+
+
+def test_instrument_times_queries_but_not_helpers(db_path, instrumented):
+    assert hasattr(db.get_all_shopping_items, "metric_name")
+    assert not hasattr(db.compute_shares, "metric_name")
+    assert not hasattr(db.retry_when_locked, "metric_name")
+    metrics.instrument(db)
+    assert not hasattr(db.get_all_shopping_items.__wrapped__, "metric_name")
+
+
+def test_references_taken_before_instrument_are_timed(db_path, instrumented):
+    count = "household_db_call_duration_seconds_count"
+    before = samples(count, "get_all_shopping_items")
+    # The API's resource table was built when api.py was imported, before instrument()
+    api.RESOURCES["shopping"]["read"]()
+    assert samples(count, "get_all_shopping_items") == before + 1
+
+
+def test_locked_writes_are_counted(db_path, monkeypatch):
+    monkeypatch.setattr(db, "BUSY_TIMEOUT", 0.05)
+    monkeypatch.setattr(db, "_lock_wait_listeners", [metrics._record_lock_wait])
+    before = samples("household_db_lock_waits_total", "add_shopping_item")
+
+    # Another "process" holds the write lock for a moment
+    blocker = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False)
+    blocker.execute("BEGIN IMMEDIATE")
+    release = threading.Timer(0.3, blocker.rollback)
+    release.start()
+    db.add_shopping_item("חלב", "🥛 מוצרי חלב")
+    release.join()
+    blocker.close()
+
+    assert [item["name"] for item in db.get_all_shopping_items()] == ["חלב"]
+    waits = samples("household_db_lock_waits_total", "add_shopping_item") - before
+    assert waits >= 1
+    assert samples("household_db_lock_wait_seconds_count", "add_shopping_item") >= waits
@@ -0,0 +1,43 @@
+"""Settle-up checkpoints: archiving the settled expenses and zeroing the balances."""
+
+import json
+
+import pytest
+
+import database as db
+
+
+def test_settle_up_archives_expenses_and_zeroes_balances(add_expense):
+    add_expense(90.0, "דנה")
+    add_expense(30.0, "יוסי")
+    totals = db.get_month_totals()
+    balances = db.get_participant_balances()
+    assert any(balances.values())
+
+    settlement_id = db.settle_up()
+
+    assert settlement_id is not None
+    assert db.get_all_expenses() == ()
+    assert not any(db.get_participant_balances().values())
+    settlement = db.get_settlements()[0]
+    assert settlement["id"] == settlement_id
+    assert settlement["expense_count"] == 2
+    assert settlement["total"] == pytest.approx(120.0)
+    assert json.loads(settlement["balances"]) == pytest.approx(balances)
+    assert len(db.get_settled_expenses(settlement_id)) == 2
+    # Settled expenses still count towards the month's spending
+    assert db.get_month_totals() == pytest.approx(totals)
+
+
+def test_settle_up_with_nothing_to_settle(db_path):
+    assert db.settle_up() is None
+    assert db.get_settlements() == ()
+
+
+def test_expenses_added_after_a_settle_up_start_from_zero(add_expense):
+    add_expense(60.0, "דנה")
+    db.settle_up()
+    add_expense(30.0, "רון")
+
+    assert db.get_participant_balances() == pytest.approx({"דנה": -10.0, "יוסי": -10.0, "רון": 20.0})
+    assert [e["amount"] for e in db.get_all_expenses()] == [30.0]
@@ -0,0 +1,79 @@
+"""Households: PIN and API token checks against households.json."""
+
+import json
+import time
+
+import pytest
+
+import tenancy
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    """registry(entries) writes households.json with those entries and points tenancy at it."""
+    path = tmp_path / "households.json"
+    monkeypatch.setattr(tenancy, "REGISTRY_PATH", path)
+    monkeypatch.setattr(tenancy, "DATA_DIR", tmp_path)
+
+    def write(*entries):
+        path.write_text(json.dumps({"households": [
+            {"title": "בית", "members": ["דנה", "יוסי"], "db_file": f"{entry['id']}.db", **entry} for entry in entries
+        ]}), encoding="utf-8")
+        monkeypatch.setattr(tenancy, "_registry", None)
+    return write
+
+
+def test_pin_opens_its_household(registry):
+    registry({"id": "a", "pin_hash": tenancy.hash_pin("111111")},
+             {"id": "b", "pin_hash": tenancy.hash_pin("222222")})
+    assert tenancy.authenticate("111111").id == "a"
+    assert tenancy.authenticate("222222").id == "b"
+    assert tenancy.authenticate("333333") is None
+
+
+def test_legacy_sha256_pins_still_work(registry):
+    legacy = tenancy.hash_token("111111")
+    registry({"id": "a", "pin_sha256": legacy}, {"id": "b", "pin_hash": tenancy.hash_token("222222")})
+    assert tenancy.authenticate("222222").id == "b"
+    assert tenancy.authenticate("111111").id == "a"
+    assert tenancy.authenticate("111112") is None
+
+
+def test_pin_shared_by_two_households_is_refused(registry):
+    registry({"id": "a", "pin_hash": tenancy.hash_pin("111111")},
+             {"id": "b", "pin_hash": tenancy.hash_pin("111111")},
+             {"id": "c", "pin_hash": tenancy.hash_pin("333333")})
+    assert tenancy.authenticate("111111") is None
+    assert tenancy.authenticate("333333").id == "c"
+
+
+def test_shared_legacy_pin_is_rejected_when_loading(registry):
+    legacy = tenancy.hash_token("111111")
+    registry({"id": "a", "pin_sha256": legacy}, {"id": "b", "pin_sha256": legacy})
+    with pytest.raises(ValueError):
+        tenancy.get_registry()
+
+
+def test_api_token_picks_the_household(registry):
+    registry({"id": "a", "pin_hash": tenancy.hash_pin("111111"), "api_token_sha256": tenancy.hash_token("tok")})
+    assert tenancy.authenticate_token("tok").id == "a"
+    assert tenancy.authenticate_token("other") is None
+
+
+def test_wrong_pins_lock_the_client_out(registry, monkeypatch):
+    monkeypatch.setattr(tenancy, "_failed_pins", {})
+    registry({"id": "a", "pin_hash": tenancy.hash_pin("111111")})
+    for _ in range(tenancy.PIN_ATTEMPTS):
+        assert tenancy.authenticate("000000", "10.0.0.1") is None
+    assert tenancy.pin_retry_after("10.0.0.1") > 0
+    # Locked out: even the right PIN isn't checked, while other clients are unaffected
+    assert tenancy.authenticate("111111", "10.0.0.1") is None
+    assert tenancy.authenticate("111111", "10.0.0.2").id == "a"
+
+
+def test_lockout_expires(registry, monkeypatch):
+    long_ago = time.monotonic() - tenancy.PIN_ATTEMPT_WINDOW - 1
+    monkeypatch.setattr(tenancy, "_failed_pins", {"10.0.0.1": [long_ago] * tenancy.PIN_ATTEMPTS})
+    registry({"id": "a", "pin_hash": tenancy.hash_pin("111111")})
+    assert tenancy.pin_retry_after("10.0.0.1") == 0
+    assert tenancy.authenticate("111111", "10.0.0.1").id == "a"
@@ -0,0 +1,82 @@
+"""Undo through the change log: user actions are reverted one at a time, housekeeping writes never."""
+
+from datetime import date, timedelta
+
+import pytest
+
+import database as db
+
+
+def names():
+    return [item["name"] for item in db.get_all_shopping_items()]
+
+
+def test_undo_last_reverts_an_add(db_path):
+    db.add_shopping_item("חלב", "🥛 מוצרי חלב")
+    assert names() == ["חלב"]
+
+    assert "shopping_items" in db.undo_last()
+    assert db.get_all_shopping_items() == ()
+
+
+def test_undo_last_restores_a_deleted_expense_and_balances(add_expense):
+    add_expense(60.0, "דנה")
+    balances = db.get_participant_balances()
+    db.delete_expense(db.get_all_expenses()[0]["id"])
+    assert not any(db.get_participant_balances().values())
+
+    db.undo_last()
+
+    assert len(db.get_all_expenses()) == 1
+    assert db.get_participant_balances() == pytest.approx(balances)
+
+
+def test_undo_last_steps_back_one_action_at_a_time(db_path):
+    db.add_shopping_item("לחם", "🍞 מאפים")
+    db.add_shopping_item("ביצים", "🥚 אחר")
+
+    db.undo_last()
+    assert names() == ["לחם"]
+    db.undo_last()
+    assert db.get_all_shopping_items() == ()
+
+
+def test_undo_last_skips_generated_recurring_expenses(db_path):
+    db.add_shopping_item("חלב", "🥛 מוצרי חלב")
+    week_ago = (date.today() - timedelta(days=7)).isoformat()
+    db.add_recurring_expense(50.0, "ועד בית", "דנה", db.SPLIT_EQUAL, db.RECURRING_WEEKLY, week_ago)
+    generated = db.get_all_expenses()
+    assert len(generated) == 2
+
+    # Undoes adding the template, not the expenses it generated (which the next read would regenerate)
+    assert db.undo_last() == {"recurring_expenses"}
+    assert db.get_recurring_expenses() == ()
+    assert len(db.get_all_expenses()) == 2
+    # ...and the next undo reaches the action before it
+    db.undo_last()
+    assert db.get_all_shopping_items() == ()
+
+
+def test_undo_last_skips_trash_purges(db_path):
+    db.add_shopping_item("לחם", "🍞 מאפים")
+    db.delete_shopping_item(db.get_all_shopping_items()[0]["id"])
+    db.add_shopping_item("חלב", "🥛 מוצרי חלב")
+    assert db.purge_trash(retention_days=-1) == {"shopping_items": 1}
+
+    # Undoes adding the milk; the purged bread stays gone
+    db.undo_last()
+    assert db.get_all_shopping_items() == ()
+    assert db.get_deleted_items() == ()
+
+
+def test_queued_taps_are_undone_one_by_one(db_path):
+    db.add_shopping_item("חלב", "🥛 מוצרי חלב")
+    db.add_shopping_item("לחם", "🍞 מאפים")
+    milk, bread = sorted(db.get_all_shopping_items(), key=lambda item: item["id"])
+    # Two sessions' taps, flushed by the write queue in one transaction
+    assert db.apply_writes([("update_shopping_item", (milk["id"], True)),
+                            ("update_shopping_item", (bread["id"], True))]) == [None, None]
+
+    db.undo_last()
+    bought = {item["name"]: item["bought"] for item in db.get_all_shopping_items(True)}
+    assert bought == {"חלב": 1}
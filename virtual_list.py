@@ -0,0 +1,49 @@
+"""
+Virtualized list component for Household Management App.
+A long list is sent to the browser as one compact payload and only the rows in
+view become DOM nodes (frontend/virtual_list/index.html). Taps come back to
+Python as (action, row id) so the tabs handle them like their regular buttons.
+"""
+
+from pathlib import Path
+
+import streamlit as st
+import streamlit.components.v1 as components
+
+FRONTEND_DIR = Path(__file__).parent / "frontend" / "virtual_list"
+
+# Pixel height of one row, and the most the list may take before it scrolls
+ROW_HEIGHT = 64
+MAX_HEIGHT = 520
+
+_component = components.declare_component("virtual_list", path=str(FRONTEND_DIR))
+
+
+def virtual_list(rows, key: str, row_action: str = None, buttons=(), row_height: int = ROW_HEIGHT,
+                 max_height: int = MAX_HEIGHT):
+    """
+    Render rows as a virtualized list.
+
+    rows: (id, title, subtitle, accent color, struck through) per row.
+    row_action: action sent when a row is tapped (None = rows aren't tappable).
+    buttons: (action, label, confirm label or None) shown on every row; with a
+             confirm label the first tap only arms the button.
+    Returns (action, id) for a new tap, or None.
+    """
+    event = _component(
+        rows=[list(row) for row in rows],
+        row_action=row_action,
+        buttons=[list(button) for button in buttons],
+        row_height=row_height,
+        max_height=max_height,
+        key=key,
+        default=None,
+    )
+    if not event:
+        return None
+    # The component keeps returning its last tap on later reruns; act on each tap once
+    seen_key = f"_virtual_list_seen_{key}"
+    if st.session_state.get(seen_key) == event["seq"]:
+        return None
+    st.session_state[seen_key] = event["seq"]
+    return event["action"], event["id"]
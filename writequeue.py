@@ -0,0 +1,85 @@
+"""
+Write-behind queue for Household Management App.
+Taps (bought, chore done, cat task done) are queued and flushed by a single
+writer thread that groups everything submitted within a few milliseconds
+into one transaction per database file.
+"""
+
+import logging
+import queue
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Future
+from pathlib import Path
+
+import database as db
+
+logger = logging.getLogger(__name__)
+
+# How long the writer waits for more writes before flushing a batch (seconds)
+FLUSH_INTERVAL = 0.005
+# Upper bound on writes per transaction
+MAX_BATCH = 200
+
+
+class WriteQueue:
+    """Single background writer. submit() returns a Future resolved after the commit."""
+
+    def __init__(self, flush_interval: float = FLUSH_INTERVAL, max_batch: int = MAX_BATCH):
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def submit(self, db_path, name: str, *args) -> Future:
+        """Queue db.<name>(*args) for db_path. name must be in database.BATCHABLE_WRITES."""
+        if name not in db.BATCHABLE_WRITES:
+            raise ValueError(f"{name} cannot be queued")
+        self._ensure_started()
+        future = Future()
+        self._queue.put((Path(db_path), name, args, future))
+        return future
+
+    def _ensure_started(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="write-queue", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            # Let the rest of a burst of taps arrive, then take all of it
+            time.sleep(self.flush_interval)
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._flush(batch)
+
+    def _flush(self, batch):
+        by_db = defaultdict(list)
+        for db_path, name, args, future in batch:
+            by_db[db_path].append((name, args, future))
+        for db_path, items in by_db.items():
+            try:
+                with db.using_database(db_path):
+                    results = db.apply_writes([(name, args) for name, args, _ in items])
+            except Exception as e:
+                logger.exception("Write batch failed for %s", db_path)
+                results = [e] * len(items)
+            for (_, _, future), error in zip(items, results):
+                if error is None:
+                    future.set_result(None)
+                else:
+                    future.set_exception(error)
+
+
+_queue = WriteQueue()
+
+
+def get_queue() -> WriteQueue:
+    return _queue